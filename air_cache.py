@@ -0,0 +1,328 @@
+# ===== 측정값 응답 공유 캐시 =====
+# 에어코리아 실시간 측정값은 1시간에 한 번만 갱신되므로,
+# 같은 (측정소, 조회 개수, 조회 기간, 버전) 요청은 디스크 캐시에서 바로 돌려준다.
+# - 캐시 파일은 여러 프로세스/세션이 함께 읽고 쓴다 (원자적 교체: os.replace).
+# - 만료 시각은 응답 안의 가장 최신 dataTime + 1시간 + 발행 지연으로 계산.
+# - 만료된(stale) 데이터는 즉시 반환하고, 백그라운드에서 한 번만 새로 고친다.
+# - 같은 요청이 동시에 여러 개 들어오면 SingleFlight로 API 호출 하나만 보내고 결과를 나눠 준다.
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# 캐시 파일 위치 (환경변수로 바꿀 수 있음)
+CACHE_DIR = os.environ.get(
+    "AIR_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "air"),
+)
+
+# 에어코리아 응답의 dataTime은 한국 시간(KST) 기준
+KST = timezone(timedelta(hours=9))
+
+# 정각 데이터가 API에 반영되기까지 걸리는 여유 시간
+PUBLISH_DELAY = timedelta(minutes=15)
+# items가 비어 있거나 dataTime을 읽을 수 없을 때 쓰는 짧은 TTL
+EMPTY_TTL = timedelta(minutes=10)
+# 이보다 오래된 캐시는 stale로도 쓰지 않고 동기 요청으로 새로 받음
+MAX_STALE = timedelta(hours=24)
+# 만료된 캐시를 돌려줄 때 최신 측정값이 이보다 오래됐으면 화면에 경고 (정시 갱신 주기의 2배)
+# 주기마다 한 번씩 일어나는 평소의 stale-while-revalidate는 경고하지 않음
+STALE_WARN_AGE = 2 * (timedelta(hours=1) + PUBLISH_DELAY)
+# 다른 프로세스가 남긴 갱신 잠금 파일을 무시하는 기준 시간(초)
+REFRESH_LOCK_TIMEOUT = 60
+
+
+def now_kst():
+    """현재 한국 시간을 tz 정보 없는 datetime으로 반환 (dataTime과 비교용)."""
+    return datetime.now(KST).replace(tzinfo=None)
+
+
+def parse_data_time(text):
+    """
+    에어코리아 dataTime 문자열을 datetime으로 변환. 실패하면 None.
+    - "2025-12-05 20:00", "202512052000" 두 형식을 지원.
+    - 자정은 API가 "24:00"으로 주기 때문에 다음 날 00:00으로 바꿔 준다.
+    """
+    if not text:
+        return None
+    text = text.strip()
+    if len(text) == 12 and text.isdigit():
+        text = f"{text[:4]}-{text[4:6]}-{text[6:8]} {text[8:10]}:{text[10:]}"
+    try:
+        if text.endswith("24:00"):
+            return datetime.strptime(text[:-5] + "00:00", "%Y-%m-%d %H:%M") + timedelta(days=1)
+        return datetime.strptime(text, "%Y-%m-%d %H:%M")
+    except ValueError:
+        return None
+
+
+def newest_data_time(items):
+    """items 중 가장 최신 dataTime을 datetime으로 반환. 하나도 없으면 None."""
+    times = [parse_data_time(it.get("dataTime")) for it in items or []]
+    times = [t for t in times if t is not None]
+    return max(times) if times else None
+
+
+def compute_expiry(items, fetched_at):
+    """
+    캐시 항목의 만료 시각(KST datetime)을 계산.
+    - 가장 최신 dataTime의 다음 정시 데이터가 발행될 시각까지 유효.
+    - 시각 정보가 없으면 fetched_at + EMPTY_TTL.
+    """
+    newest = newest_data_time(items)
+    if newest is None:
+        return fetched_at + EMPTY_TTL
+    expires = newest + timedelta(hours=1) + PUBLISH_DELAY
+    # 이미 발행 시각이 지났는데도 새 데이터가 없으면(지연 발행) 잠시 뒤 다시 확인
+    if expires <= fetched_at:
+        return fetched_at + EMPTY_TTL
+    return expires
+
+
+class AirCache:
+    """
+    파일 기반 TTL 캐시 (stale-while-revalidate).
+    - key: (stationName, numOfRows, dataTerm, ver) 튜플
+    - get_or_fetch(key, fetch_fn): 캐시를 먼저 보고, 필요할 때만 fetch_fn() 호출
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR):
+        self.cache_dir = cache_dir
+        self._lock = threading.Lock()
+        self._refreshing = set()  # 이 프로세스에서 갱신 중인 key 경로
+
+    # --- 파일 경로 / 읽기 / 쓰기 ---
+    @staticmethod
+    def _digest(key):
+        return hashlib.sha1(json.dumps(list(key), ensure_ascii=False).encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, self._digest(key) + ".json")
+
+    def read(self, key):
+        """캐시 항목(dict)을 읽어서 반환. 없거나 깨졌으면 None."""
+        try:
+            with open(self._path(key), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def write(self, key, items):
+        """응답 items를 만료 시각과 함께 원자적으로 저장하고 항목을 반환."""
+        fetched_at = now_kst()
+        entry = {
+            "key": list(key),
+            "fetched_at": fetched_at.strftime("%Y-%m-%d %H:%M:%S"),
+            "expires_at": compute_expiry(items, fetched_at).strftime("%Y-%m-%d %H:%M:%S"),
+            "items": items,
+        }
+        self._store(key, entry)
+        return entry
+
+    def _store(self, key, entry):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # 임시 파일에 쓴 뒤 os.replace로 교체 → 다른 프로세스는 항상 완전한 파일만 읽음
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(entry, f, ensure_ascii=False)
+            os.replace(tmp_path, self._path(key))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def mark_refresh_failed(self, key, error):
+        """
+        백그라운드 갱신 실패를 캐시 항목에 기록 (다음에 성공한 write가 지움).
+        → 다른 세션/프로세스도 stale 데이터를 돌려줄 때 '갱신 실패'인지 평소 갱신인지 구분할 수 있음
+        """
+        entry = self.read(key)
+        if entry is None:
+            return
+        entry["refresh_failed_at"] = now_kst().strftime("%Y-%m-%d %H:%M:%S")
+        entry["refresh_error"] = f"{type(error).__name__}: {error}"
+        self._store(key, entry)
+
+    # --- 상태 판단 ---
+    @staticmethod
+    def is_fresh(entry, now=None):
+        now = now or now_kst()
+        return now < datetime.strptime(entry["expires_at"], "%Y-%m-%d %H:%M:%S")
+
+    @staticmethod
+    def is_servable(entry, now=None):
+        """만료됐더라도 MAX_STALE 이내면 stale 데이터로 즉시 보여줄 수 있음."""
+        now = now or now_kst()
+        return now - datetime.strptime(entry["fetched_at"], "%Y-%m-%d %H:%M:%S") < MAX_STALE
+
+    # --- 백그라운드 갱신 (key당 하나만) ---
+    def _acquire_refresh(self, key):
+        """프로세스 내부(set) + 프로세스 간(잠금 파일) 모두에서 갱신 권한을 얻으면 True."""
+        path = self._path(key)
+        with self._lock:
+            if path in self._refreshing:
+                return False
+            lock_path = path + ".lock"
+            try:
+                # 오래된 잠금 파일은 이전 프로세스가 죽으면서 남긴 것으로 보고 제거
+                if time.time() - os.path.getmtime(lock_path) > REFRESH_LOCK_TIMEOUT:
+                    os.remove(lock_path)
+            except OSError:
+                pass
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                os.close(os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            except FileExistsError:
+                return False
+            self._refreshing.add(path)
+            return True
+
+    def _release_refresh(self, key):
+        path = self._path(key)
+        with self._lock:
+            self._refreshing.discard(path)
+            try:
+                os.remove(path + ".lock")
+            except OSError:
+                pass
+
+    def refresh_in_background(self, key, fetch_fn):
+        """다른 곳에서 이미 갱신 중이 아니면 데몬 스레드로 fetch_fn()을 실행해 캐시를 갱신."""
+        if not self._acquire_refresh(key):
+            return None
+
+        def worker():
+            try:
+                self.write(key, fetch_fn())
+            except Exception as e:
+                # 갱신 실패 시 기존(stale) 캐시를 그대로 두고 다음 요청에서 다시 시도
+                metrics.inc('air_cache_requests_total', result='refresh_error')
+                logger.exception("캐시 백그라운드 갱신 실패: %s", key)
+                try:
+                    self.mark_refresh_failed(key, e)
+                except OSError:
+                    pass
+            finally:
+                self._release_refresh(key)
+
+        thread = threading.Thread(target=worker, name="air-cache-refresh", daemon=True)
+        thread.start()
+        return thread
+
+    def get_or_fetch(self, key, fetch_fn, wait=None, status=None):
+        """
+        캐시 조회 후 items 반환.
+        - 신선한 캐시: 그대로 반환 (네트워크 없음)
+        - 만료됐지만 MAX_STALE 이내: stale 데이터를 즉시 반환하고 백그라운드 갱신
+        - 캐시 없음/너무 오래됨: 동기적으로 fetch_fn() 호출 후 저장
+          (다른 프로세스가 받는 중이면 최대 wait초만 기다림, _fetch_shared 참고)
+        - status(dict)를 주면 {'stale': 만료된 데이터를 돌려줬는지, 'fetched_at': 받은 시각,
+          'refresh_failed': 이 항목의 마지막 백그라운드 갱신이 실패했는지}를 채움
+          (stale 데이터를 보여 줄 때 경고가 필요한지 판단하는 데 씀)
+        """
+        status = {} if status is None else status
+        entry = self.read(key)
+        if entry is not None:
+            if self.is_fresh(entry):
+                metrics.inc('air_cache_requests_total', result='fresh')
+                return self._served(entry, status, stale=False)
+            if self.is_servable(entry):
+                metrics.inc('air_cache_requests_total', result='stale')
+                self.refresh_in_background(key, fetch_fn)
+                return self._served(entry, status, stale=True)
+
+        metrics.inc('air_cache_requests_total', result='miss')
+        return self._fetch_shared(key, fetch_fn, entry, wait, status)
+
+    @staticmethod
+    def _served(entry, status, stale):
+        status['stale'] = stale
+        status['fetched_at'] = datetime.strptime(entry["fetched_at"], "%Y-%m-%d %H:%M:%S")
+        status['refresh_failed'] = "refresh_failed_at" in entry
+        return entry["items"]
+
+    def _fetch_shared(self, key, fetch_fn, entry=None, wait=None, status=None):
+        """
+        캐시가 없을 때: 다른 프로세스(레플리카)가 같은 key를 받는 중이면 그 캐시 파일을 기다려 읽고,
+        아니면 직접 받아 저장 (shared_store 임대로 프로세스 간 API 호출을 하나로 합침).
+        - wait초 안에 다른 프로세스의 결과가 오지 않으면 더 기다리지 않고 MAX_STALE보다 오래된 캐시라도
+          돌려주고, 그것도 없으면 TimeoutError (화면은 장애 때처럼 저장된 데이터로 대신 보여 줌)
+        """
+        from shared_store import MISSING, default_store
+
+        status = {} if status is None else status
+
+        def recheck():
+            fresh = self.read(key)
+            if fresh is None or not self.is_fresh(fresh):
+                return MISSING
+            return self._served(fresh, status, stale=False)
+
+        def fetch_and_write():
+            return self._served(self.write(key, fetch_fn()), status, stale=False)
+
+        def on_timeout():
+            if entry is not None and entry.get("items"):
+                return self._served(entry, status, stale=True)
+            raise TimeoutError("다른 프로세스가 같은 측정값을 받는 중이라 기다리지 않았습니다")
+
+        return default_store.coalesce("api:" + self._digest(key), fetch_and_write, recheck,
+                                      wait=wait, on_timeout=on_timeout if wait is not None else None)
+
+
+class SingleFlight:
+    """
+    같은 key에 대한 동시 호출을 하나로 합침 (single-flight).
+    - 먼저 온 호출(leader)만 fn()을 실행하고, 실행 중에 들어온 같은 key 호출은 그 결과(또는 예외)를 함께 받음
+    - 호출이 끝나면 key를 지우므로 결과를 보관하지는 않음 (보관은 AirCache 몫)
+    - stats(): {'leader': 실제 실행 수, 'shared': 결과를 나눠 받은 수}
+    """
+
+    def __init__(self, name="api"):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls = {}  # key -> [Event, 결과, 예외]
+        self._stats = {'leader': 0, 'shared': 0}
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = [threading.Event(), None, None]
+            self._stats['leader' if leader else 'shared'] += 1
+        metrics.inc('air_singleflight_total', flight=self.name, role='leader' if leader else 'shared')
+
+        if not leader:
+            call[0].wait()
+            if call[2] is not None:
+                raise call[2]
+            return call[1]
+
+        try:
+            call[1] = fn()
+        except BaseException as e:
+            call[2] = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call[0].set()
+        return call[1]
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats)
+
+
+# 프로세스 전체에서 함께 쓰는 기본 캐시
+default_cache = AirCache()
@@ -0,0 +1,318 @@
+# ===== 측정값 일괄 파서 =====
+# API items(여러 측정소 가능)를 한 번에 열(column) 단위 numpy 배열로 바꾼다.
+# - 시간: datetime64[m] 배열 (strptime 반복 대신 문자열 배열 전체를 한 번에 변환)
+# - 농도: pm10/pm25/o3/no2/co/so2 float 배열 ('-', 빈 값, None → NaN)
+# - station: 측정소 이름 배열
+# - pm10_flag/pm25_flag: API 품질 플래그(통신장애, 장비점검 등)가 붙은 행 (값은 NaN으로 바꿔 쓰지 않음)
+# hourly_grid는 한 측정소 값을 1시간 간격 격자(NaN = 값 없음)로 맞추고 빈 시간 채우기와 품질 집계를 함께 한다.
+import numpy as np
+
+# 열 이름 -> API 응답 키
+POLLUTANT_KEYS = {
+    'pm10': 'pm10Value',
+    'pm25': 'pm25Value',
+    'o3': 'o3Value',
+    'no2': 'no2Value',
+    'co': 'coValue',
+    'so2': 'so2Value',
+}
+POLLUTANTS = tuple(POLLUTANT_KEYS)
+# 열 이름 -> API 품질 플래그 키 (값이 있으면 그 시간 측정값은 신뢰할 수 없음)
+FLAG_KEYS = {
+    'pm10': 'pm10Flag',
+    'pm25': 'pm25Flag',
+}
+# hourly_grid의 빈 시간 채우기 방식
+GAP_FILLS = ('leave', 'interpolate', 'ffill')
+# 이보다 긴 빈 구간(시간)은 채우지 않음 (긴 장애 구간을 그럴듯한 값으로 덮지 않도록)
+MAX_FILL_GAP = 3
+
+# 숫자로 볼 수 없는 값 표기 (에어코리아는 결측을 '-'로 줌)
+_MISSING_TOKENS = ('', '-', 'None', 'null')
+
+
+def _to_float_array(raw):
+    """문자열 리스트를 float 배열로 변환. 숫자가 아닌 값은 NaN."""
+    arr = np.array(raw, dtype=str)
+    arr[np.isin(arr, _MISSING_TOKENS)] = 'nan'
+    try:
+        return arr.astype(np.float64)
+    except ValueError:
+        # 예상 못 한 문자열(예: '점검중')이 섞인 드문 경우에만 한 개씩 변환
+        out = np.full(len(arr), np.nan)
+        for i, s in enumerate(arr):
+            try:
+                out[i] = float(s)
+            except ValueError:
+                pass
+        return out
+
+
+def _to_datetime64(raw):
+    """
+    dataTime 문자열 리스트를 datetime64[m] 배열로 변환. 읽을 수 없는 값은 NaT.
+    - "2025-12-05 20:00"와 "202512052000" 두 형식 지원
+    - "24:00"은 다음 날 00:00으로 변환
+    """
+    n = len(raw)
+    if n == 0:
+        return np.array([], dtype='datetime64[m]')
+
+    # 문자 단위 (n, 16) 배열로 보고 형식을 한꺼번에 검사/변환
+    arr = np.char.ljust(np.char.strip(np.array(raw, dtype='U16')), 16)
+    chars = arr.view('U1').reshape(n, 16).copy()
+
+    # 압축 형식(YYYYMMDDHHMM, 12자리)은 표준 형식(YYYY-MM-DD HH:MM) 자리로 옮김
+    compact = (chars[:, 12] == ' ') & (chars[:, 11] != ' ')
+    if compact.any():
+        src = chars[compact].copy()
+        dst = np.full_like(src, ' ')
+        dst[:, 0:4] = src[:, 0:4]
+        dst[:, 4] = '-'
+        dst[:, 5:7] = src[:, 4:6]
+        dst[:, 7] = '-'
+        dst[:, 8:10] = src[:, 6:8]
+        dst[:, 10] = ' '
+        dst[:, 11:13] = src[:, 8:10]
+        dst[:, 13] = ':'
+        dst[:, 14:16] = src[:, 10:12]
+        chars[compact] = dst
+
+    digit_cols = [0, 1, 2, 3, 5, 6, 8, 9, 11, 12, 14, 15]
+    digits = chars[:, digit_cols]
+    valid = ((digits >= '0') & (digits <= '9')).all(axis=1)
+    valid &= (chars[:, 4] == '-') & (chars[:, 7] == '-') & (chars[:, 10] == ' ') & (chars[:, 13] == ':')
+
+    # 24:00 → 00:00 으로 바꾸고 나중에 하루를 더함
+    is_24 = valid & (chars[:, 11] == '2') & (chars[:, 12] == '4') & (chars[:, 14] == '0') & (chars[:, 15] == '0')
+    chars[is_24, 11] = '0'
+    chars[is_24, 12] = '0'
+    chars[:, 10] = 'T'  # numpy datetime64가 읽는 ISO 형식
+
+    iso = chars.copy().view('U16').reshape(n)
+    out = np.full(n, np.datetime64('NaT'), dtype='datetime64[m]')
+    try:
+        out[valid] = iso[valid].astype('datetime64[m]')
+    except ValueError:
+        # 형식은 맞지만 날짜가 잘못된 값(예: 13월)이 있으면 해당 값만 NaT 처리
+        for i in np.flatnonzero(valid):
+            try:
+                out[i] = np.datetime64(iso[i], 'm')
+            except ValueError:
+                pass
+    out[is_24] += np.timedelta64(1, 'D')
+    return out
+
+
+def parse_stations(items_by_station, report=None):
+    """
+    여러 측정소의 items를 한 번에 열 단위 구조로 변환.
+    - items_by_station: {측정소 이름: items} (airkorea.fetch_all_stations 결과 그대로 사용 가능)
+    - 반환: {'station': str 배열, 'time': datetime64[m] 배열, 'pm10': float 배열, ...,
+             'pm10_flag': bool 배열, 'pm25_flag': bool 배열}
+      측정소, 시간 오름차순으로 정렬되며 시간을 읽을 수 없는 행은 제외.
+      품질 플래그가 붙은 값은 NaN.
+    - report: dict를 주면 측정소별 {'rows': 받은 행 수, 'bad_time': 시간을 읽지 못해 뺀 행 수}를 채움
+    """
+    stations = []
+    times = []
+    raw = {name: [] for name in POLLUTANTS}
+    raw_flags = {name: [] for name in FLAG_KEYS}
+
+    # 파이썬 루프는 값을 모으는 한 번뿐, 변환은 모두 배열 단위로 처리
+    for station, items in items_by_station.items():
+        for it in items or []:
+            stations.append(station)
+            times.append(it.get('dataTime') or '')
+            for name, key in POLLUTANT_KEYS.items():
+                val = it.get(key)
+                raw[name].append('' if val is None else str(val).strip())
+            for name, key in FLAG_KEYS.items():
+                flag = it.get(key)
+                raw_flags[name].append('' if flag is None else str(flag).strip())
+
+    frame = {
+        'station': np.array(stations, dtype=str),
+        'time': _to_datetime64(times),
+    }
+    for name in POLLUTANTS:
+        frame[name] = _to_float_array(raw[name])
+    for name in FLAG_KEYS:
+        flagged = ~np.isin(np.array(raw_flags[name], dtype=str), _MISSING_TOKENS)
+        frame[name][flagged] = np.nan
+        frame[name + '_flag'] = flagged
+
+    keep = ~np.isnat(frame['time'])
+    if report is not None:
+        for name in np.unique(frame['station']).tolist():
+            in_station = frame['station'] == name
+            report[name] = {'rows': int(in_station.sum()), 'bad_time': int((in_station & ~keep).sum())}
+    order = np.lexsort((frame['time'][keep], frame['station'][keep]))
+    return {col: arr[keep][order] for col, arr in frame.items()}
+
+
+def parse_items(items, station=''):
+    """한 측정소의 items를 parse_stations와 같은 열 단위 구조로 변환."""
+    return parse_stations({station: items})
+
+
+def concat_frames(frames):
+    """
+    여러 frame(예: 페이지별로 파싱한 결과)을 하나로 합침.
+    - 측정소 → 시간 순으로 다시 정렬하고, 같은 (측정소, 시간)은 처음 것만 남김
+    """
+    frames = [f for f in frames if len(f['time'])]
+    if not frames:
+        return parse_stations({})
+    if len(frames) == 1:
+        return frames[0]
+    frame = {col: np.concatenate([f[col] for f in frames]) for col in frames[0]}
+    order = np.lexsort((frame['time'], frame['station']))
+    frame = {col: arr[order] for col, arr in frame.items()}
+    station, time = frame['station'], frame['time']
+    keep = np.ones(len(time), dtype=bool)
+    keep[1:] = (station[1:] != station[:-1]) | (time[1:] != time[:-1])
+    return {col: arr[keep] for col, arr in frame.items()}
+
+
+def select_series(frame, pollutant='pm10', station=None, dropna=True):
+    """
+    열 단위 구조에서 (시간 배열, 값 배열)을 꺼냄.
+    - station: 측정소 이름 (None이면 전체 행)
+    - dropna: True면 값이 NaN인 시간은 제외
+    """
+    mask = np.ones(len(frame['time']), dtype=bool)
+    if station is not None:
+        mask &= frame['station'] == station
+    if dropna:
+        mask &= ~np.isnan(frame[pollutant])
+    return frame['time'][mask], frame[pollutant][mask]
+
+
+def to_hourly_matrix(frame, pollutant='pm10', stations=None, start=None, end=None):
+    """
+    열 단위 구조를 정시 간격 (측정소 × 시간) 행렬로 펼침. 값이 없는 칸은 NaN.
+    - stations: 행 순서 (None이면 frame에 있는 측정소를 이름순으로)
+    - start/end: 시간 축 범위 (None이면 frame의 최소/최대 시각)
+    - 반환: (측정소 배열, datetime64[h] 시간 축, 행렬)
+    """
+    times = frame['time'].astype('datetime64[h]')
+    if stations is None:
+        stations = np.unique(frame['station'])
+    stations = np.asarray(stations, dtype=str)
+    if len(times) == 0 and (start is None or end is None):
+        return stations, np.array([], dtype='datetime64[h]'), np.full((len(stations), 0), np.nan)
+
+    start = np.datetime64(start, 'h') if start is not None else times.min()
+    end = np.datetime64(end, 'h') if end is not None else times.max()
+    grid = np.arange(start, end + np.timedelta64(1, 'h'), dtype='datetime64[h]')
+    matrix = np.full((len(stations), len(grid)), np.nan)
+    if len(stations) == 0:
+        return stations, grid, matrix
+
+    # 측정소 이름 → 행 번호, 시각 → 열 번호를 배열 연산으로 구해 한 번에 채움
+    order = np.argsort(stations)
+    pos = np.clip(np.searchsorted(stations[order], frame['station']), 0, len(stations) - 1)
+    row_ok = stations[order][pos] == frame['station']
+    col = (times - start).astype(np.int64)
+    keep = row_ok & (col >= 0) & (col < len(grid))
+    matrix[order[pos[keep]], col[keep]] = frame[pollutant][keep]
+    return stations, grid, matrix
+
+
+def last_valid(matrix):
+    """(측정소 × 시간) 행렬에서 각 행의 마지막 유효값 (없으면 NaN)."""
+    if matrix.shape[1] == 0:
+        return np.full(matrix.shape[0], np.nan)
+    idx = np.where(~np.isnan(matrix), np.arange(matrix.shape[1]), -1).max(axis=1)
+    return np.where(idx >= 0, matrix[np.arange(matrix.shape[0]), np.maximum(idx, 0)], np.nan)
+
+
+def _gap_runs(missing):
+    """bool 배열에서 연속된 True 구간마다 (시작, 길이) 배열."""
+    padded = np.concatenate([[False], missing, [False]])
+    change = np.flatnonzero(padded[1:] != padded[:-1])
+    starts, ends = change[::2], change[1::2]
+    return starts, ends - starts
+
+
+def hourly_grid(frame, pollutant='pm10', station=None, fill='leave', max_gap=MAX_FILL_GAP,
+                start=None, end=None):
+    """
+    한 측정소 값을 1시간 간격 격자에 맞춘 NaN 배열로 변환하고 품질을 집계.
+    - station: 측정소 이름 (None이면 frame 전체를 한 측정소로 봄)
+    - fill: 'leave'(그대로 NaN), 'interpolate'(앞뒤 측정값 사이 선형 보간), 'ffill'(직전 측정값)
+      max_gap시간 이하인 빈 구간만 채움. 앞뒤에 측정값이 없는 구간은 채우지 않음
+    - start/end: 격자 범위 (None이면 첫/마지막 측정값 시각 → 값이 나오기 전/후의 빈 시간은 격자에서 제외)
+    - 반환 dict:
+        time: datetime64[h] 격자, values: float 배열 (NaN = 값 없음),
+        observed: 실제 측정값이 있는 칸, filled: 채운 칸,
+        quality: {'rows', 'observed', 'missing', 'flagged', 'duplicates', 'gaps', 'filled'}
+          missing  = 행은 있지만 값이 '-' 등인 수, flagged = 품질 플래그로 뺀 수,
+          duplicates = 같은 시각에 두 번 이상 온 행 수, gaps = 격자에서 행 자체가 없는 시간 수
+    """
+    if fill not in GAP_FILLS:
+        raise ValueError(f"알 수 없는 채우기 방식: {fill} (가능한 값: {', '.join(GAP_FILLS)})")
+    rows = np.ones(len(frame['time']), dtype=bool) if station is None else frame['station'] == station
+    times = frame['time'][rows].astype('datetime64[h]')
+    values = frame[pollutant][rows]
+    flag_col = frame.get(pollutant + '_flag')
+    flagged = flag_col[rows] if flag_col is not None else np.zeros(len(values), dtype=bool)
+    valid = ~np.isnan(values)
+
+    quality = {
+        'rows': int(len(values)),
+        'observed': 0,
+        'missing': int((~valid & ~flagged).sum()),
+        'flagged': int(flagged.sum()),
+        'duplicates': int(len(times) - len(np.unique(times))),
+        'gaps': 0,
+        'filled': 0,
+    }
+    if valid.any() or (start is not None and end is not None):
+        start = np.datetime64(start, 'h') if start is not None else times[valid].min()
+        end = np.datetime64(end, 'h') if end is not None else times[valid].max()
+        grid = np.arange(start, end + np.timedelta64(1, 'h'), dtype='datetime64[h]')
+    else:
+        grid = np.array([], dtype='datetime64[h]')
+
+    out = np.full(len(grid), np.nan)
+    has_row = np.zeros(len(grid), dtype=bool)
+    col = (times - grid[0]).astype(np.int64) if len(grid) else np.array([], dtype=np.int64)
+    inside = (col >= 0) & (col < len(grid))
+    has_row[col[inside]] = True
+    # 같은 시각이 여러 번이면 유효한 값이 있는 행을 우선 (유효값끼리는 나중 행)
+    order = np.argsort(valid[inside], kind='stable')
+    out[col[inside][order]] = values[inside][order]
+    observed = ~np.isnan(out)
+    quality['observed'] = int(observed.sum())
+    quality['gaps'] = int((~has_row).sum())
+
+    filled = np.zeros(len(grid), dtype=bool)
+    if fill != 'leave' and observed.any():
+        run_starts, run_lengths = _gap_runs(~observed)
+        # 앞뒤가 모두 측정값인(격자 안쪽) max_gap 이하 구간만 채움
+        ok = (run_starts > 0) & (run_starts + run_lengths < len(grid)) & (run_lengths <= max_gap)
+        for run_start, length in zip(run_starts[ok], run_lengths[ok]):
+            filled[run_start:run_start + length] = True
+        idx = np.arange(len(grid))
+        if fill == 'interpolate':
+            out[filled] = np.interp(idx[filled], idx[observed], out[observed])
+        else:
+            last_obs = np.maximum.accumulate(np.where(observed, idx, 0))
+            out[filled] = out[last_obs[filled]]
+    quality['filled'] = int(filled.sum())
+    return {'time': grid, 'values': out, 'observed': observed, 'filled': filled, 'quality': quality}
+
+
+def quality_report(frame, pollutant='pm10', fill='leave', parse_report=None):
+    """
+    측정소별 품질 집계 {측정소: hourly_grid의 quality + 'bad_time'}.
+    - parse_report: parse_stations(report=...)로 모은 값 (시간을 읽지 못해 뺀 행 수를 더함)
+    """
+    report = {}
+    for station in np.unique(frame['station']).tolist():
+        counters = dict(hourly_grid(frame, pollutant, station=station, fill=fill)['quality'])
+        counters['bad_time'] = (parse_report or {}).get(station, {}).get('bad_time', 0)
+        report[station] = counters
+    return report
@@ -0,0 +1,236 @@
+# ===== 로컬 시계열 저장소 (SQLite) =====
+# 측정소별 시간 단위 측정값을 디스크에 쌓아 두고, 새로 필요한 시간만 API에서 받아 온다.
+# - 테이블: readings(station, time, pm10, pm25, o3, no2, co, so2)
+#   (station, time)이 기본 키이며 이미 있는 시간은 덮어쓰지 않음 (append-only).
+#   단, 저장할 때 비어 있던(NULL) 항목은 나중에 받은 값으로 채운다.
+# - 장기 분석/예측은 load_frame()으로 로컬 디스크에서 바로 읽는다.
+import os
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from air_cache import now_kst
+from air_parse import POLLUTANTS, parse_stations
+from airkorea import iter_air_pages
+from stations import all_station_names
+
+STORE_PATH = os.environ.get(
+    "AIR_STORE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "air_store.sqlite3"),
+)
+
+# 처음 동기화하는 측정소는 이 시간만큼 과거까지 채움 (3MONTH 조회 범위)
+INITIAL_BACKFILL_HOURS = 24 * 90
+# 한 번에 요청할 행 수 (pageNo와 함께 페이지 단위로 받음)
+PAGE_SIZE = 100
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS readings (
+    station TEXT NOT NULL,
+    time TEXT NOT NULL,
+    {", ".join(f"{name} REAL" for name in POLLUTANTS)},
+    PRIMARY KEY (station, time)
+) WITHOUT ROWID
+"""
+
+# 이미 있는 행은 비어 있던 항목만 채움 (기존 값은 유지)
+_UPSERT = f"""
+INSERT INTO readings (station, time, {", ".join(POLLUTANTS)})
+VALUES (?, ?, {", ".join("?" for _ in POLLUTANTS)})
+ON CONFLICT (station, time) DO UPDATE SET
+    {", ".join(f"{name} = COALESCE(readings.{name}, excluded.{name})" for name in POLLUTANTS)}
+"""
+
+
+def data_term_for(hours):
+    """필요한 시간 수에 맞는 가장 짧은 dataTerm을 고름 (DAILY/MONTH/3MONTH)."""
+    if hours <= 24:
+        return 'DAILY'
+    if hours <= 24 * 31:
+        return 'MONTH'
+    return '3MONTH'
+
+
+class AirStore:
+    """측정소별 시간 단위 측정값을 보관하는 SQLite 저장소."""
+
+    def __init__(self, path=STORE_PATH):
+        self.path = path
+        self._local = threading.local()  # sqlite 연결은 스레드마다 따로 사용
+
+    def connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")  # 쓰는 중에도 다른 프로세스가 읽을 수 있게
+            conn.execute(_SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    # --- 쓰기 ---
+    def append_frame(self, frame):
+        """air_parse 열 단위 구조(frame)를 저장하고 처리한 행 수를 반환."""
+        n = len(frame['time'])
+        if n == 0:
+            return 0
+        times = np.datetime_as_string(frame['time'], unit='m')
+        columns = [frame[name].astype(object) for name in POLLUTANTS]
+        for col in columns:
+            col[np.isnan(col.astype(np.float64))] = None  # NaN -> NULL
+        rows = zip(frame['station'].tolist(), times.tolist(), *(col.tolist() for col in columns))
+        conn = self.connect()
+        with conn:
+            conn.executemany(_UPSERT, rows)
+        return n
+
+    def append_items(self, station, items):
+        """API items 그대로 저장 (main.py에서 받은 응답을 버리지 않고 쌓아 둘 때 사용)."""
+        return self.append_frame(parse_stations({station: items}))
+
+    # --- 읽기 ---
+    def last_time(self, station):
+        """측정소의 마지막 저장 시각(datetime64[m]). 없으면 None."""
+        row = self.connect().execute(
+            "SELECT MAX(time) FROM readings WHERE station = ?", (station,)
+        ).fetchone()
+        return np.datetime64(row[0], 'm') if row and row[0] else None
+
+    @staticmethod
+    def _where(stations, start, end):
+        """측정소/기간 조건 → (' WHERE ...' 또는 '', 인자)."""
+        where = []
+        params = []
+        if stations is not None:
+            stations = list(stations)
+            where.append(f"station IN ({', '.join('?' for _ in stations)})")
+            params.extend(stations)
+        if start is not None:
+            where.append("time >= ?")
+            params.append(str(np.datetime64(start, 'm')))
+        if end is not None:
+            where.append("time <= ?")
+            params.append(str(np.datetime64(end, 'm')))
+        return (" WHERE " + " AND ".join(where) if where else ""), params
+
+    @classmethod
+    def _select(cls, stations, start, end, columns):
+        """측정소/기간 조건으로 (station, time, columns...)를 읽는 SQL과 인자."""
+        unknown = [c for c in columns if c not in POLLUTANTS]
+        if unknown:
+            raise ValueError(f"알 수 없는 항목: {', '.join(unknown)}")
+        where, params = cls._where(stations, start, end)
+        sql = f"SELECT station, time, {', '.join(columns)} FROM readings{where} ORDER BY station, time"
+        return sql, params
+
+    def count_rows(self, stations=None, start=None, end=None):
+        """조건에 맞는 행 수 (내보내기 전에 크기를 확인할 때 사용)."""
+        where, params = self._where(stations, start, end)
+        return self.connect().execute(f"SELECT COUNT(*) FROM readings{where}", params).fetchone()[0]
+
+    def iter_rows(self, stations=None, start=None, end=None, columns=POLLUTANTS, chunk_size=5000):
+        """
+        조건에 맞는 행을 chunk_size개씩 튜플 리스트로 yield (측정소, 시간 오름차순).
+        - 전체를 메모리에 올리지 않으므로 몇 달 × 수백 측정소 내보내기에도 메모리가 일정함
+        - 행: (station, 'YYYY-MM-DDTHH:MM', 값...) / 빈 값은 None
+        """
+        sql, params = self._select(stations, start, end, list(columns))
+        cursor = self.connect().execute(sql, params)
+        try:
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    return
+                yield rows
+        finally:
+            cursor.close()
+
+    def stations(self):
+        """저장된 측정소 이름 목록 (가나다순)."""
+        return [r[0] for r in self.connect().execute("SELECT DISTINCT station FROM readings ORDER BY station")]
+
+    def load_frame(self, stations=None, start=None, end=None):
+        """
+        저장된 값을 air_parse와 같은 열 단위 구조로 읽어 옴 (측정소, 시간 오름차순).
+        - stations: 측정소 이름 목록 (None이면 전체)
+        - start/end: datetime 또는 datetime64 (포함 범위). None이면 제한 없음.
+        """
+        sql, params = self._select(stations, start, end, POLLUTANTS)
+        rows = self.connect().execute(sql, params).fetchall()
+
+        frame = {
+            'station': np.array([r[0] for r in rows], dtype=str),
+            'time': np.array([r[1] for r in rows], dtype='datetime64[m]'),
+        }
+        values = np.array([r[2:] for r in rows], dtype=np.float64).reshape(len(rows), len(POLLUTANTS))
+        for i, name in enumerate(POLLUTANTS):
+            frame[name] = values[:, i]  # NULL(None)은 float 변환 시 NaN
+        return frame
+
+    # --- 증분 동기화 ---
+    def fetch_new_items(self, station, now=None, page_size=PAGE_SIZE):
+        """
+        마지막 저장 시각 이후의 items만 페이지 단위로 받아 옴.
+        - 응답은 최신순이므로 이미 저장된 시각이 나오거나 마지막 페이지면 멈춘다.
+        """
+        now = now or now_kst()
+        last = self.last_time(station)
+        if last is None:
+            hours = INITIAL_BACKFILL_HOURS
+        else:
+            hours = int((np.datetime64(now, 'm') - last) / np.timedelta64(1, 'h'))
+            if hours < 1:
+                return []
+        data_term = data_term_for(hours)
+
+        collected = []
+        for page in iter_air_pages(station, data_term=data_term, max_rows=hours, page_size=page_size):
+            collected.extend(page)
+            if last is not None:
+                oldest = parse_stations({station: page[-1:]})['time']
+                if len(oldest) and oldest[0] <= last:
+                    break
+        return collected
+
+    def sync_station(self, station, now=None):
+        """한 측정소를 증분 동기화하고 새로 저장된 행 수를 반환."""
+        last = self.last_time(station)
+        frame = parse_stations({station: self.fetch_new_items(station, now=now)})
+        if last is not None:
+            # 이미 있는 시간은 다시 쓰지 않음
+            keep = frame['time'] > last
+            frame = {col: arr[keep] for col, arr in frame.items()}
+        return self.append_frame(frame)
+
+    def sync_all(self, stations=None, max_workers=4, now=None):
+        """
+        여러 측정소를 동시에 증분 동기화.
+        - 반환: (added, errors) = ({측정소: 새로 저장된 행 수}, {측정소: 예외})
+        """
+        if stations is None:
+            stations = all_station_names()
+        stations = list(dict.fromkeys(stations))
+        added = {}
+        errors = {}
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="air-sync") as pool:
+            futures = {name: pool.submit(self.sync_station, name, now) for name in stations}
+            for name, future in futures.items():
+                try:
+                    added[name] = future.result()
+                except Exception as e:
+                    errors[name] = e
+        return added, errors
+
+
+# 프로세스 전체에서 함께 쓰는 기본 저장소
+default_store = AirStore()
+
+
+if __name__ == "__main__":
+    # 예: python air_store.py  → 전체 측정소 증분 동기화 (cron 등에서 실행)
+    added, errors = default_store.sync_all()
+    print(f"동기화 완료: 측정소 {len(added)}곳, 새 행 {sum(added.values())}개, 실패 {len(errors)}곳")
+    for name, e in errors.items():
+        print(f"  - {name}: {e}")
@@ -0,0 +1,353 @@
+# ===== 에어코리아(공공데이터 포털) API 호출 모듈 =====
+# main.py와 다른 페이지/스크립트가 함께 쓰도록 Streamlit 없이 동작하는 함수만 둔다.
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import metrics
+from air_cache import SingleFlight, default_cache
+from stations import all_station_names
+
+# ===== API 키 (공공데이터 포털) =====
+API_KEY = os.environ.get(
+    "AIRKOREA_API_KEY",
+    "aea45d5692f9dc0fb20ff49e2cf104f6614d3a17df9e92420974a5defb3cd75e",
+)
+# -> 실제 운영 시에는 하드코딩보다 환경변수나 비밀 관리 사용 권장
+
+# 서버 주소는 환경변수로 바꿀 수 있음 (예: 부하/성능 테스트용 mock_airkorea.py 서버)
+#   AIRKOREA_BASE_URL=http://127.0.0.1:8765 streamlit run main.py
+BASE_URL = os.environ.get("AIRKOREA_BASE_URL", "https://apis.data.go.kr").rstrip("/")
+SERVICE_PATH = "/B552584/ArpltnInforInqireSvc/getMsrstnAcctoRltmMesureDnsty"
+URL = BASE_URL + SERVICE_PATH
+# 측정소 정보(이름/주소/좌표) 목록 API (station_catalog.py에서 사용)
+STATION_INFO_PATH = "/B552584/MsrstnInfoInqireSvc/getMsrstnList"
+STATION_INFO_URL = BASE_URL + STATION_INFO_PATH
+
+
+def set_base_url(base_url):
+    """실행 중에 API 서버 주소를 바꿈 (벤치마크/테스트 스크립트에서 mock 서버를 가리킬 때)."""
+    global URL, STATION_INFO_URL
+    URL = base_url.rstrip("/") + SERVICE_PATH
+    STATION_INFO_URL = base_url.rstrip("/") + STATION_INFO_PATH
+
+# ===== 공유 HTTP 세션 (연결 재사용) =====
+# 호출마다 새 TCP/TLS 연결을 맺지 않도록 프로세스 전체에서 세션 하나를 함께 쓴다.
+POOL_SIZE = 16
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """연결 풀이 설정된 공유 requests.Session을 반환 (처음 호출 시 생성)."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+        return _session
+
+
+def request_air_data(station_name, num_rows=24, data_term='DAILY', ver='1.3', page_no=1, timeout=10):
+    """
+    캐시를 거치지 않고 API를 직접 호출해 JSON 아이템 리스트 반환.
+    - page_no: 페이지 번호 (num_rows개씩 나눠 받을 때 사용, 1부터 시작)
+    - timeout: 요청 타임아웃(초). 재시도/시간 예산은 request_with_retry가 담당
+    - 주의: HTTP 응답 코드가 200이 아니면 requests.raise_for_status()가 예외를 던짐.
+    """
+    params = {
+        'serviceKey': API_KEY,
+        'returnType': 'json',
+        'numOfRows': num_rows,
+        'pageNo': page_no,
+        'stationName': station_name,
+        'dataTerm': data_term,
+        'ver': ver
+    }
+
+    metrics.inc('air_api_requests_total')
+    started = time.perf_counter()
+    try:
+        r = get_session().get(URL, params=params, timeout=timeout)
+        r.raise_for_status()  # HTTP 에러(4xx/5xx)면 예외 발생
+        data = r.json()  # JSON -> 파이썬 dict
+
+        # 응답 구조: response -> body -> items (list)
+        items = data['response']['body']['items']
+    except Exception as e:
+        metrics.inc('air_api_errors_total', kind=error_kind(e))
+        raise
+    finally:
+        metrics.observe('air_api_request_duration_seconds', time.perf_counter() - started)
+    return items
+
+
+def request_station_info(page_no=1, num_rows=1000):
+    """
+    측정소 정보 목록(getMsrstnList) 한 페이지를 받아 (items, 전체 개수) 반환.
+    - 항목: stationName, addr, dmX(위도), dmY(경도) 등
+    """
+    params = {
+        'serviceKey': API_KEY,
+        'returnType': 'json',
+        'numOfRows': num_rows,
+        'pageNo': page_no,
+    }
+    r = get_session().get(STATION_INFO_URL, params=params, timeout=10)
+    r.raise_for_status()
+    body = r.json()['response']['body']
+    return body['items'], int(body.get('totalCount') or 0)
+
+
+def error_kind(e):
+    """예외를 계측용 오류 종류 문자열로 분류 (timeout/connection/http/response)."""
+    if isinstance(e, requests.Timeout):
+        return 'timeout'
+    if isinstance(e, requests.ConnectionError):
+        return 'connection'
+    if isinstance(e, requests.HTTPError):
+        return 'http'
+    return 'response'  # JSON 형식 오류, 예상과 다른 응답 구조 등
+
+
+# ===== 재시도 / 시간 예산 / 서킷 브레이커 =====
+# data.go.kr은 정시 직후에 자주 느려지거나 5xx를 돌려준다.
+# - 요청 하나가 쓸 수 있는 전체 시간(LATENCY_BUDGET) 안에서만 지수 백오프로 재시도
+# - 연속 실패가 BREAKER_THRESHOLD번이면 BREAKER_COOLDOWN초 동안 호출하지 않고 바로 실패(CircuitOpenError)
+LATENCY_BUDGET = float(os.environ.get("AIRKOREA_LATENCY_BUDGET", "4.0"))
+ATTEMPT_TIMEOUT = 3.0   # 한 번의 시도에 쓰는 최대 시간(초)
+MAX_RETRIES = 2
+BACKOFF_BASE = 0.25     # 첫 재시도 전 대기(초), 이후 2배씩 (±50% 무작위)
+BREAKER_THRESHOLD = 5
+BREAKER_COOLDOWN = 30.0
+
+
+class CircuitOpenError(Exception):
+    """서킷 브레이커가 열려 있어 API를 호출하지 않고 바로 실패함."""
+
+
+class CircuitBreaker:
+    """
+    연속 실패 횟수 기반 서킷 브레이커 (스레드 안전).
+    - closed: 정상 호출 / open: cooldown 동안 바로 실패 / half_open: cooldown 뒤 시험 호출 하나만 허용
+    """
+
+    def __init__(self, threshold=BREAKER_THRESHOLD, cooldown=BREAKER_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._trial_running = False
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._opened_at is None:
+                return 'closed'
+            if time.monotonic() - self._opened_at < self.cooldown:
+                return 'open'
+            return 'half_open'
+
+    def allow(self):
+        """지금 호출해도 되면 True (half_open에서는 한 호출만 통과)."""
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.cooldown or self._trial_running:
+                return False
+            self._trial_running = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_running = False
+            if self._opened_at is not None or self._failures >= self.threshold:
+                self._opened_at = time.monotonic()  # 시험 호출 실패 시 cooldown 다시 시작
+
+
+breaker = CircuitBreaker()
+
+
+def is_retryable(e):
+    """타임아웃/연결 오류/5xx/429는 다시 시도할 만한 오류."""
+    if isinstance(e, (requests.Timeout, requests.ConnectionError)):
+        return True
+    if isinstance(e, requests.HTTPError) and e.response is not None:
+        return e.response.status_code >= 500 or e.response.status_code == 429
+    return False
+
+
+def request_with_retry(station_name, num_rows=24, data_term='DAILY', ver='1.3',
+                       budget=LATENCY_BUDGET, retries=MAX_RETRIES, page_no=1):
+    """
+    request_air_data를 시간 예산(budget초) 안에서 재시도하며 호출.
+    - 예산을 다 쓰거나 재시도할 수 없는 오류면 마지막 예외를 그대로 던짐
+    - 브레이커가 열려 있으면 네트워크 없이 CircuitOpenError
+    """
+    deadline = time.monotonic() + budget
+    for attempt in range(retries + 1):
+        if not breaker.allow():
+            metrics.inc('air_api_errors_total', kind='circuit_open')
+            raise CircuitOpenError("에어코리아 API 호출이 잠시 중단되었습니다 (연속 실패).")
+        remaining = deadline - time.monotonic()
+        try:
+            items = request_air_data(station_name, num_rows, data_term, ver, page_no=page_no,
+                                     timeout=max(0.1, min(ATTEMPT_TIMEOUT, remaining)))
+        except Exception as e:
+            if not is_retryable(e):
+                breaker.record_success()  # 서버는 응답했음 (요청/응답 내용 문제)
+                raise
+            breaker.record_failure()
+            delay = BACKOFF_BASE * (2 ** attempt) * random.uniform(0.5, 1.5)
+            if attempt == retries or time.monotonic() + delay >= deadline:
+                raise
+            metrics.inc('air_api_retries_total')
+            time.sleep(delay)
+        else:
+            breaker.record_success()
+            return items
+
+
+# 진행 중인 API 호출 (key가 같으면 하나로 합침). inflight.stats()로 합쳐진 횟수 확인
+inflight = SingleFlight("air_data")
+
+
+def cache_key(station_name, num_rows=24, data_term='DAILY', ver='1.3'):
+    """fetch_air_data가 공유 캐시에서 쓰는 key (미리 받아 두는 prefetch.py도 같은 key로 저장)."""
+    return (station_name, int(num_rows), data_term, ver)
+
+
+def fetch_air_data(station_name, num_rows=24, data_term='DAILY', ver='1.3', use_cache=True,
+                   budget=LATENCY_BUDGET, status=None):
+    """
+    주어진 측정소 이름(station_name)에 대해 실시간 측정값을 요청하여 JSON 아이템 리스트 반환.
+    - num_rows: 요청할 항목 개수 (여기선 24로 고정 사용)
+    - API 엔드포인트: getMsrstnAcctoRltmMesureDnsty
+    - use_cache: True면 (stationName, numOfRows, dataTerm, ver) 기준 공유 캐시를 먼저 확인.
+      만료된 캐시는 즉시 돌려주고 백그라운드에서 한 번만 갱신한다.
+    - 캐시 사용 여부와 관계없이 같은 key의 동시 API 호출은 하나로 합쳐진다 (inflight).
+    - API 호출은 budget초 안에서 재시도하고, 서킷 브레이커가 열려 있으면 바로 실패한다.
+    - status(dict)를 주면 캐시에서 만료된 데이터를 돌려줬는지(stale), 받은 시각(fetched_at),
+      마지막 백그라운드 갱신 실패 여부(refresh_failed), 서킷 브레이커가 열려 있는지(circuit_open)를 채움
+    """
+    key = cache_key(station_name, num_rows, data_term, ver)
+    # 같은 측정소/조건의 동시 요청(정시 직후 여러 세션이 동시에 클릭 등)은 API 호출 하나를 함께 기다림
+    def fetch():
+        return inflight.do(key, lambda: request_with_retry(station_name, num_rows, data_term, ver, budget=budget))
+
+    if not use_cache:
+        return fetch()
+    # 캐시가 없을 때 다른 레플리카가 받는 중이면 그 결과를 기다리되, 시간 예산(budget)까지만 기다림
+    items = default_cache.get_or_fetch(key, fetch, wait=budget, status=status)
+    if status is not None:
+        status['circuit_open'] = breaker.state != 'closed'
+    return items
+
+
+def iter_air_pages(station_name, data_term='MONTH', max_rows=None, page_size=100, ver='1.3',
+                   budget=LATENCY_BUDGET):
+    """
+    pageNo를 넘기며 측정값을 한 페이지씩 받아 yield 하는 제너레이터 (최신순).
+    - 긴 기간(MONTH/3MONTH) 조회용: 페이지가 도착하는 대로 파싱/그래프에 넘길 수 있음
+    - max_rows: 받을 최대 행 수 (None이면 dataTerm 범위 끝까지)
+    - 마지막 페이지(page_size보다 짧음)나 max_rows에 닿으면 멈춘다. 페이지마다 재시도/시간 예산 적용
+    """
+    fetched = 0
+    page_no = 1
+    while True:
+        page = request_with_retry(station_name, page_size, data_term, ver,
+                                  budget=budget, page_no=page_no) or []
+        full_page = len(page) >= page_size
+        if max_rows is not None:
+            page = page[:max_rows - fetched]
+        if page:
+            yield page
+        fetched += len(page)
+        if not full_page or (max_rows is not None and fetched >= max_rows):
+            return
+        page_no += 1
+
+
+def last_known_good(station_name, num_rows=24, data_term='DAILY', ver='1.3'):
+    """
+    API 장애 때 보여 줄 마지막 캐시 응답 (오래됐어도 반환). 없으면 (None, None).
+    - 반환: (items, 받은 시각 KST datetime)
+    """
+    entry = default_cache.read(cache_key(station_name, num_rows, data_term, ver))
+    if not entry or not entry.get("items"):
+        return None, None
+    return entry["items"], datetime.strptime(entry["fetched_at"], "%Y-%m-%d %H:%M:%S")
+
+
+# ===== 전국 일괄 조회 =====
+class RateLimiter:
+    """
+    초당 호출 횟수를 제한하는 간단한 limiter (스레드 안전).
+    - rate: 초당 최대 요청 수. None 또는 0 이하이면 제한 없음.
+    """
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate and rate > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next_time = time.monotonic()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            wait_for = self._next_time - now
+            self._next_time = max(now, self._next_time) + self.interval
+        if wait_for > 0:
+            time.sleep(wait_for)
+
+
+def fetch_all_stations(stations=None, num_rows=24, data_term='DAILY', ver='1.3',
+                       max_workers=8, rate_limit=10.0, use_cache=True):
+    """
+    여러 측정소를 스레드 풀로 동시에 조회.
+    - stations: 측정소 이름 목록. None이면 AIR_STATION_MAP 전체(중복 제거).
+    - max_workers: 동시에 실행할 요청 수 (연결 풀 크기보다 크게 잡아도 풀 크기만큼만 재사용됨)
+    - rate_limit: 초당 최대 요청 수 (공공데이터 포털 트래픽 제한 대비). None이면 제한 없음.
+    - 반환: (results, errors)
+        results = {측정소: items}, errors = {측정소: 발생한 예외}
+    """
+    if stations is None:
+        stations = all_station_names()
+    stations = list(dict.fromkeys(stations))  # 같은 측정소는 한 번만 요청
+    limiter = RateLimiter(rate_limit)
+
+    def fetch_one(station_name):
+        limiter.wait()
+        return fetch_air_data(station_name, num_rows=num_rows, data_term=data_term,
+                              ver=ver, use_cache=use_cache)
+
+    results = {}
+    errors = {}
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="air-fetch") as pool:
+        futures = {name: pool.submit(fetch_one, name) for name in stations}
+        for name, future in futures.items():
+            try:
+                results[name] = future.result()
+            except Exception as e:
+                # 한 측정소 실패가 전체 조회를 멈추지 않도록 측정소별로 모아서 반환
+                errors[name] = e
+    return results, errors
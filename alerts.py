@@ -0,0 +1,346 @@
+# ===== 예측 기반 등급 경보 =====
+# 매시 전체 측정소의 향후 n시간 예측을 한 번의 행렬 연산으로 계산하고,
+# 예측값이 PM10_CRITERIA/PM25_CRITERIA 등급 경계를 넘어 올라가는 측정소를 경보로 보낸다.
+# - 히스테리시스: 등급이 내려갔다고 보려면 경계보다 HYSTERESIS만큼 더 내려가야 함 (경계 근처에서 깜빡임 방지)
+# - 중복 제거: 측정소×항목별 마지막 경보 등급과 처리한 측정 시각을 파일에 저장 → 같은 등급은 한 번만,
+#   같은 시간대를 다시 돌려도(재시작) 다시 보내지 않음. 여러 프로세스가 같은 상태 파일을 쓰면
+#   상태 읽기 → 전송 → 저장을 공유 저장소(shared_store) 임대로 한 번에 한 프로세스만 하게 해서
+#   나중 프로세스는 앞 프로세스가 저장한 상태로 중복을 거름
+# - 전달: send(events)만 있으면 되는 sink (FileSink: JSON Lines 파일, WebhookSink: HTTP POST)
+#
+# 사용 예:
+#   python alerts.py --file .cache/alerts.jsonl                   # 한 번 평가 (cron에서 매시 실행)
+#   python alerts.py --webhook http://127.0.0.1:8600/alerts
+#   python alerts.py --stub-port 8600                             # 웹훅 수신 대역(받은 내용을 출력)
+#   python prefetch.py --alerts-file .cache/alerts.jsonl          # 정시 미리 받기 직후 평가
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+import metrics
+from air_cache import CACHE_DIR, now_kst
+from air_parse import last_valid, parse_stations, to_hourly_matrix
+from forecast import fit_predict_batch
+from grading import GRADE_NAMES, grade_codes, recommend_by_value
+from shared_store import POLL_INTERVAL
+from shared_store import default_store as shared_store
+
+STATE_PATH = os.path.join(CACHE_DIR, "alerts_state.json")
+# 화면 이름 → frame 열 이름
+PM_COLUMNS = {'PM10': 'pm10', 'PM2.5': 'pm25'}
+N_FORECAST_HOURS = 3
+WINDOW_HOURS = 24
+# 이 등급 이상으로 올라갈 때만 경보 (2 = '나쁨')
+MIN_ALERT_GRADE = 2
+# 등급이 내려간 것으로 보기 위해 경계 아래로 더 내려가야 하는 값 (㎍/m³)
+HYSTERESIS = {'PM10': 5.0, 'PM2.5': 3.0}
+# 상태 파일 임대: 유효 시간(초, 전송이 오래 걸려도 넘지 않을 만큼)과 다른 프로세스를 기다리는 최대 시간(초)
+STATE_LEASE_TTL = 120
+STATE_LEASE_WAIT = 30
+
+
+# ===== 전달(sink) =====
+class FileSink:
+    """경보를 JSON Lines 파일 끝에 덧붙임."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def send(self, events):
+        if not events:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            for event in events:
+                f.write(json.dumps(event, ensure_ascii=False) + "\n")
+
+
+class WebhookSink:
+    """경보 목록을 JSON 배열 하나로 POST (실패하면 예외 → 상태를 저장하지 않아 다음 실행에서 다시 보냄)."""
+
+    def __init__(self, url, timeout=5):
+        self.url = url
+        self.timeout = timeout
+
+    def send(self, events):
+        if not events:
+            return
+        import requests
+
+        response = requests.post(self.url, json=events, timeout=self.timeout)
+        response.raise_for_status()
+
+
+# ===== 경보 상태 =====
+def load_state(path=STATE_PATH):
+    """{'측정소|항목': {'level': 등급 코드, 'data_time': 마지막으로 처리한 측정 시각}} (없으면 빈 dict)."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_state(state, path=STATE_PATH):
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(state, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    except BaseException:
+        # 쓰다 실패하면(디스크 가득 참 등) 임시 파일을 남기지 않음 → 상태 파일은 이전 그대로
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def event_id(station, pm_type, kind, grade, data_time):
+    """같은 경보에는 항상 같은 id (받는 쪽에서도 중복을 거를 수 있도록)."""
+    raw = json.dumps([station, pm_type, kind, grade, data_time], ensure_ascii=False)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+
+# ===== 평가 =====
+def forecast_levels(Y, pm_type, n_hours=N_FORECAST_HOURS):
+    """
+    (측정소 × 시간) 행렬 → 측정소별 예측 등급을 한 번에 계산.
+    - 반환 dict (모두 길이 = 측정소 수):
+      current: 최신값, peak: 예측 구간 최대값, peak_step: 최대가 되는 시간(1부터),
+      raise_level: peak의 등급 코드, hold_level: peak + HYSTERESIS의 등급 코드 (내려갈 때 기준)
+      예측할 수 없는 측정소는 peak가 NaN, 등급 코드는 -1
+    """
+    preds = fit_predict_batch(Y, n_hours=n_hours)[0] if Y.shape[1] else np.full((len(Y), n_hours), np.nan)
+    has_pred = ~np.isnan(preds).all(axis=1)
+    peak_step = np.where(has_pred, np.argmax(np.where(np.isnan(preds), -np.inf, preds), axis=1), 0)
+    peak = np.where(has_pred, preds[np.arange(len(preds)), peak_step], np.nan)
+    return {
+        'current': last_valid(Y),
+        'peak': peak,
+        'peak_step': peak_step + 1,
+        'raise_level': grade_codes(peak, pm_type),
+        'hold_level': grade_codes(peak + HYSTERESIS[pm_type], pm_type),
+    }
+
+
+def _acquire_state_lease(name):
+    """
+    상태 파일 임대를 잡을 때까지 기다림. 잡으면 True.
+    - 공유 저장소를 쓸 수 없으면 False (프로세스 안의 lock만으로 진행)
+    """
+    deadline = time.monotonic() + STATE_LEASE_WAIT
+    while True:
+        try:
+            if shared_store.try_lease(name, ttl=STATE_LEASE_TTL):
+                return True
+        except sqlite3.Error:
+            return False
+        if time.monotonic() > deadline:
+            raise TimeoutError("다른 프로세스가 경보 상태를 쓰고 있어 이번 평가를 건너뜁니다")
+        time.sleep(POLL_INTERVAL)
+
+
+def _release_state_lease(name):
+    try:
+        shared_store.release_lease(name)
+    except sqlite3.Error:
+        pass  # 풀지 못한 임대는 STATE_LEASE_TTL이 지나면 무시됨
+
+
+class AlertEngine:
+    """
+    측정소 응답 → 경보 목록 → sink 전달.
+    - evaluate(results): 보낼 경보 목록과 새 상태 계산 (상태 파일은 건드리지 않음)
+    - run(results): evaluate 후 sink로 보내고, 성공하면 상태 저장
+    경보 종류:
+      rise : 예측 등급이 MIN_ALERT_GRADE 이상이면서 마지막 경보 등급보다 높아짐
+      clear: 경보 중이던 측정소가 히스테리시스를 넘어 MIN_ALERT_GRADE 아래로 내려감
+    """
+
+    def __init__(self, sink, n_hours=N_FORECAST_HOURS, min_grade=MIN_ALERT_GRADE,
+                 state_path=STATE_PATH, window=WINDOW_HOURS):
+        self.sink = sink
+        self.n_hours = n_hours
+        self.min_grade = min_grade
+        self.state_path = state_path
+        self.window = window
+        self._lock = threading.Lock()
+
+    def evaluate(self, results, state):
+        frame = parse_stations(results)
+        if not len(frame['time']):
+            return [], state
+        stations = np.array(sorted(results), dtype=str)
+        end = frame['time'].max().astype('datetime64[h]')
+        start = end - np.timedelta64(self.window - 1, 'h')
+        data_time = str(end.astype('datetime64[m]')).replace("T", " ")
+        created_at = now_kst().strftime("%Y-%m-%d %H:%M:%S")
+
+        state = dict(state)
+        events = []
+        for pm_type, column in PM_COLUMNS.items():
+            _, _, Y = to_hourly_matrix(frame, column, stations, start, end)
+            levels = forecast_levels(Y, pm_type, self.n_hours)
+            for i, station in enumerate(stations):
+                key = f"{station}|{pm_type}"
+                prev = state.get(key, {'level': -1, 'data_time': None})
+                if prev['data_time'] == data_time:
+                    continue  # 이 시간대는 이미 처리함
+                level = prev['level']
+                raise_level = int(levels['raise_level'][i])
+                hold_level = int(levels['hold_level'][i])
+                kind = None
+                if raise_level >= self.min_grade and raise_level > level:
+                    kind, level = 'rise', raise_level
+                elif raise_level >= 0 and hold_level < level:
+                    # 히스테리시스: 경계 + HYSTERESIS 아래로 내려가야 등급을 낮춤
+                    new_level = hold_level
+                    if level >= self.min_grade and new_level < self.min_grade:
+                        kind = 'clear'
+                    level = new_level
+                state[key] = {'level': level, 'data_time': data_time}
+                if kind is None:
+                    continue
+
+                peak = float(levels['peak'][i])
+                current = levels['current'][i]
+                grade = GRADE_NAMES[level] if level >= 0 else None
+                events.append({
+                    'id': event_id(station, pm_type, kind, grade, data_time),
+                    'kind': kind,
+                    'station': str(station),
+                    'pm_type': pm_type,
+                    'grade': grade,
+                    'previous_grade': GRADE_NAMES[prev['level']] if prev['level'] >= 0 else None,
+                    'current_value': None if np.isnan(current) else round(float(current), 1),
+                    'peak_value': round(peak, 1),
+                    'peak_in_hours': int(levels['peak_step'][i]),
+                    'data_time': data_time,
+                    'message': recommend_by_value(peak, pm_type=pm_type),
+                    'created_at': created_at,
+                })
+        return events, state
+
+    def run(self, results):
+        """
+        한 번 평가해 경보를 보내고 보낸 경보 목록을 반환.
+        - 상태 읽기 → 전송 → 저장은 같은 프로세스 안에서는 lock으로, 프로세스 사이에서는
+          상태 파일 경로로 잡는 공유 저장소 임대로 한 번에 하나씩만 실행
+        - STATE_LEASE_WAIT초 안에 임대를 못 잡으면 TimeoutError (상태를 건드리지 않으므로 다음 실행에서 다시 평가)
+        """
+        lease = "alerts:" + os.path.abspath(self.state_path)
+        with self._lock, metrics.timed('alerts'):
+            leased = _acquire_state_lease(lease)
+            try:
+                state = load_state(self.state_path)
+                events, new_state = self.evaluate(results, state)
+                self.sink.send(events)  # 실패하면 상태를 저장하지 않음 → 다음 실행에서 다시 보냄
+                save_state(new_state, self.state_path)
+            finally:
+                if leased:
+                    _release_state_lease(lease)
+        for event in events:
+            metrics.inc('air_alerts_total', kind=event['kind'], pm=event['pm_type'])
+        return events
+
+
+# ===== 웹훅 수신 대역 (로컬 테스트용) =====
+def start_webhook_stub(port, host="127.0.0.1", on_events=None):
+    """POST로 받은 경보 목록을 on_events(list)로 넘기는 HTTP 서버를 백그라운드 스레드로 실행."""
+    on_events = on_events or (lambda events: None)
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            try:
+                on_events(json.loads(self.rfile.read(length) or b"[]"))
+            except ValueError:
+                self.send_response(400)
+            else:
+                self.send_response(204)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="air-alert-stub", daemon=True).start()
+    return server
+
+
+class StreamSink:
+    """경보를 표준 출력 등 텍스트 스트림에 JSON Lines로 씀."""
+
+    def __init__(self, stream=None):
+        self.stream = stream
+
+    def send(self, events):
+        stream = self.stream or sys.stdout
+        for event in events:
+            stream.write(json.dumps(event, ensure_ascii=False) + "\n")
+        stream.flush()
+
+
+def make_sink(file=None, webhook=None):
+    """설정 → sink (웹훅, 파일 순서로 확인하고 둘 다 없으면 표준 출력)."""
+    if webhook:
+        return WebhookSink(webhook)
+    if file:
+        return FileSink(file)
+    return StreamSink()
+
+
+def engine_from_env():
+    """AIR_ALERTS_WEBHOOK 또는 AIR_ALERTS_FILE이 있으면 그 sink로 보내는 AlertEngine (없으면 None)."""
+    webhook = os.environ.get("AIR_ALERTS_WEBHOOK")
+    file = os.environ.get("AIR_ALERTS_FILE")
+    if not webhook and not file:
+        return None
+    return AlertEngine(make_sink(file, webhook))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="전체 측정소 예측 등급 경보")
+    parser.add_argument("--file", help="경보를 덧붙일 JSON Lines 파일")
+    parser.add_argument("--webhook", help="경보를 POST할 주소")
+    parser.add_argument("--stations", help="쉼표로 구분한 측정소 (기본: 측정소 카탈로그 전체)")
+    parser.add_argument("--min-grade", choices=GRADE_NAMES[1:], default=GRADE_NAMES[MIN_ALERT_GRADE],
+                        help="경보를 보낼 최소 등급")
+    parser.add_argument("--stub-port", type=int, help="웹훅 수신 대역만 실행 (받은 경보를 출력)")
+    args = parser.parse_args(argv)
+
+    if args.stub_port:
+        server = start_webhook_stub(args.stub_port, on_events=lambda events: [
+            print(json.dumps(event, ensure_ascii=False), flush=True) for event in events])
+        print(f"웹훅 수신 대역: http://127.0.0.1:{args.stub_port}/", file=sys.stderr)
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            server.shutdown()
+        return
+
+    import airkorea
+    from station_catalog import load_catalog
+
+    stations = ([s.strip() for s in args.stations.split(",") if s.strip()] if args.stations
+                else [rec['name'] for rec in load_catalog().records])
+    results, errors = airkorea.fetch_all_stations(stations, use_cache=True)
+    engine = AlertEngine(make_sink(args.file, args.webhook), min_grade=GRADE_NAMES.index(args.min_grade))
+    events = engine.run(results)
+    print(f"측정소 {len(results)}곳 평가 (실패 {len(errors)}곳), 경보 {len(events)}건", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+# ===== 예측 모델 백테스트 =====
+# 저장된 이력(air_store)으로 레지스트리의 모든 모델을 rolling-origin 방식으로 비교한다.
+# - 모든 (측정소, 예측 시점) 조합을 (행 수, window) 배열 하나로 펼친 뒤
+#   모델마다 predict_batch를 한 번만 호출 → 전체 백테스트가 수 초 안에 끝남
+# - 지표: MAE, RMSE, 등급 적중률(PM10_CRITERIA/PM25_CRITERIA 기준), 계산 시간
+import time
+
+import numpy as np
+
+from air_parse import to_hourly_matrix
+from forecast import MODELS
+from grading import grade_codes
+
+# 예측 시점마다 모델에 넘길 과거 시간 수 (1주일)
+DEFAULT_WINDOW = 24 * 7
+
+
+def rolling_windows(Y, window=DEFAULT_WINDOW, horizon=3, step=1):
+    """
+    (측정소 × 시간) 행렬에서 rolling-origin 학습/정답 구간을 한꺼번에 만듦.
+    - 반환: (history (행 수, window), actual (행 수, horizon), station_idx, origin_idx)
+      행 수 = 측정소 수 × 예측 시점 수. 배열은 복사 없이 view로 만든 뒤 필요한 것만 모음.
+    """
+    n_stations, n_time = Y.shape
+    origins = np.arange(window, n_time - horizon + 1, step)
+    if len(origins) == 0:
+        empty = np.empty((0, window))
+        return empty, np.empty((0, horizon)), np.array([], int), np.array([], int)
+
+    views = np.lib.stride_tricks.sliding_window_view(Y, window + horizon, axis=1)
+    chunks = views[:, origins - window, :]  # (측정소, 시점, window + horizon)
+    chunks = chunks.reshape(-1, window + horizon)
+    station_idx = np.repeat(np.arange(n_stations), len(origins))
+    origin_idx = np.tile(origins, n_stations)
+    return chunks[:, :window], chunks[:, window:], station_idx, origin_idx
+
+
+def score(preds, actual, pm_type='PM10'):
+    """예측/정답 배열로 MAE, RMSE, 등급 적중률과 사용된 점 수를 계산."""
+    ok = ~np.isnan(preds) & ~np.isnan(actual)
+    n = int(ok.sum())
+    if n == 0:
+        return {'mae': np.nan, 'rmse': np.nan, 'grade_accuracy': np.nan, 'n': 0}
+    err = preds[ok] - actual[ok]
+    hits = grade_codes(preds[ok], pm_type) == grade_codes(actual[ok], pm_type)
+    return {
+        'mae': float(np.abs(err).mean()),
+        'rmse': float(np.sqrt((err ** 2).mean())),
+        'grade_accuracy': float(hits.mean()),
+        'n': n,
+    }
+
+
+def backtest(Y, models=None, horizon=3, window=DEFAULT_WINDOW, step=1, pm_type='PM10'):
+    """
+    정시 간격 행렬 Y로 모델들을 비교.
+    - models: MODELS 이름 목록 (None이면 전체)
+    - 반환: {모델 이름: {'mae', 'rmse', 'grade_accuracy', 'n', 'coverage', 'seconds'}}
+      coverage는 정답이 있는 칸 중 모델이 예측값을 낸 비율.
+    """
+    history, actual, _, _ = rolling_windows(Y, window, horizon, step)
+    has_actual = ~np.isnan(actual)
+
+    results = {}
+    for name in models or list(MODELS):
+        started = time.perf_counter()
+        preds = MODELS[name].predict_batch(history, horizon)
+        elapsed = time.perf_counter() - started
+
+        result = score(preds, actual, pm_type)
+        total = int(has_actual.sum())
+        result['coverage'] = float((~np.isnan(preds) & has_actual).sum() / total) if total else np.nan
+        result['seconds'] = elapsed
+        results[name] = result
+    return results
+
+
+def backtest_store(store, pollutant='pm10', stations=None, start=None, end=None, **kwargs):
+    """저장소(air_store.AirStore)의 이력을 읽어 backtest 실행."""
+    frame = store.load_frame(stations=stations, start=start, end=end)
+    _, _, Y = to_hourly_matrix(frame, pollutant, stations=stations)
+    pm_type = 'PM10' if pollutant == 'pm10' else 'PM2.5'
+    return backtest(Y, pm_type=pm_type, **kwargs)
+
+
+def format_results(results):
+    """백테스트 결과를 표 형태 문자열로 변환 (터미널 출력용)."""
+    lines = [f"{'model':<16}{'MAE':>8}{'RMSE':>8}{'grade':>8}{'cover':>8}{'n':>10}{'sec':>8}"]
+    for name, r in results.items():
+        lines.append(
+            f"{name:<16}{r['mae']:>8.2f}{r['rmse']:>8.2f}{r['grade_accuracy']:>8.1%}"
+            f"{r['coverage']:>8.1%}{r['n']:>10}{r['seconds']:>8.2f}"
+        )
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    # 예: python backtest.py pm25  → 로컬 저장소 전체 측정소로 모든 모델 비교
+    import sys
+
+    from air_store import default_store
+
+    pollutant = sys.argv[1] if len(sys.argv) > 1 else 'pm10'
+    print(format_results(backtest_store(default_store, pollutant)))
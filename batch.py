@@ -0,0 +1,189 @@
+# ===== 화면 없이 돌리는 일괄 분석 (cron/다른 시스템 연동용) =====
+# main.py의 분석(조회 → 파싱 → 3시간 예측 → 등급/권장 문구)을 Streamlit/matplotlib 없이 실행해
+# 측정소마다 JSON 한 줄(JSON Lines)로 내보낸다.
+# - 여러 측정소는 워커 프로세스로 나눠 병렬 처리 (워커 수만큼 API 초당 호출 한도를 나눠 씀)
+# - 한 측정소가 실패해도 나머지는 계속 진행하고, 실패한 줄은 {"station", "error"}로 남김
+#
+# 사용 예:
+#   python batch.py --stations 강남구,송파구
+#   python batch.py --sido 서울 -o seoul.jsonl --workers 4
+#   python batch.py --all --no-cache > all.jsonl
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from functools import partial
+
+import numpy as np
+
+from air_cache import now_kst
+from air_parse import hourly_grid, parse_items
+from forecast import WINDOW_HOURS, linear_regression_predict
+from grading import UNKNOWN_GRADE, grade_codes, grade_names, recommend_by_value
+
+# 분석할 항목 (main.py 라디오와 같은 이름 → frame 열 이름)
+PM_COLUMNS = {'PM10': 'pm10', 'PM2.5': 'pm25'}
+N_FORECAST_HOURS = 3
+# 전체 워커가 함께 지킬 API 초당 호출 수 (fetch_all_stations 기본값과 같음)
+RATE_LIMIT = 10.0
+
+_limiter = None
+
+
+def _init_worker(rate_limit):
+    """워커 프로세스 시작 시 한 번: 이 프로세스 몫의 호출 한도를 설정."""
+    global _limiter
+    from airkorea import RateLimiter
+
+    _limiter = RateLimiter(rate_limit)
+
+
+def _grade_name(value, pm_type):
+    if value is None:
+        return None
+    name = str(grade_names(grade_codes(value, pm_type)))
+    return None if name == UNKNOWN_GRADE else name
+
+
+def _number(value):
+    """JSON에 쓸 숫자 (NaN → None)."""
+    value = float(value)
+    return None if np.isnan(value) else round(value, 3)
+
+
+def analyze_frame(frame, station, n_hours=N_FORECAST_HOURS):
+    """
+    한 측정소 frame → 분석 결과 dict (JSON으로 바로 쓸 수 있는 값만 담음).
+    - readings: 시간별 PM10/PM2.5 측정값 (결측은 null)
+    - PM10/PM2.5마다 최신값·등급, n_hours 예측, 마지막 예측값 기준 등급·권장 문구
+    """
+    record = {
+        'station': station,
+        'analyzed_at': now_kst().strftime("%Y-%m-%d %H:%M:%S"),
+        'readings': [
+            {'time': str(t).replace("T", " "), **{col: _number(frame[col][i]) for col in PM_COLUMNS.values()}}
+            for i, t in enumerate(frame['time'])
+        ],
+    }
+    for pm_type, column in PM_COLUMNS.items():
+        # 앱/정시 미리 받기와 같은 정시 격자(빈 시간은 NaN)로 예측해야 같은 예측값이 나옴
+        grid = hourly_grid(frame, column)
+        times = grid['time'].astype('datetime64[m]').astype(datetime).tolist()
+        values = grid['values']
+        observed = np.flatnonzero(~np.isnan(values))
+        latest = float(values[observed[-1]]) if len(observed) else None
+        # --rows를 24보다 크게 줘도 앱(main.py analysis_for)처럼 최근 WINDOW_HOURS시간 추세로 예측
+        predict_values, predict_times, _ = linear_regression_predict(
+            times[-WINDOW_HOURS:], values[-WINDOW_HOURS:], n_hours=n_hours)
+        final = float(predict_values[-1]) if predict_values is not None else None
+        record[column] = {
+            'latest': latest,
+            'latest_time': times[observed[-1]].strftime("%Y-%m-%d %H:%M") if len(observed) else None,
+            'latest_grade': _grade_name(latest, pm_type),
+            'forecast': [
+                {'time': t.strftime("%Y-%m-%d %H:%M"), 'value': round(float(v), 3)}
+                for t, v in zip(predict_times, predict_values)
+            ] if predict_values is not None else [],
+            'forecast_grade': _grade_name(final, pm_type),
+            'recommendation': recommend_by_value(final, pm_type=pm_type),
+        }
+    return record
+
+
+def analyze_station(station, num_rows=24, n_hours=N_FORECAST_HOURS, use_cache=True):
+    """측정소 하나를 조회해 분석. 실패하면 {'station', 'error'}를 반환 (예외를 워커 밖으로 던지지 않음)."""
+    from airkorea import fetch_air_data
+
+    try:
+        if _limiter is not None:
+            _limiter.wait()
+        items = fetch_air_data(station, num_rows=num_rows, use_cache=use_cache)
+        return analyze_frame(parse_items(items, station), station, n_hours=n_hours)
+    except Exception as e:
+        return {'station': station, 'error': f"{type(e).__name__}: {e}"}
+
+
+def run_batch(stations, out, workers=None, num_rows=24, n_hours=N_FORECAST_HOURS,
+              use_cache=True, rate_limit=RATE_LIMIT):
+    """
+    stations를 워커 프로세스로 나눠 분석하고 out(텍스트 스트림)에 JSON Lines로 씀.
+    - 결과는 stations 순서대로, 끝나는 대로 바로 씀
+    - workers가 1이면 현재 프로세스에서 차례로 실행
+    - 반환: (성공 수, 실패 수)
+    """
+    stations = list(dict.fromkeys(stations))
+    workers = max(1, min(workers or os.cpu_count() or 1, len(stations) or 1))
+    task = partial(analyze_station, num_rows=num_rows, n_hours=n_hours, use_cache=use_cache)
+    ok = failed = 0
+
+    def emit(record):
+        nonlocal ok, failed
+        out.write(json.dumps(record, ensure_ascii=False) + "\n")
+        out.flush()
+        if 'error' in record:
+            failed += 1
+        else:
+            ok += 1
+
+    if workers == 1:
+        _init_worker(rate_limit)
+        for station in stations:
+            emit(task(station))
+        return ok, failed
+
+    per_worker = rate_limit / workers if rate_limit else None
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(per_worker,)) as pool:
+        chunksize = max(1, len(stations) // (workers * 4))
+        for record in pool.map(task, stations, chunksize=chunksize):
+            emit(record)
+    return ok, failed
+
+
+def resolve_stations(names=None, sido=None, all_stations=False):
+    """CLI 인자 → 측정소 목록 (--stations, --sido, --all 순서로 확인)."""
+    if names:
+        return [name.strip() for name in names.split(",") if name.strip()]
+    from station_catalog import load_catalog
+
+    catalog = load_catalog()
+    if sido:
+        stations = catalog.stations_in(sido)
+        if not stations:
+            raise SystemExit(f"알 수 없는 시/도: {sido} (가능한 값: {', '.join(catalog.cities())})")
+        return stations
+    if all_stations:
+        return [rec['name'] for rec in catalog.records]
+    raise SystemExit("--stations, --sido, --all 중 하나를 지정하세요.")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="측정소별 미세먼지 분석 결과를 JSON Lines로 출력")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--stations", help="쉼표로 구분한 측정소")
+    target.add_argument("--sido", help="시/도의 모든 측정소 (예: 서울, 경기)")
+    target.add_argument("--all", action="store_true", help="측정소 카탈로그 전체")
+    parser.add_argument("-o", "--output", default="-", help="출력 파일 (기본: 표준 출력)")
+    parser.add_argument("--workers", type=int, default=None, help="워커 프로세스 수 (기본: CPU 수)")
+    parser.add_argument("--rows", type=int, default=24, help="측정소마다 받을 시간 수 (예측은 최근 24시간으로)")
+    parser.add_argument("--hours", type=int, default=N_FORECAST_HOURS, help="예측할 시간 수")
+    parser.add_argument("--rate-limit", type=float, default=RATE_LIMIT, help="전체 API 초당 호출 수 (0이면 제한 없음)")
+    parser.add_argument("--no-cache", action="store_true", help="공유 캐시를 쓰지 않고 항상 API 호출")
+    args = parser.parse_args(argv)
+
+    stations = resolve_stations(args.stations, args.sido, args.all)
+    out = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    try:
+        ok, failed = run_batch(stations, out, workers=args.workers, num_rows=args.rows,
+                               n_hours=args.hours, use_cache=not args.no_cache,
+                               rate_limit=args.rate_limit)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    print(f"성공 {ok}곳, 실패 {failed}곳", file=sys.stderr)
+    return 1 if failed and not ok else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
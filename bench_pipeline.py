@@ -0,0 +1,218 @@
+# ===== 분석 파이프라인 벤치마크 =====
+# main.py 흐름(조회 → 파싱 → 예측 → 등급 → 그래프)을 단계별로 고정 데이터에 대해 측정한다.
+# - 조회는 mock_airkorea 서버(고정 시각의 가짜 데이터)를 사용하므로 실제 API 할당량을 쓰지 않음
+# - 단계마다 p50/p95 지연과 최대 메모리(tracemalloc)를 기록
+# - 기준값(baseline)을 저장해 두고 비교하면 느려진 단계를 배포 전에 잡을 수 있음
+# - 결과가 맞는지는 tests/의 pytest로 확인하고, 이 스크립트는 속도와 메모리만 잼
+#
+# 사용 예:
+#   python bench_pipeline.py                          # 기본 케이스 실행
+#   python bench_pipeline.py --cases 24h_x1,90d_x500  # 케이스 선택
+#   python bench_pipeline.py --save-baseline          # 현재 결과를 기준값으로 저장
+#   python bench_pipeline.py --compare --tolerance 0.3  # 기준 대비 p50이 30% 이상 느려지면 exit 1
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+import warnings
+from datetime import datetime
+
+import matplotlib
+
+matplotlib.use("Agg")  # 화면 없이 그림만 생성
+import matplotlib.pyplot as plt
+import numpy as np
+
+import airkorea
+from air_parse import parse_stations, select_series, to_hourly_matrix
+from air_store import data_term_for
+from chart import build_analysis_figure
+from forecast import fit_predict_batch, linear_regression_predict
+from grading import grade_batch
+from mock_airkorea import MockAirKoreaServer, MockConfig
+from stations import all_station_names
+
+# 한글 폰트가 없는 환경에서 그래프마다 쏟아지는 글리프 경고는 측정과 무관하므로 숨김
+warnings.filterwarnings("ignore", message="Glyph .* missing from font")
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_baseline.json")
+
+# 가짜 데이터의 최신 시각 (결과 재현을 위해 고정)
+FIXED_END = datetime(2025, 12, 5, 20)
+
+# 케이스 이름: (시간 수, 측정소 수, 반복 횟수)
+CASES = {
+    '24h_x1': (24, 1, 30),
+    '24h_x170': (24, 170, 10),
+    '7d_x170': (24 * 7, 170, 5),
+    '90d_x500': (24 * 90, 500, 3),
+}
+DEFAULT_CASES = ('24h_x1', '24h_x170', '7d_x170')
+
+STAGES = ('fetch', 'parse', 'forecast', 'grade', 'render')
+
+
+def case_stations(n):
+    """AIR_STATION_MAP 측정소를 먼저 쓰고, 모자라면 가상 측정소 이름으로 채움."""
+    names = all_station_names()[:n]
+    names += [f"가상측정소{i:03d}" for i in range(n - len(names))]
+    return names
+
+
+def percentile(samples, q):
+    return float(np.percentile(np.asarray(samples), q)) if samples else float('nan')
+
+
+def measure(fn, repeat):
+    """fn을 repeat번 실행해 (지연 리스트(ms), 최대 메모리(KB), 마지막 결과)를 반환."""
+    result = fn()  # 워밍업 (import/캐시 영향 제외)
+    durations = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        durations.append((time.perf_counter() - started) * 1000)
+
+    # 메모리는 tracemalloc 오버헤드가 지연에 섞이지 않도록 따로 한 번 측정
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return durations, peak / 1024, result
+
+
+def run_case(name, repeat=None):
+    """한 케이스의 모든 단계를 측정해 {단계: {'p50_ms', 'p95_ms', 'peak_kb'}} 반환."""
+    hours, n_stations, default_repeat = CASES[name]
+    repeat = repeat or default_repeat
+    stations = case_stations(n_stations)
+    data_term = data_term_for(hours)
+    workers = min(16, n_stations)
+
+    def fetch():
+        results, errors = airkorea.fetch_all_stations(
+            stations, num_rows=hours, data_term=data_term,
+            max_workers=workers, rate_limit=None, use_cache=False,
+        )
+        if errors:
+            raise RuntimeError(f"mock 조회 실패: {next(iter(errors.items()))}")
+        return results
+
+    stats = {}
+
+    def record(stage, fn):
+        durations, peak_kb, result = measure(fn, repeat)
+        stats[stage] = {
+            'p50_ms': percentile(durations, 50),
+            'p95_ms': percentile(durations, 95),
+            'peak_kb': peak_kb,
+        }
+        return result
+
+    items_by_station = record('fetch', fetch)
+    frame = record('parse', lambda: parse_stations(items_by_station))
+
+    def forecast():
+        if n_stations == 1:
+            # 앱과 같은 경로: 리스트로 꺼내 linear_regression_predict 호출
+            times, values = select_series(frame, 'pm10')
+            return linear_regression_predict(times.tolist(), values.tolist(), n_hours=3)[0][None, :]
+        _, _, Y = to_hourly_matrix(frame, 'pm10', stations=stations)
+        return fit_predict_batch(Y[:, -24:], n_hours=3)[0]
+
+    preds = record('forecast', forecast)
+    final = preds[:, -1]
+    record('grade', lambda: grade_batch(final, 'PM10')['messages'])
+
+    first_times, first_values = select_series(frame, 'pm10', station=stations[0])
+    first_times = first_times.tolist()
+    first_values = first_values.tolist()
+    predict_values, predict_times, _ = linear_regression_predict(first_times, first_values, n_hours=3)
+
+    def render():
+        fig = build_analysis_figure(first_times, first_values, predict_values, predict_times,
+                                    'PM10', title=f"{stations[0]} 벤치마크")
+        fig.canvas.draw()  # 실제 래스터화까지 포함 (st.pyplot이 하는 일)
+        plt.close(fig)
+
+    record('render', render)
+    return stats
+
+
+def format_report(results, baseline=None):
+    lines = [f"{'case':<10}{'stage':<10}{'p50 ms':>10}{'p95 ms':>10}{'peak KB':>11}{'vs base':>10}"]
+    for case, stages in results.items():
+        for stage in STAGES:
+            s = stages[stage]
+            change = ''
+            base = (baseline or {}).get(case, {}).get(stage)
+            if base and base['p50_ms'] > 0:
+                change = f"{s['p50_ms'] / base['p50_ms'] - 1:+.0%}"
+            lines.append(f"{case:<10}{stage:<10}{s['p50_ms']:>10.2f}{s['p95_ms']:>10.2f}"
+                         f"{s['peak_kb']:>11.0f}{change:>10}")
+    return "\n".join(lines)
+
+
+def find_regressions(results, baseline, tolerance):
+    """기준값 대비 p50이 tolerance 비율 이상 느려진 (케이스, 단계, 비율) 목록."""
+    regressions = []
+    for case, stages in results.items():
+        for stage, s in stages.items():
+            base = baseline.get(case, {}).get(stage)
+            if base and base['p50_ms'] > 0 and s['p50_ms'] > base['p50_ms'] * (1 + tolerance):
+                regressions.append((case, stage, s['p50_ms'] / base['p50_ms'] - 1))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="fetch → parse → forecast → grade → render 벤치마크")
+    parser.add_argument("--cases", default=",".join(DEFAULT_CASES),
+                        help=f"쉼표로 구분한 케이스 ({', '.join(CASES)}) 또는 all")
+    parser.add_argument("--repeat", type=int, default=None, help="단계별 반복 횟수 (기본: 케이스별 값)")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="mock 서버 응답 지연")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--compare", action="store_true", help="기준값보다 느려지면 exit 1")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args(argv)
+
+    names = list(CASES) if args.cases == "all" else [c.strip() for c in args.cases.split(",") if c.strip()]
+    unknown = [c for c in names if c not in CASES]
+    if unknown:
+        parser.error(f"알 수 없는 케이스: {', '.join(unknown)}")
+
+    baseline = None
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    results = {}
+    config = MockConfig(latency_ms=args.latency_ms, synthetic_end=FIXED_END, seed=0)
+    with MockAirKoreaServer(config=config) as server:
+        airkorea.set_base_url(server.base_url)
+        for name in names:
+            results[name] = run_case(name, args.repeat)
+
+    print(format_report(results, baseline))
+
+    if args.save_baseline:
+        merged = dict(baseline or {})
+        merged.update(results)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(merged, f, ensure_ascii=False, indent=2)
+        print(f"기준값 저장: {args.baseline}")
+
+    if args.compare:
+        if baseline is None:
+            print("비교할 기준값이 없습니다. 먼저 --save-baseline으로 저장하세요.")
+            return 1
+        regressions = find_regressions(results, baseline, args.tolerance)
+        for case, stage, ratio in regressions:
+            print(f"성능 저하: {case}/{stage} p50 {ratio:+.0%}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
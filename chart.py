@@ -0,0 +1,273 @@
+# ===== 분석 그래프 =====
+# main.py의 '분석 시작' 결과 그래프를 그리는 함수.
+# Streamlit과 분리해 두어 벤치마크 등에서도 같은 그림을 만들 수 있음.
+# matplotlib은 무거우므로 그래프를 실제로 그릴 때 처음 import 한다.
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+import metrics
+from downsample import downsample
+from grading import GRADE_COLORS, get_grade_criteria
+
+# 그래프에 그리는 실측 점의 최대 개수 (넘으면 LTTB로 줄임)
+MAX_PLOT_POINTS = 500
+# 점마다 값 라벨/마커를 붙이는 최대 점 개수 (긴 기간에서는 라벨을 생략)
+LABEL_LIMIT = 48
+
+
+def build_analysis_figure(times, values, predict_values, predict_times, pm_type, title,
+                          n_forecast_hours=3, font_prop=None, max_points=MAX_PLOT_POINTS):
+    """
+    실측값(times, values)과 예측값(predict_values, predict_times)으로 12×7 그래프를 그려 Figure 반환.
+    - 등급별 배경색, 실측 선/값 표시, 예측 점선, 2시간 간격 X축 눈금
+    - font_prop: 한글 폰트(FontProperties). 있으면 범례에 적용
+    - 실측 점이 max_points보다 많으면 LTTB로 줄이고, LABEL_LIMIT보다 많으면 점별 라벨/마커와
+      2시간 눈금 대신 날짜 눈금을 사용 (긴 기간 조회)
+    """
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots(figsize=(12,7))
+    criteria = get_grade_criteria(pm_type)
+
+    # 등급별 배경색 표시: '좋음', '보통', '나쁨' 영역을 axhspan으로 표시
+    ax.axhspan(criteria['좋음'][0], criteria['좋음'][1], facecolor='green', alpha=0.1, label='좋음')
+    ax.axhspan(criteria['보통'][0], criteria['보통'][1], facecolor='yellow', alpha=0.1, label='보통')
+    ax.axhspan(criteria['나쁨'][0], criteria['나쁨'][1], facecolor='orange', alpha=0.1, label='나쁨')
+
+    # 빈 시간(NaN)은 건너뛰고 최대값 계산
+    observed = np.asarray(values, dtype=np.float64)
+    observed = observed[~np.isnan(observed)]
+    max_val = float(observed.max()) if len(observed) else 0
+
+    # 예측값도 Y축 범위를 계산할 때 고려
+    if predict_values is not None and len(predict_values) > 0:
+        max_pred_val = max(predict_values)
+        max_val = max(max_val, max_pred_val)
+
+    # Y축 상한: 최대값의 1.2배 또는 '매우 나쁨' 기준의 1.2배 중 큰 쪽
+    y_max_limit = max(max_val * 1.2, criteria['매우 나쁨'][0] * 1.2)
+
+    # '매우 나쁨' 영역은 y_max_limit까지 빨간색으로 표시
+    ax.axhspan(criteria['매우 나쁨'][0], y_max_limit, facecolor='red', alpha=0.1, label='매우 나쁨')
+
+    # 그래프 배경/그리드 설정
+    ax.set_facecolor('#f9f9f9')
+    ax.grid(True, color='#e1e1e1', linestyle='-', linewidth=1)
+
+    # 실제 그릴 데이터: 값이 있는 시간만 사용 (너무 많으면 모양을 유지하며 줄임)
+    plot_times, plot_values = downsample(times, values, max_points)
+    show_labels = len(plot_times) <= LABEL_LIMIT
+
+    # 실측 데이터 선 그래프 (파란색 계열)
+    ax.plot(plot_times, plot_values, color='#2a4d8f', marker='o' if show_labels else None,
+            linewidth=2 if show_labels else 1, label=f'실측 {pm_type}')
+
+    # 각 실측 포인트 위에 값 텍스트 표시 (정수로 표시)
+    if show_labels:
+        for x, y in zip(plot_times, plot_values):
+            ax.text(x, y + 1.5, f"{y:.0f}", color='#2a4d8f', fontsize=8, ha='center')
+
+    # 예측값이 있으면 실측 마지막 점과 예측점들을 이어서 점선으로 표시
+    if predict_values is not None and plot_times:
+        plot_times_with_pred = [plot_times[-1]] + predict_times
+        plot_values_with_pred = [plot_values[-1]] + list(predict_values)
+
+        ax.plot(plot_times_with_pred, plot_values_with_pred,
+                color='#f28500', marker='o', linestyle='--', linewidth=2,
+                label=f'향후 {n_forecast_hours}시간 예측')
+
+        # 마지막 예측값 텍스트 표시
+        final_time = predict_times[-1]
+        final_value = predict_values[-1]
+        ax.text(final_time, final_value + 1.5, f"{final_value:.0f}", color='#f28500', fontsize=8, ha='center')
+
+    if len(times) <= LABEL_LIMIT:
+        # X축 눈금 설정(2시간 간격)
+        xtick_interval = 2
+        tick_indices = np.arange(0, len(times), xtick_interval)
+        tick_times = [times[i] for i in tick_indices if i < len(times)]
+        tick_labels = [t.strftime("%m-%d %H:%M") for t in tick_times]
+
+        ax.set_xticks(tick_times)
+        ax.set_xticklabels(tick_labels, rotation=45)
+    else:
+        # 긴 기간: 날짜 눈금은 matplotlib이 간격을 정함
+        import matplotlib.dates as mdates
+
+        locator = mdates.AutoDateLocator(maxticks=15)
+        ax.xaxis.set_major_locator(locator)
+        ax.xaxis.set_major_formatter(mdates.DateFormatter("%m-%d"))
+        plt.setp(ax.get_xticklabels(), rotation=45)
+
+    # X축 범위를 실측 시작시간 ~ 마지막 예측시간으로 설정 (있을 때)
+    if times and predict_times:
+        start_time = times[0]
+        end_time = predict_times[-1]
+        ax.set_xlim(start_time, end_time)
+    elif times:
+        start_time = times[0]
+        end_time = times[-1]
+        ax.set_xlim(start_time, end_time)
+
+    ax.set_title(title, fontsize=16, pad=20)
+    ax.set_ylabel(f"{pm_type} 농도 (㎍/m³)")
+    ax.set_xlabel("측정 시간")
+
+    # 범례 표시: 한글 폰트가 있으면 prop에 넣어서 깨지지 않게 함
+    if font_prop:
+        ax.legend(loc='upper left', frameon=True, prop=font_prop, bbox_to_anchor=(1.01, 1), borderaxespad=0.)
+    else:
+        ax.legend(loc='upper left', frameon=True, bbox_to_anchor=(1.01, 1), borderaxespad=0.)
+
+    plt.subplots_adjust(right=0.8)  # 그림 오른쪽 여백 확보 (범례 위해)
+    return fig
+
+
+# ===== 렌더링 결과 캐시 =====
+# 같은 (측정소, 항목, 마지막 측정 시각, 예측값, 그린 값)이면 그림도 같으므로 PNG를 다시 그리지 않는다.
+# 그린 Figure는 PNG로 저장한 즉시 닫아서 장시간 실행 시 메모리가 쌓이지 않게 함.
+RENDER_CACHE_SIZE = 128
+
+_render_cache = OrderedDict()
+_render_lock = threading.Lock()
+
+
+def forecast_hash(predict_values):
+    """예측값 배열의 짧은 해시 (소수 둘째 자리까지 같은 예측이면 같은 값)."""
+    if predict_values is None:
+        return "none"
+    rounded = np.round(np.asarray(predict_values, dtype=np.float64), 2)
+    return hashlib.sha1(rounded.tobytes()).hexdigest()[:16]
+
+
+def series_hash(values, filled=None):
+    """그래프에 그리는 실측 값(NaN 포함)과 채운 칸 표시의 짧은 해시."""
+    h = hashlib.sha1(np.asarray(values, dtype=np.float64).tobytes())
+    if filled is not None:
+        h.update(np.asarray(filled, dtype=bool).tobytes())
+    return h.hexdigest()[:16]
+
+
+def render_cache_key(station, pm_type, last_time, predict_values, title="", values=None, filled=None):
+    """
+    PNG 캐시 key.
+    - values/filled: 그리는 실측 값과 채운 칸 → 빈 시간 채우기 방식이나 예측 창 밖의 값만 바뀌어도 다시 그림
+    """
+    last = last_time.strftime("%Y-%m-%d %H:%M") if last_time is not None else ""
+    drawn = series_hash(values, filled) if values is not None else ""
+    return (station, pm_type, last, forecast_hash(predict_values), drawn, title)
+
+
+def render_analysis_png(cache_key, times, values, predict_values, predict_times, pm_type, title,
+                        n_forecast_hours=3, font_prop=None, dpi=200):
+    """
+    build_analysis_figure 결과를 PNG 바이트로 반환 (cache_key가 같으면 캐시된 PNG).
+    - st.pyplot 대신 st.image로 보여 주면 됨
+    """
+    with _render_lock:
+        png = _render_cache.get(cache_key)
+        if png is not None:
+            _render_cache.move_to_end(cache_key)
+    if png is not None:
+        metrics.inc('air_render_cache_total', result='hit')
+        return png
+    metrics.inc('air_render_cache_total', result='miss')
+
+    import matplotlib.pyplot as plt
+
+    fig = build_analysis_figure(times, values, predict_values, predict_times, pm_type, title,
+                                n_forecast_hours=n_forecast_hours, font_prop=font_prop)
+    try:
+        buf = io.BytesIO()
+        fig.savefig(buf, format="png", dpi=dpi, bbox_inches="tight")  # st.pyplot과 같은 설정
+        png = buf.getvalue()
+    finally:
+        plt.close(fig)  # Figure를 닫지 않으면 pyplot이 계속 참조해서 메모리가 늘어남
+
+    with _render_lock:
+        _render_cache[cache_key] = png
+        _render_cache.move_to_end(cache_key)
+        while len(_render_cache) > RENDER_CACHE_SIZE:
+            _render_cache.popitem(last=False)
+    return png
+
+
+# ===== 가벼운 인터랙티브 차트 (Vega-Lite) =====
+# PNG 대신 작은 JSON 사양(data spec)만 브라우저로 보내고, 그리기는 브라우저가 한다.
+# 점마다 ax.text를 부르는 대신 text 마크 한 층으로 모든 값 라벨을 표시.
+def build_chart_spec(times, values, predict_values, predict_times, pm_type, title, n_forecast_hours=3,
+                     max_points=MAX_PLOT_POINTS):
+    """
+    build_analysis_figure와 같은 내용을 Vega-Lite 사양(dict)으로 만듦 (st.vega_lite_chart용).
+    - 실측 점이 max_points보다 많으면 LTTB로 줄이고, LABEL_LIMIT보다 많으면 값 라벨 층을 뺌
+    """
+    criteria = get_grade_criteria(pm_type)
+    actual_label = f'실측 {pm_type}'
+    forecast_label = f'향후 {n_forecast_hours}시간 예측'
+
+    plot_times, plot_values = downsample(times, values, max_points)
+    show_labels = len(plot_times) <= LABEL_LIMIT
+    points = [
+        {'t': t.strftime("%Y-%m-%dT%H:%M"), 'v': round(float(v), 1), 'kind': actual_label}
+        for t, v in zip(plot_times, plot_values)
+    ]
+    if predict_values is not None and points:
+        forecast = [points[-1]] + [
+            {'t': t.strftime("%Y-%m-%dT%H:%M"), 'v': round(float(v), 1)}
+            for t, v in zip(predict_times, predict_values)
+        ]
+        points += [dict(p, kind=forecast_label) for p in forecast]
+
+    # Y축 상한: 최대값의 1.2배 또는 '매우 나쁨' 기준의 1.2배 중 큰 쪽 (matplotlib 그래프와 같음)
+    max_val = max((p['v'] for p in points), default=0)
+    y_max_limit = max(max_val * 1.2, criteria['매우 나쁨'][0] * 1.2)
+    bands = [
+        {'grade': name, 'lo': lo, 'hi': min(hi, y_max_limit), 'color': GRADE_COLORS[name]}
+        for name, (lo, hi) in criteria.items()
+    ]
+
+    x = {'field': 't', 'type': 'temporal', 'title': '측정 시간', 'axis': {'format': '%m-%d %H:%M'}}
+    y = {'field': 'v', 'type': 'quantitative', 'title': f'{pm_type} 농도 (㎍/m³)',
+         'scale': {'domain': [0, y_max_limit]}}
+    kind_color = {'field': 'kind', 'type': 'nominal', 'title': None,
+                  'scale': {'domain': [actual_label, forecast_label], 'range': ['#2a4d8f', '#f28500']}}
+    spec = {
+        '$schema': 'https://vega.github.io/schema/vega-lite/v5.json',
+        'title': title,
+        'height': 420,
+        'layer': [
+            {
+                'data': {'values': bands},
+                'mark': {'type': 'rect', 'opacity': 0.1},
+                'encoding': {
+                    'y': {'field': 'lo', 'type': 'quantitative'},
+                    'y2': {'field': 'hi'},
+                    'color': {'field': 'color', 'type': 'nominal', 'scale': None},
+                    'tooltip': [{'field': 'grade', 'title': '등급'}],
+                },
+            },
+            {
+                'data': {'values': points},
+                'mark': {'type': 'line', 'point': show_labels, 'strokeWidth': 2 if show_labels else 1},
+                'encoding': {
+                    'x': x, 'y': y, 'color': kind_color,
+                    'strokeDash': {'field': 'kind', 'type': 'nominal', 'legend': None,
+                                   'scale': {'domain': [actual_label, forecast_label], 'range': [[1, 0], [6, 4]]}},
+                    'tooltip': [{'field': 't', 'type': 'temporal', 'format': '%m-%d %H:%M', 'title': '시간'},
+                                {'field': 'v', 'type': 'quantitative', 'title': '농도'}],
+                },
+            },
+        ],
+        'resolve': {'scale': {'color': 'independent'}},
+    }
+    if show_labels:
+        spec['layer'].append({
+            'data': {'values': points},
+            'mark': {'type': 'text', 'dy': -9, 'fontSize': 8},
+            'encoding': {'x': x, 'y': y, 'text': {'field': 'v', 'format': '.0f'}, 'color': kind_color},
+        })
+    return spec
@@ -0,0 +1,89 @@
+# ===== 그래프용 시계열 줄이기(downsampling) =====
+# 90일(2천 개 이상) 시계열을 그대로 그리면 점/라벨이 겹치고 화면이 멈춘다.
+# 모양을 유지하면서 점 수를 줄이는 두 가지 방법을 제공:
+# - lttb: Largest-Triangle-Three-Buckets. 구간마다 앞뒤 점과 만드는 삼각형 넓이가 가장 큰 점을 고름
+# - minmax: 구간마다 최소/최대값 점을 남김 (짧은 고농도 구간을 놓치지 않음)
+# 두 함수 모두 남길 점의 인덱스(오름차순)를 반환한다.
+import numpy as np
+
+
+def _as_float_x(times):
+    """datetime 리스트/배열 → 분 단위 float 배열 (넓이 계산용)."""
+    arr = np.asarray(times)
+    if np.issubdtype(arr.dtype, np.datetime64):
+        return arr.astype('datetime64[m]').astype(np.float64)
+    if arr.dtype == object:
+        return np.asarray(times, dtype='datetime64[m]').astype(np.float64)
+    return arr.astype(np.float64)
+
+
+def lttb(x, y, n_out):
+    """
+    LTTB로 n_out개 점의 인덱스를 고름 (첫 점과 마지막 점은 항상 포함).
+    - x: 오름차순 숫자 배열, y: 같은 길이의 값 배열 (NaN 없음)
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    # 첫/마지막 점을 뺀 나머지를 n_out - 2개 구간으로 나눔
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    prev = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        # 다음 구간의 평균 점 (마지막 구간이면 마지막 점)
+        if i + 2 < len(edges):
+            nxt = slice(edges[i + 1], edges[i + 2])
+            avg_x, avg_y = x[nxt].mean(), y[nxt].mean()
+        else:
+            avg_x, avg_y = x[-1], y[-1]
+        # 이전 선택 점, 후보 점, 다음 구간 평균으로 만든 삼각형 넓이(의 2배)
+        area = np.abs((x[prev] - avg_x) * (y[start:end] - y[prev])
+                      - (x[prev] - x[start:end]) * (avg_y - y[prev]))
+        prev = start + int(np.argmax(area))
+        selected[i + 1] = prev
+    return selected
+
+
+def minmax(y, n_buckets):
+    """구간마다 최소/최대값 인덱스를 남김 (첫/마지막 점 포함, 최대 2 * n_buckets + 2개)."""
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if 2 * n_buckets >= n or n_buckets < 1:
+        return np.arange(n)
+    edges = np.linspace(0, n, n_buckets + 1).astype(np.int64)
+    # reduceat으로 구간별 최소/최대값을 한 번에 구한 뒤 각 구간에서 그 값의 첫 위치를 찾음
+    starts = edges[:-1]
+    bucket = np.repeat(np.arange(n_buckets), np.diff(edges))
+    mins = np.minimum.reduceat(y, starts)
+    maxs = np.maximum.reduceat(y, starts)
+    idx = np.arange(n)
+    min_idx = np.full(n_buckets, n)
+    max_idx = np.full(n_buckets, n)
+    np.minimum.at(min_idx, bucket[y == mins[bucket]], idx[y == mins[bucket]])
+    np.minimum.at(max_idx, bucket[y == maxs[bucket]], idx[y == maxs[bucket]])
+    return np.unique(np.concatenate([[0, n - 1], min_idx, max_idx]))
+
+
+def downsample(times, values, max_points, method='lttb'):
+    """
+    (times, values)를 max_points개 안팎으로 줄여 리스트로 반환.
+    - 값이 없는 칸(NaN/None)은 먼저 제외
+    - 이미 max_points 이하면 그대로 반환
+    """
+    y = np.asarray(values, dtype=np.float64)
+    valid = np.flatnonzero(~np.isnan(y))
+    t_list = [times[i] for i in valid]
+    y = y[valid]
+    if len(y) <= max_points:
+        return t_list, y.tolist()
+    if method == 'minmax':
+        idx = minmax(y, max_points // 2)
+    else:
+        idx = lttb(_as_float_x(t_list), y, max_points)
+    return [t_list[i] for i in idx], [float(y[i]) for i in idx]
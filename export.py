@@ -0,0 +1,272 @@
+# ===== 측정 이력 내보내기 (CSV / Excel) =====
+# 로컬 시계열 저장소(air_store)의 여러 측정소 × 여러 항목 이력을 파일로 내보낸다.
+# - 저장소에서 chunk 단위로 읽어 바로 쓰므로 행 수와 관계없이 메모리 사용량이 일정함
+# - CSV: bytes 조각을 yield 하는 제너레이터 (HTTP 응답/파일에 그대로 흘려보냄)
+# - Excel: openpyxl write-only 모드 (행을 임시 파일로 바로 내보냄, 시트당 최대 행 수를 넘으면 다음 시트)
+# - start_http_server(port): /export.csv, /export.xlsx 스트리밍 다운로드 (Streamlit 요청 스레드 밖에서 처리)
+#   인증 없이 저장된 모든 측정소 이력을 내주므로 기본은 127.0.0.1에서만 받음
+#   (다른 장비에서 받아야 하면 host='0.0.0.0' / AIR_EXPORT_HOST로 명시적으로 열기)
+#
+# 사용 예:
+#   python export.py -o history.csv --stations 강남구,송파구 --start 2025-09-01
+#   python export.py -o history.xlsx --pollutants pm10,pm25
+#   python export.py -o - > history.csv          # 표준 출력으로
+import argparse
+import csv
+import io
+import os
+import sys
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlparse
+
+import numpy as np
+
+from air_parse import POLLUTANTS
+from air_store import default_store
+
+CHUNK_ROWS = 5000
+# Excel 시트 하나의 최대 행 수 (머리글 포함 1,048,576행)
+XLSX_MAX_ROWS = 1_048_575
+FILE_CHUNK_BYTES = 64 * 1024
+# Streamlit 앱 안에서 바로 받는 파일의 최대 행 수 (st.download_button은 파일 전체를 메모리에 올려 보냄)
+# 더 큰 내보내기는 스트리밍 엔드포인트(start_http_server)나 명령행(python export.py)으로
+IN_APP_MAX_ROWS = 100_000
+
+# 내보낼 때 쓰는 항목 이름 (파일 머리글)
+COLUMN_TITLES = {
+    'pm10': 'PM10 (㎍/m³)', 'pm25': 'PM2.5 (㎍/m³)', 'o3': 'O3 (ppm)',
+    'no2': 'NO2 (ppm)', 'co': 'CO (ppm)', 'so2': 'SO2 (ppm)',
+}
+
+
+def header(pollutants=POLLUTANTS):
+    return ["측정소", "측정 시간"] + [COLUMN_TITLES[p] for p in pollutants]
+
+
+def iter_records(store=default_store, stations=None, start=None, end=None,
+                 pollutants=POLLUTANTS, chunk_rows=CHUNK_ROWS):
+    """저장소 행을 chunk 단위 리스트로 yield ('YYYY-MM-DDTHH:MM' → 'YYYY-MM-DD HH:MM')."""
+    for rows in store.iter_rows(stations, start, end, columns=pollutants, chunk_size=chunk_rows):
+        yield [(row[0], row[1].replace("T", " "), *row[2:]) for row in rows]
+
+
+def iter_csv(store=default_store, stations=None, start=None, end=None,
+             pollutants=POLLUTANTS, chunk_rows=CHUNK_ROWS):
+    """
+    CSV 내용을 bytes 조각으로 yield (UTF-8 BOM 포함 → Excel에서 한글이 깨지지 않음).
+    - 조각 하나는 chunk_rows행 분량
+    """
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(header(pollutants))
+    yield ("\ufeff" + buf.getvalue()).encode("utf-8")
+    for rows in iter_records(store, stations, start, end, pollutants, chunk_rows):
+        buf.seek(0)
+        buf.truncate()
+        writer.writerows(rows)
+        yield buf.getvalue().encode("utf-8")
+
+
+def write_csv(path, **query):
+    """CSV 파일로 저장하고 쓴 바이트 수를 반환 (path가 '-'면 표준 출력)."""
+    out = sys.stdout.buffer if path == "-" else open(path, "wb")
+    written = 0
+    try:
+        for chunk in iter_csv(**query):
+            out.write(chunk)
+            written += len(chunk)
+    finally:
+        if out is not sys.stdout.buffer:
+            out.close()
+    return written
+
+
+def write_xlsx(path, store=default_store, stations=None, start=None, end=None,
+               pollutants=POLLUTANTS, chunk_rows=CHUNK_ROWS):
+    """
+    openpyxl write-only 모드로 Excel 파일을 만들고 데이터 행 수를 반환.
+    - 행은 바로 임시 파일로 내보내져 메모리에 쌓이지 않음
+    - 시트당 XLSX_MAX_ROWS를 넘으면 '측정값 2', '측정값 3' ... 시트로 이어서 씀
+    """
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    titles = header(pollutants)
+    sheet = None
+    sheet_rows = 0
+    total = 0
+    for rows in iter_records(store, stations, start, end, pollutants, chunk_rows):
+        for row in rows:
+            if sheet is None or sheet_rows >= XLSX_MAX_ROWS:
+                number = len(wb.worksheets) + 1
+                sheet = wb.create_sheet("측정값" if number == 1 else f"측정값 {number}")
+                sheet.append(titles)
+                sheet_rows = 0
+            sheet.append(row)
+            sheet_rows += 1
+            total += 1
+    if sheet is None:
+        wb.create_sheet("측정값").append(titles)
+    wb.save(path)
+    return total
+
+
+def export_to_tempfile(fmt, **query):
+    """형식('csv'/'xlsx')에 맞게 임시 파일로 내보내고 (경로, 행 수 또는 바이트 수) 반환."""
+    fd, path = tempfile.mkstemp(suffix="." + fmt, prefix="air_export_")
+    os.close(fd)
+    try:
+        size = write_xlsx(path, **query) if fmt == "xlsx" else write_csv(path, **query)
+    except BaseException:
+        os.remove(path)
+        raise
+    return path, size
+
+
+def iter_file(path, chunk_bytes=FILE_CHUNK_BYTES, remove=False):
+    """파일을 조각으로 읽어 yield (remove=True면 다 읽은 뒤 삭제)."""
+    try:
+        with open(path, "rb") as f:
+            while True:
+                chunk = f.read(chunk_bytes)
+                if not chunk:
+                    return
+                yield chunk
+    finally:
+        if remove:
+            os.remove(path)
+
+
+# ===== 스트리밍 다운로드 서버 =====
+# 예: http://host:8502/export.csv?stations=강남구,송파구&start=2025-09-01&pollutants=pm10,pm25
+def query_from_params(params):
+    """URL 쿼리(dict[str, list[str]]) → iter_csv/write_xlsx 인자."""
+    def split(name):
+        value = params.get(name, [""])[0]
+        return [v.strip() for v in value.split(",") if v.strip()] or None
+
+    query = {
+        'stations': split("stations"),
+        'start': params.get("start", [None])[0] or None,
+        'end': params.get("end", [None])[0] or None,
+        'pollutants': split("pollutants") or list(POLLUTANTS),
+    }
+    # 잘못된 인자는 내보내기를 시작하기 전에 ValueError로 알림 (응답 머리글을 보내기 전)
+    unknown = [p for p in query['pollutants'] if p not in POLLUTANTS]
+    if unknown:
+        raise ValueError(f"알 수 없는 항목: {', '.join(unknown)}")
+    for name in ('start', 'end'):
+        if query[name] is not None:
+            np.datetime64(query[name], 'm')
+    # 시각 없이 날짜(또는 월)만 준 끝은 그 기간 전체를 포함: 2025-09-30 → 2025-09-30T23:59
+    if query['end'] is not None:
+        end = np.datetime64(query['end'])
+        if end.dtype in (np.dtype('datetime64[D]'), np.dtype('datetime64[M]'), np.dtype('datetime64[Y]')):
+            query['end'] = str((end + 1).astype('datetime64[m]') - np.timedelta64(1, 'm'))
+    return query
+
+
+def stream_url(base_url, fmt, stations=None, start=None, end=None, pollutants=None):
+    """스트리밍 엔드포인트 주소 (query_from_params가 읽는 쿼리 형식)."""
+    params = {}
+    if stations:
+        params['stations'] = ",".join(stations)
+    if pollutants:
+        params['pollutants'] = ",".join(pollutants)
+    for name, value in (('start', start), ('end', end)):
+        if value is not None:
+            params[name] = str(np.datetime64(value, 'm'))
+    url = f"{base_url.rstrip('/')}/export.{fmt}"
+    return url + "?" + urlencode(params) if params else url
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def start_http_server(port, host="127.0.0.1"):
+    """
+    /export.csv, /export.xlsx 엔드포인트를 백그라운드 스레드로 실행 (이미 실행 중이면 그대로 반환).
+    - host: 기본은 이 장비에서만 접속 가능. 외부에 열려면 직접 지정 (인증이 없으므로 앞단 프록시 등에서 보호)
+    """
+    global _server
+    with _server_lock:
+        if _server is not None:
+            return _server
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # chunked 전송에 필요
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                fmt = {"/export.csv": "csv", "/export.xlsx": "xlsx"}.get(url.path)
+                if fmt is None:
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                try:
+                    query = query_from_params(parse_qs(url.query))
+                    if fmt == "csv":
+                        chunks = iter_csv(**query)
+                        content_type = "text/csv; charset=utf-8"
+                    else:
+                        path, _ = export_to_tempfile("xlsx", **query)
+                        chunks = iter_file(path, remove=True)
+                        content_type = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                except ValueError as e:
+                    body = str(e).encode("utf-8")
+                    self.send_response(400)
+                    self.send_header("Content-Type", "text/plain; charset=utf-8")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                    return
+
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Disposition", f'attachment; filename="air_history.{fmt}"')
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                for chunk in chunks:
+                    self._write_chunk(chunk)
+                self.wfile.write(b"0\r\n\r\n")
+
+            def _write_chunk(self, chunk):
+                self.wfile.write(f"{len(chunk):X}\r\n".encode("ascii") + chunk + b"\r\n")
+
+        _server = ThreadingHTTPServer((host, port), Handler)
+        _server.daemon_threads = True
+        threading.Thread(target=_server.serve_forever, name="air-export", daemon=True).start()
+        return _server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="로컬 저장소의 측정 이력을 CSV/Excel로 내보내기")
+    parser.add_argument("-o", "--output", required=True, help="출력 파일 (.csv/.xlsx, '-'면 CSV를 표준 출력으로)")
+    parser.add_argument("--stations", help="쉼표로 구분한 측정소 (기본: 전체)")
+    parser.add_argument("--pollutants", default=",".join(POLLUTANTS), help="쉼표로 구분한 항목")
+    parser.add_argument("--start", help="시작 시각 (예: 2025-09-01 또는 2025-09-01T06:00)")
+    parser.add_argument("--end", help="끝 시각 (포함, 날짜만 주면 그날 끝까지)")
+    args = parser.parse_args(argv)
+
+    query = query_from_params({
+        "stations": [args.stations or ""], "pollutants": [args.pollutants],
+        "start": [args.start or ""], "end": [args.end or ""],
+    })
+    if args.output.endswith(".xlsx"):
+        rows = write_xlsx(args.output, **query)
+        print(f"{rows}행 저장: {args.output}", file=sys.stderr)
+    else:
+        written = write_csv(args.output, **query)
+        if args.output != "-":
+            print(f"{written} bytes 저장: {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# ===== 한글 폰트 설정 =====
+# 그래프(및 범례)에 한글이 깨지지 않게 적절한 한글 폰트를 찾아 matplotlib에 설정.
+# - 폰트 탐색은 프로세스당 한 번만 수행하고(lru_cache), 찾은 결과는 파일로 저장해
+#   다음 프로세스에서는 fontManager.ttflist 전체를 훑지 않고 바로 사용한다.
+# - matplotlib은 실제로 그래프를 그릴 때(apply_korean_font 호출 시) 처음 import 된다.
+import functools
+import json
+import os
+
+FONT_CACHE_PATH = os.environ.get(
+    "AIR_FONT_CACHE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "korean_font.json"),
+)
+
+# 자주 쓰이는 한국어 폰트 이름들 (앞쪽이 우선)
+KOREAN_FONTS = ["NanumGothic", "Malgun Gothic", "Noto Sans CJK KR"]
+# 한글 폰트를 못 찾았을 때 쓰는 기본 폰트
+FALLBACK_FONT = "DejaVu Sans"
+
+
+def _load_persisted():
+    """저장해 둔 폰트 (이름, 파일 경로). 파일이 없어졌거나 저장본이 없으면 None."""
+    try:
+        with open(FONT_CACHE_PATH, encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    name, path = data.get("name"), data.get("path")
+    if name in KOREAN_FONTS and path and os.path.exists(path):
+        return name, path
+    return None
+
+
+def _persist(name, path):
+    try:
+        os.makedirs(os.path.dirname(FONT_CACHE_PATH), exist_ok=True)
+        with open(FONT_CACHE_PATH, "w", encoding="utf-8") as f:
+            json.dump({"name": name, "path": path}, f, ensure_ascii=False)
+    except OSError:
+        pass  # 저장 실패 시 다음 프로세스에서 다시 탐색할 뿐
+
+
+def _scan_font_manager():
+    """시스템 폰트 리스트에서 한글 폰트 (이름, 파일 경로)를 찾음. 없으면 None."""
+    import matplotlib.font_manager as fm
+
+    # fm.fontManager.ttflist: 시스템의 ttf 폰트 리스트(각 항목에 .name, .fname 속성 있음)
+    fonts = {f.name: f.fname for f in fm.fontManager.ttflist}
+    for name in KOREAN_FONTS:
+        if name in fonts:
+            return name, fonts[name]
+    return None
+
+
+@functools.lru_cache(maxsize=None)
+def resolve_korean_font():
+    """사용할 한글 폰트 이름 (없으면 None). 프로세스당 한 번만 계산."""
+    found = _load_persisted()
+    if found is None:
+        found = _scan_font_manager()
+        if found is not None:
+            _persist(*found)
+    return found[0] if found else None
+
+
+@functools.lru_cache(maxsize=None)
+def apply_korean_font():
+    """
+    찾은 한글 폰트를 matplotlib에 설정하고 FontProperties 객체를 반환 (legend 등에 사용).
+    - 못 찾으면 기본 영문 폰트(DejaVu Sans)를 쓰고 None 반환
+    """
+    import matplotlib
+    from matplotlib.font_manager import FontProperties
+
+    font_name = resolve_korean_font()
+    matplotlib.rcParams['axes.unicode_minus'] = False  # 음수 부호 깨짐 방지
+    if font_name is None:
+        return None
+    # matplotlib에 폰트 패밀리로 설정 (그래프 텍스트가 한글일 때 깨지지 않음)
+    matplotlib.rcParams['font.family'] = font_name
+    return FontProperties(family=font_name)
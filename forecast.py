@@ -0,0 +1,384 @@
+# ===== 선형 추세 예측 엔진 =====
+# 24개 안팎의 점에 직선을 맞추는 데 scikit-learn 추정기까지 쓸 필요가 없으므로
+# 최소제곱법의 충분통계량(n, Σy, Σxy)만으로 기울기/절편을 바로 계산한다.
+# - X는 항상 0, 1, 2, ... (값의 순번)이므로 Σx, Σx²는 n만으로 계산됨
+# - 새 시간 값이 들어오면 O(1)로 갱신, 가장 오래된 값을 빼는 것도 O(1)
+#   (IncrementalForecaster: 측정소별 상태를 유지해 정시마다 새 값만 더함 → prefetch.py)
+# - 여러 측정소를 (측정소 × 시간) 행렬로 받아 한 번의 행렬 연산으로 모두 예측 가능
+from collections import deque
+from datetime import timedelta
+
+import numpy as np
+
+# 예측값 하한 (음수 농도는 의미가 없음)
+MIN_PREDICTION = 1.0
+
+
+def _sum_x(n):
+    return n * (n - 1) / 2.0
+
+
+def _sum_xx(n):
+    return (n - 1) * n * (2 * n - 1) / 6.0
+
+
+def _solve(n, sum_y, sum_xy):
+    """충분통계량에서 (기울기, 절편) 계산. 배열이 들어오면 원소별로 계산."""
+    sx = _sum_x(n)
+    denom = n * _sum_xx(n) - sx * sx
+    with np.errstate(invalid='ignore', divide='ignore'):
+        slope = np.where(denom != 0, (n * sum_xy - sx * sum_y) / np.where(denom != 0, denom, 1), 0.0)
+        intercept = np.where(n > 0, (sum_y - slope * sx) / np.where(n > 0, n, 1), np.nan)
+    return slope, intercept
+
+
+class LinearTrend:
+    """
+    sklearn LinearRegression과 같은 속성/메서드를 가진 가벼운 모델 객체.
+    - coef_: 기울기 배열 (길이 1), intercept_: 절편
+    - predict(X): X는 (n, 1) 또는 1차원 순번 배열
+    """
+
+    def __init__(self, slope, intercept):
+        self.coef_ = np.array([float(slope)])
+        self.intercept_ = float(intercept)
+
+    def predict(self, X):
+        x = np.asarray(X, dtype=np.float64).reshape(-1)
+        return self.intercept_ + self.coef_[0] * x
+
+
+class RunningTrend:
+    """
+    한 측정소의 최근 window개 값에 대한 최소제곱 직선을 O(1)로 유지.
+    - add(y): 새 시간 값 추가 (window를 넘으면 가장 오래된 값 자동 제거)
+    - model(): 현재 직선(LinearTrend), predict(n_hours): 다음 n_hours 예측
+    """
+
+    def __init__(self, window=24, values=()):
+        self.window = window
+        self.values = deque()
+        self.sum_y = 0.0
+        self.sum_xy = 0.0
+        for v in values:
+            self.add(v)
+
+    def __len__(self):
+        return len(self.values)
+
+    def add(self, y):
+        y = float(y)
+        self.sum_xy += len(self.values) * y  # 새 값의 x는 현재 개수
+        self.sum_y += y
+        self.values.append(y)
+        if self.window and len(self.values) > self.window:
+            self.pop_oldest()
+
+    def pop_oldest(self):
+        y0 = self.values.popleft()
+        # 남은 값들의 x가 1씩 줄어듦: Σ(x-1)y = Σxy - Σy (x=0인 y0는 Σxy에 기여 없음)
+        self.sum_y -= y0
+        self.sum_xy -= self.sum_y
+
+    def model(self):
+        slope, intercept = _solve(len(self.values), self.sum_y, self.sum_xy)
+        return LinearTrend(slope, intercept)
+
+    def predict(self, n_hours=3):
+        n = len(self.values)
+        preds = self.model().predict(np.arange(n, n + n_hours))
+        return np.maximum(MIN_PREDICTION, preds)
+
+
+# 앱이 예측에 쓰는 창: 정시 격자(air_parse.hourly_grid)의 마지막 24칸 (main.py num_rows_to_fetch)
+WINDOW_HOURS = 24
+
+
+class IncrementalForecaster:
+    """
+    측정소별 RunningTrend 모음. 새 시간 값이 올 때마다 O(1)로 갱신.
+    - 창은 앱의 예측 입력과 같음: 정시 격자의 마지막 window칸 = 마지막 측정값 시각부터 window-1시간 전까지.
+      빈 시간(NaN)은 건너뛰고 값이 있는 시간에만 0, 1, 2, ... 순번을 매김 (linear_regression_predict와 같음)
+    - key: 보통 (측정소, 항목)
+    - update(key, time, value): 새 시간 값 하나 추가 + 창을 벗어난 값 제거
+    - sync(key, times, values): 격자에서 아직 없는 시간만 update (이미 가진 값이 바뀌었으면 다시 쌓음)
+    - predict(key, n_hours): linear_regression_predict와 같은 (예측값, 예측 시간, 모델)
+    """
+
+    def __init__(self, window=WINDOW_HOURS):
+        self.window = window
+        self.trends = {}  # key -> RunningTrend (창 안의 값)
+        self.times = {}   # key -> 값과 같은 순서의 측정 시각
+
+    def reset(self, key):
+        self.trends[key] = RunningTrend(window=None)
+        self.times[key] = deque()
+
+    def update(self, key, time, value):
+        """새 측정값 추가. NaN/None(빈 시간)은 격자 끝(마지막 측정값)이 그대로이므로 건너뜀."""
+        if value is None or value != value:
+            return
+        if key not in self.trends:
+            self.reset(key)
+        trend, times = self.trends[key], self.times[key]
+        if times and time <= times[-1]:
+            raise ValueError(f"{key}: {time}은(는) 마지막 시각 {times[-1]}보다 늦어야 합니다")
+        trend.add(value)
+        times.append(time)
+        start = time - timedelta(hours=self.window - 1)
+        while times[0] < start:
+            times.popleft()
+            trend.pop_oldest()
+
+    def sync(self, key, times, values):
+        """
+        정시 격자 (times, values)에 상태를 맞춤 → 'append'(새 값만 더함), 'same'(그대로), 'rebuild'(다시 쌓음).
+        - 창 안의 값이 격자와 다르면(에어코리아의 값 정정, 다른 프로세스가 받은 시간대를 건너뜀 등)
+          창 전체를 다시 쌓음 → 예측은 항상 같은 입력의 linear_regression_predict와 같음
+        """
+        values = np.asarray(values, dtype=np.float64)
+        valid = np.flatnonzero(~np.isnan(values))
+        known = self.times.get(key)
+        last = known[-1] if known else None
+        added = 0
+        for i in valid:
+            if last is None or times[i] > last:
+                self.update(key, times[i], values[i])
+                added += 1
+
+        if len(valid):
+            start = times[valid[-1]] - timedelta(hours=self.window - 1)
+            valid = [i for i in valid if times[i] >= start]
+        if (list(self.times.get(key, ())) == [times[i] for i in valid]
+                and np.array_equal(np.asarray(self.trends[key].values if valid else []), values[valid])):
+            return 'append' if added else 'same'
+        self.reset(key)
+        for i in valid:
+            self.update(key, times[i], values[i])
+        return 'rebuild'
+
+    def predict(self, key, n_hours=3):
+        trend = self.trends.get(key)
+        if trend is None or len(trend) < 3:
+            return None, None, None
+        last_time = self.times[key][-1]
+        predict_times = [last_time + timedelta(hours=i) for i in range(1, n_hours + 1)]
+        return trend.predict(n_hours), predict_times, trend.model()
+
+
+def fit_predict_batch(Y, n_hours=3, min_points=3):
+    """
+    여러 측정소를 한 번의 행렬 연산으로 예측.
+    - Y: (측정소 수, 시간 수) 배열, 오래된 순서. 결측은 NaN.
+      linear_regression_predict와 같게 결측을 뺀 값들에 0, 1, 2, ... 순번을 매긴다.
+    - 반환: (예측값 (측정소 수, n_hours), 기울기, 절편). 유효 값이 min_points 미만인 행은 NaN.
+    """
+    Y = np.atleast_2d(np.asarray(Y, dtype=np.float64))
+    valid = ~np.isnan(Y)
+    x = np.cumsum(valid, axis=1) - 1  # 결측을 건너뛴 순번
+    y = np.where(valid, Y, 0.0)
+    n = valid.sum(axis=1).astype(np.float64)
+
+    sum_y = y.sum(axis=1)
+    sum_xy = (np.where(valid, x, 0) * y).sum(axis=1)
+    slope, intercept = _solve(n, sum_y, sum_xy)
+
+    steps = n[:, None] + np.arange(n_hours)[None, :]
+    preds = np.maximum(MIN_PREDICTION, intercept[:, None] + slope[:, None] * steps)
+    preds[n < min_points] = np.nan
+    return preds, slope, intercept
+
+
+def linear_regression_predict(times, values, n_hours=3):
+    """
+    기존 main.py 함수와 같은 인터페이스.
+    - values: 값 배열/리스트 (정시 격자의 빈 시간은 NaN 또는 None → 건너뜀)
+    - 반환: (예측값 배열, 예측 시간 리스트, 모델) / 유효 값이 3개 미만이면 (None, None, None)
+    """
+    values = np.asarray(values, dtype=np.float64)
+    valid = ~np.isnan(values)
+
+    # 유효 값이 너무 적으면(3개 미만) 예측 모델을 만들 수 없음
+    if valid.sum() < 3:
+        return None, None, None
+
+    trend = RunningTrend(window=None, values=values[valid].tolist())
+    model = trend.model()
+    predict_values = trend.predict(n_hours)
+
+    # 마지막 유효 값의 시간을 기준으로 +1시간, +2시간, ... 예측 시간을 만든다
+    last_time = times[int(np.flatnonzero(valid)[-1])]
+    predict_times = [last_time + timedelta(hours=i) for i in range(1, n_hours + 1)]
+
+    return predict_values, predict_times, model
+
+
+# ===== 예측 모델 레지스트리 =====
+# 모든 모델은 같은 배치 인터페이스를 가짐:
+#   predict_batch(Y, n_hours) -> (측정소 수, n_hours) 예측 배열
+#   Y: (측정소 수, 시간 수) 정시 간격 행렬, 오래된 순서, 결측은 NaN
+# 유효 값이 MIN_POINTS 미만인 행은 NaN을 반환한다.
+MIN_POINTS = 3
+SEASON_HOURS = 24  # 미세먼지 일주기
+
+
+def _ffill(Y):
+    """행마다 앞의 값으로 결측을 채우고, 맨 앞 결측은 첫 유효 값으로 채움."""
+    valid = ~np.isnan(Y)
+    idx = np.where(valid, np.arange(Y.shape[1])[None, :], 0)
+    np.maximum.accumulate(idx, axis=1, out=idx)
+    first = np.argmax(valid, axis=1)
+    idx = np.where(np.arange(Y.shape[1])[None, :] < first[:, None], first[:, None], idx)
+    return Y[np.arange(Y.shape[0])[:, None], idx]
+
+
+def _finish(Y, preds):
+    """하한 적용 + 유효 값이 부족한 행은 NaN 처리."""
+    preds = np.maximum(MIN_PREDICTION, preds)
+    preds[(~np.isnan(Y)).sum(axis=1) < MIN_POINTS] = np.nan
+    return preds
+
+
+def linear_batch(Y, n_hours=3, window=24):
+    """최근 window시간에 대한 직선 (앱의 linear_regression_predict와 같은 계산)."""
+    Y = np.atleast_2d(np.asarray(Y, dtype=np.float64))
+    preds, _, _ = fit_predict_batch(Y[:, -window:], n_hours, min_points=MIN_POINTS)
+    return preds
+
+
+def holt_winters_batch(Y, n_hours=3, alpha=0.5, beta=0.1, gamma=0.3, period=SEASON_HOURS):
+    """
+    가법 Holt-Winters 지수평활 (주기 24시간).
+    이력이 두 주기보다 짧으면 계절 항 없이 Holt 선형 평활만 적용.
+    시간 축은 순서대로 돌지만 매 단계가 모든 측정소에 대한 배열 연산이다.
+    """
+    Y = np.atleast_2d(np.asarray(Y, dtype=np.float64))
+    F = _ffill(Y)
+    n_time = F.shape[1]
+    seasonal = n_time >= 2 * period
+    if n_time < 2:
+        return _finish(Y, np.repeat(F[:, -1:], n_hours, axis=1))
+
+    if seasonal:
+        first = F[:, :period].mean(axis=1)
+        level = first
+        trend = (F[:, period:2 * period].mean(axis=1) - first) / period
+        season = F[:, :period] - first[:, None]
+    else:
+        level = F[:, 0]
+        trend = F[:, 1] - F[:, 0]
+        season = np.zeros((F.shape[0], 1))
+        period = 1
+        gamma = 0.0
+
+    for t in range(n_time):
+        s = season[:, t % period]
+        y = F[:, t]
+        new_level = alpha * (y - s) + (1 - alpha) * (level + trend)
+        trend = beta * (new_level - level) + (1 - beta) * trend
+        season[:, t % period] = gamma * (y - new_level) + (1 - gamma) * s
+        level = new_level
+
+    steps = np.arange(1, n_hours + 1)
+    season_idx = (n_time + steps - 1) % period
+    preds = level[:, None] + steps[None, :] * trend[:, None] + season[:, season_idx]
+    return _finish(Y, preds)
+
+
+def ar_batch(Y, n_hours=3, p=3, ridge=1e-6):
+    """
+    AR(p) 자기회귀 (절편 포함). 측정소마다 최소제곱 계수를 구하되
+    (p+1)×(p+1) 정규방정식을 모든 측정소에 대해 한 번에 푼다.
+    """
+    Y = np.atleast_2d(np.asarray(Y, dtype=np.float64))
+    n_rows, n_time = Y.shape
+    if n_time <= p + 1:
+        return linear_batch(Y, n_hours)
+
+    # lags[:, t, :] = [y_{t}, y_{t+1}, ..., y_{t+p}] → 앞 p개가 입력, 마지막이 목표값
+    lags = np.lib.stride_tricks.sliding_window_view(Y, p + 1, axis=1)
+    ok = ~np.isnan(lags).any(axis=2)
+    X = np.concatenate([np.ones(lags.shape[:2] + (1,)), lags[:, :, :p]], axis=2)
+    X = np.where(ok[:, :, None], X, 0.0)
+    target = np.where(ok, lags[:, :, p], 0.0)
+
+    XtX = np.matmul(X.transpose(0, 2, 1), X)
+    XtX += ridge * np.eye(p + 1)[None, :, :]
+    Xty = np.matmul(X.transpose(0, 2, 1), target[:, :, None])[:, :, 0]
+    coef = np.linalg.solve(XtX, Xty[:, :, None])[:, :, 0]
+
+    # 최근 p개 값으로 한 단계씩 재귀 예측
+    hist = _ffill(Y)[:, -p:].copy()
+    preds = np.empty((n_rows, n_hours))
+    for h in range(n_hours):
+        nxt = coef[:, 0] + (coef[:, 1:] * hist).sum(axis=1)
+        preds[:, h] = nxt
+        hist = np.concatenate([hist[:, 1:], nxt[:, None]], axis=1)
+
+    # 학습에 쓸 행이 부족한 측정소는 직선 예측으로 대체
+    few = ok.sum(axis=1) < p + 1
+    if few.any():
+        preds[few] = linear_batch(Y[few], n_hours)
+    return _finish(Y, preds)
+
+
+def seasonal_naive_batch(Y, n_hours=3, period=SEASON_HOURS):
+    """어제 같은 시각의 값을 그대로 예측 (값이 없으면 가장 최근 값)."""
+    Y = np.atleast_2d(np.asarray(Y, dtype=np.float64))
+    F = _ffill(Y)
+    n_time = F.shape[1]
+    steps = np.arange(n_hours)
+    idx = n_time - period + (steps % period)
+    preds = np.where(idx[None, :] >= 0, F[:, np.clip(idx, 0, None)], F[:, -1:])
+    return _finish(Y, preds)
+
+
+class ForecastModel:
+    """레지스트리 항목: 이름, 설명, 배치 예측 함수."""
+
+    def __init__(self, name, description, predict_batch):
+        self.name = name
+        self.description = description
+        self.predict_batch = predict_batch
+
+    def __repr__(self):
+        return f"ForecastModel({self.name!r})"
+
+
+MODELS = {}
+
+
+def register_model(name, description, predict_batch):
+    """새 예측 모델을 레지스트리에 등록 (같은 이름이면 교체)."""
+    MODELS[name] = ForecastModel(name, description, predict_batch)
+    return MODELS[name]
+
+
+register_model('linear', '최근 24시간 직선 추세', linear_batch)
+register_model('holt_winters', 'Holt-Winters 지수평활 (24시간 주기)', holt_winters_batch)
+register_model('ar', 'AR(3) 자기회귀', ar_batch)
+register_model('seasonal_naive', '어제 같은 시각 값', seasonal_naive_batch)
+
+
+def predict(times, values, n_hours=3, model='linear'):
+    """
+    linear_regression_predict와 같은 인터페이스로 레지스트리의 모델을 사용.
+    - model: MODELS의 이름
+    - 반환: (예측값 배열, 예측 시간 리스트, 모델) / 숫자가 3개 미만이면 (None, None, None)
+      linear는 기존처럼 LinearTrend(coef_, intercept_, predict)를, 나머지는 ForecastModel을 반환.
+    """
+    if model == 'linear':
+        return linear_regression_predict(times, values, n_hours=n_hours)
+
+    values = np.asarray(values, dtype=np.float64)
+    valid = ~np.isnan(values)
+    if valid.sum() < MIN_POINTS:
+        return None, None, None
+
+    # 배치 모델은 정시 간격 행렬을 받으므로 빈 시간(NaN)도 그대로 넘김 (계절 주기가 어긋나지 않도록)
+    entry = MODELS[model]
+    last = int(np.flatnonzero(valid)[-1])
+    predict_values = entry.predict_batch(values[None, :last + 1], n_hours)[0]
+    last_time = times[last]
+    predict_times = [last_time + timedelta(hours=i) for i in range(1, n_hours + 1)]
+    return predict_values, predict_times, entry
@@ -0,0 +1,157 @@
+# ===== 미세먼지 등급 기준 및 판정 =====
+# main.py 화면, 부가 정보 페이지(pages/project_2.py), 전국 지도, 예측 백테스트(backtest.py)가
+# 같은 기준을 쓰도록 한 곳에 모아 둠.
+# - GRADE_TABLE: 항목별 등급 경계와 행동 수칙 (화면 문구도 여기서 만듦)
+# - grade_codes/grade_batch: 값 배열(측정소 × 시간 등 모양 무관)을 searchsorted 한 번으로 등급 판정
+import numpy as np
+
+# 등급 이름 (낮은 농도 → 높은 농도 순서, grade_codes의 코드 0~3과 대응)
+GRADE_NAMES = ('좋음', '보통', '나쁨', '매우 나쁨')
+# 값이 없어(NaN) 판정할 수 없는 경우 (코드 -1)
+UNKNOWN_GRADE = '정보 없음'
+GRADE_ICONS = ('✅', '🟡', '🟠', '🔴')
+GRADE_COLORS = {'좋음': 'green', '보통': 'yellow', '나쁨': 'orange', '매우 나쁨': 'red'}
+# 등급별 행동 권장 문구 (recommend_by_value / grade_messages)
+GRADE_MESSAGES = (
+    "🌿 좋음: 외부 활동 안전",
+    "🙂 보통: 민감군은 주의, 가벼운 외출 가능",
+    "⚠️ 나쁨: 장시간 외출 피하고 마스크 착용",
+    "🔥 매우 나쁨: 외출 자제, 실내 활동 권장",
+)
+NO_VALUE_MESSAGE = "예측값을 계산할 수 없어."
+
+# 항목별 등급 기준표: 등급마다 (하한, 상한) ㎍/m³와 부가 정보 페이지의 행동 수칙
+GRADE_TABLE = {
+    'PM10': [
+        {'grade': '좋음', 'range': (0, 30), 'level': '안전', 'risk': '🟢 매우 낮음',
+         'outdoor': '자유롭게 가능', 'ventilation': '자주 환기하세요', 'mask': '필요 없음'},
+        {'grade': '보통', 'range': (31, 80), 'level': '주의', 'risk': '🟡 낮음',
+         'outdoor': '일반인은 정상 활동, 민감군은 장시간 활동 자제',
+         'ventilation': '오전 10시~오후 4시 권장', 'mask': '민감군은 착용 권장'},
+        {'grade': '나쁨', 'range': (81, 150), 'level': '위험', 'risk': '🟠 보통',
+         'outdoor': '장시간 또는 격렬한 활동 제한', 'ventilation': '최소화', 'mask': 'KF80 이상 필수 착용'},
+        {'grade': '매우 나쁨', 'range': (151, float('inf')), 'level': '심각', 'risk': '🔴 높음',
+         'outdoor': '전면 금지', 'ventilation': '창문 닫고 공기청정기 사용',
+         'mask': '외출 시 KF94 이상 필수, 실외 활동 자제'},
+    ],
+    'PM2.5': [
+        {'grade': '좋음', 'range': (0, 15), 'level': '안전', 'risk': '🟢 매우 낮음',
+         'outdoor': '자유롭게 가능', 'ventilation': '자주 환기하세요', 'mask': '필요 없음'},
+        {'grade': '보통', 'range': (16, 35), 'level': '주의', 'risk': '🟡 낮음',
+         'outdoor': '일반인은 정상 활동, 민감군은 장시간 활동 자제',
+         'ventilation': '적절한 시간에 환기', 'mask': '민감군(노약자, 어린이, 호흡기 질환자)은 착용 권장'},
+        {'grade': '나쁨', 'range': (36, 75), 'level': '위험', 'risk': '🟠 보통~높음',
+         'outdoor': '장시간 또는 격렬한 활동 제한', 'ventilation': '최소화하고 공기청정기 사용',
+         'mask': 'KF80 이상 필수 착용 (특히 어린이, 노약자)'},
+        {'grade': '매우 나쁨', 'range': (76, float('inf')), 'level': '심각', 'risk': '🔴 매우 높음 (심혈관 위험)',
+         'outdoor': '전면 금지', 'ventilation': '절대 금지, 공기청정기 필수',
+         'mask': '외출 시 KF94 이상 필수, 가급적 외출 자제'},
+    ],
+}
+
+# 예전 이름 그대로 쓰는 {등급: (하한, 상한)} (chart.py 등)
+PM10_CRITERIA = {row['grade']: row['range'] for row in GRADE_TABLE['PM10']}
+PM25_CRITERIA = {row['grade']: row['range'] for row in GRADE_TABLE['PM2.5']}
+
+# 등급 판정에 쓰는 경계: '보통'/'나쁨'/'매우 나쁨'의 하한 (이 값 이상이면 그 등급)
+_LOWER_BOUNDS = {
+    pm_type: np.array([row['range'][0] for row in rows[1:]], dtype=np.float64)
+    for pm_type, rows in GRADE_TABLE.items()
+}
+_NAME_LOOKUP = np.array(GRADE_NAMES + (UNKNOWN_GRADE,), dtype=object)
+_MESSAGE_LOOKUP = np.array(GRADE_MESSAGES + (NO_VALUE_MESSAGE,), dtype=object)
+
+
+def _table_key(pm_type):
+    return 'PM10' if pm_type == 'PM10' else 'PM2.5'
+
+
+def get_grade_criteria(pm_type):
+    """pm_type이 'PM10'이면 PM10 기준, 아니면 PM25 기준을 반환."""
+    return PM10_CRITERIA if pm_type == 'PM10' else PM25_CRITERIA
+
+
+def format_range(lo, hi, sep=" ~ ", unit=""):
+    """등급 범위 표시 문자열 (예: '0 ~ 30 ㎍/m³', 상한이 없으면 '151 ㎍/m³ 이상')."""
+    unit = f" {unit}" if unit else ""
+    return f"{lo}{unit} 이상" if hi == float('inf') else f"{lo}{sep}{hi}{unit}"
+
+
+def grade_codes(values, pm_type='PM10'):
+    """
+    농도 배열을 등급 코드 배열로 변환 (0=좋음, 1=보통, 2=나쁨, 3=매우 나쁨).
+    - 각 등급의 하한 이상이면 그 등급 (recommend_by_value와 같은 경계)
+    - 입력 모양 그대로 반환 (스칼라, 측정소 × 시간 행렬 등). NaN은 -1
+    """
+    values = np.asarray(values, dtype=np.float64)
+    codes = np.searchsorted(_LOWER_BOUNDS[_table_key(pm_type)], values, side='right')
+    return np.where(np.isnan(values), -1, codes)
+
+
+def grade_names(codes):
+    """등급 코드 배열 → 등급 이름 배열 (-1은 UNKNOWN_GRADE)."""
+    return _NAME_LOOKUP[np.asarray(codes)]
+
+
+def grade_messages(codes):
+    """등급 코드 배열 → 행동 권장 문구 배열 (-1은 NO_VALUE_MESSAGE)."""
+    return _MESSAGE_LOOKUP[np.asarray(codes)]
+
+
+def grade_durations(codes, step_hours=1):
+    """
+    마지막 축(시간)을 따라 등급별로 머문 시간을 셈.
+    - codes: (..., 시간 수) 등급 코드 배열
+    - 반환: (..., 4) 배열 (좋음/보통/나쁨/매우 나쁨 순, 단위: 시간). 값 없는 칸(-1)은 세지 않음
+    """
+    codes = np.asarray(codes)
+    onehot = codes[..., None] == np.arange(len(GRADE_NAMES))
+    return onehot.sum(axis=-2) * step_hours
+
+
+def grade_timeline(codes, times):
+    """
+    같은 등급이 이어진 구간 목록 (등급이 바뀌는 시점에서 자름).
+    - codes: (시간 수,) 또는 (측정소 수, 시간 수), times: 길이가 시간 수인 시각 배열
+    - 반환: [(등급 이름, 시작 시각, 끝 시각), ...] (2차원이면 측정소별 리스트의 리스트)
+    """
+    codes = np.asarray(codes)
+    if codes.ndim == 2:
+        return [grade_timeline(row, times) for row in codes]
+    if codes.size == 0:
+        return []
+    # 등급이 바뀌는 위치를 한 번에 구해 구간 경계로 씀
+    starts = np.concatenate([[0], np.flatnonzero(codes[1:] != codes[:-1]) + 1])
+    ends = np.concatenate([starts[1:] - 1, [len(codes) - 1]])
+    names = grade_names(codes[starts])
+    return [(str(name), times[s], times[e]) for name, s, e in zip(names, starts, ends)]
+
+
+def grade_batch(values, pm_type='PM10', times=None, step_hours=1):
+    """
+    측정값/예측값 배열을 한 번에 판정.
+    - values: (시간 수,) 또는 (측정소 수, 시간 수) 배열, 결측은 NaN
+    - 반환 dict: codes, names, messages (values와 같은 모양),
+      durations (등급별 시간, 마지막 축 기준), timeline (times를 주면 등급 구간 목록)
+    """
+    codes = grade_codes(values, pm_type)
+    result = {
+        'codes': codes,
+        'names': grade_names(codes),
+        'messages': grade_messages(codes),
+        'durations': grade_durations(codes, step_hours) if codes.ndim else None,
+    }
+    if times is not None:
+        result['timeline'] = grade_timeline(codes, times)
+    return result
+
+
+def recommend_by_value(val, pm_type='PM10'):
+    """
+    주어진 농도 값(val)에 따라 행동 권장 문구 반환.
+    - val이 None(또는 NaN)이면 예측 불가 메시지 반환.
+    - 등급 경계에 따라 적절한 메시지(좋음/보통/나쁨/매우 나쁨).
+    """
+    if val is None:
+        return NO_VALUE_MESSAGE
+    return str(grade_messages(grade_codes(val, pm_type)))
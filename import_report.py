@@ -0,0 +1,108 @@
+# ===== import 시간 리포트 =====
+# Streamlit은 위젯을 바꿀 때마다 main.py를 다시 실행하고, 새 프로세스의 첫 화면은
+# main.py 맨 위의 import가 끝나야 그려진다. 이 스크립트는 `python -X importtime`으로
+# (1) 첫 화면에 필요한 모듈과 (2) 분석 결과를 그릴 때로 미룬 무거운 모듈의 import 시간을
+# 따로 재서, 지연 import로 첫 화면에서 빠진 시간을 보여 준다.
+#
+# 사용 예:
+#   python import_report.py            # 요약
+#   python import_report.py --top 15   # 누적 시간이 큰 모듈 15개씩 함께 출력
+import argparse
+import ast
+import os
+import subprocess
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+def startup_modules(path=os.path.join(HERE, "main.py")):
+    """
+    main.py가 첫 화면을 그리며 import 하는 모듈 (등장 순서, 중복 제거).
+    - 모듈 최상위 문장과 그 안의 if/try/with 블록의 import만 셈 (함수 안 import는 지연 import라 제외)
+    - 목록을 손으로 관리하면 main.py에 import가 늘어도 리포트가 따라가지 못하므로 매번 소스에서 읽음
+    """
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read(), filename=path)
+    names = []
+
+    def visit(statements):
+        for node in statements:
+            if isinstance(node, ast.Import):
+                names.extend(alias.name for alias in node.names)
+            elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+                names.append(node.module)
+            elif isinstance(node, (ast.If, ast.Try, ast.With)):
+                for field in ("body", "orelse", "finalbody"):
+                    visit(getattr(node, field, []))
+                for handler in getattr(node, "handlers", []):
+                    visit(handler.body)
+
+    visit(tree.body)
+    return list(dict.fromkeys(names))
+
+
+# main.py가 첫 화면을 그리기 전에 import 하는 모듈
+STARTUP_MODULES = startup_modules()
+# 예전에는 main.py 맨 위에서 import 했지만 지금은 분석 결과를 그릴 때까지 미룬 모듈
+# (sklearn은 forecast.py로 바꾸면서 아예 import 하지 않음)
+DEFERRED_MODULES = ["matplotlib.pyplot", "matplotlib.font_manager", "sklearn.linear_model"]
+
+
+def import_times(modules):
+    """
+    새 파이썬 프로세스에서 modules를 import 하며 -X importtime 결과를 읽음.
+    - 반환: {모듈 이름: 누적 시간(µs)}. 설치되지 않은 모듈은 건너뜀.
+    """
+    code = "\n".join(
+        f"try:\n    import {name}\nexcept ImportError:\n    pass" for name in modules
+    )
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=HERE, capture_output=True, text=True,
+    )
+    times = {}
+    for line in proc.stderr.splitlines():
+        # 형식: "import time:  self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3:
+            continue
+        name = parts[2].strip()
+        times[name] = max(times.get(name, 0), int(parts[1]))
+    return times
+
+
+def total_for(times, modules):
+    """최상위로 import 한 모듈들의 누적 시간 합(µs). 이미 다른 모듈이 불러온 것은 0."""
+    return sum(times.get(name, 0) for name in modules)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="main.py 첫 화면 import 시간 리포트")
+    parser.add_argument("--top", type=int, default=0, help="누적 시간이 큰 모듈을 몇 개씩 보여 줄지")
+    args = parser.parse_args(argv)
+
+    startup = import_times(STARTUP_MODULES)
+    # 첫 화면 모듈을 이미 불러온 상태에서 추가로 드는 시간 = 분석 시점으로 미룬 비용
+    with_deferred = import_times(STARTUP_MODULES + DEFERRED_MODULES)
+    startup_ms = total_for(startup, STARTUP_MODULES) / 1000
+    deferred_ms = total_for(with_deferred, DEFERRED_MODULES) / 1000
+
+    print(f"첫 화면 import 시간         : {startup_ms:8.1f} ms")
+    print(f"미루거나 없앤 import       : {deferred_ms:8.1f} ms")
+    print(f"예전 방식(모두 맨 위 import) : {startup_ms + deferred_ms:8.1f} ms")
+    if startup_ms + deferred_ms > 0:
+        print(f"첫 화면에서 줄어든 비율      : {deferred_ms / (startup_ms + deferred_ms):8.1%}")
+
+    if args.top:
+        for title, times, modules in (("첫 화면", startup, STARTUP_MODULES),
+                                      ("미룬 모듈", with_deferred, DEFERRED_MODULES)):
+            print(f"\n[{title}] 누적 시간 상위 {args.top}개")
+            for name in sorted(modules, key=lambda n: -times.get(n, 0))[:args.top]:
+                if name in times:
+                    print(f"  {times[name] / 1000:8.1f} ms  {name}")
+
+
+if __name__ == "__main__":
+    main()
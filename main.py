@@ -1,217 +1,93 @@
 # ===== 라이브러리 임포트 =====
 import requests                 # HTTP 요청을 보낼 때 사용 (API 호출)
-import json                     # JSON 파싱(필요시, 여기선 r.json() 사용)
-import matplotlib.pyplot as plt # 그래프 그릴 때 사용 (matplotlib)
 import numpy as np             # 숫자 배열·계산용 (선형대수, 인덱스 생성 등)
 import streamlit as st         # Streamlit UI를 만들 때 사용
 from datetime import datetime, timedelta  # 시간 관련 처리 (파싱/시간 더하기 등)
-from sklearn.linear_model import LinearRegression  # 선형회귀 모델 (예측에 사용)
-import matplotlib.font_manager as fm  # 시스템 폰트 탐색/설정용
-import os  # 운영체제 관련 (여기선 주석에선 사용 안 함)
-
-# ===== 한글 폰트 설정 함수 =====
-def set_korean_font():
-    """
-    그래프(및 범례)에 한글이 깨지지 않게 적절한 한글 폰트를 찾아 matplotlib에 설정.
-    - 시스템에 설치된 폰트 리스트에서 'NanumGothic', 'Malgun Gothic', 'Noto Sans CJK KR' 중 하나를 찾음.
-    - 찾으면 plt.rcParams['font.family']에 설정하고 FontProperties 객체를 반환.
-    - 못 찾으면 기본 영문 폰트('DejaVu Sans')를 쓰고 streamlit 사이드바에 경고를 띄움.
-    """
-    # 내부 도우미: 시스템 폰트 리스트에서 이름 찾기
-    def find_font_name():
-        # fm.fontManager.ttflist: 시스템의 ttf 폰트 리스트(각 항목에 .name 속성 있음)
-        font_list = [f.name for f in fm.fontManager.ttflist]
-        # 자주 쓰이는 한국어 폰트 이름들을 순서대로 확인
-        for name in ["NanumGothic", "Malgun Gothic", "Noto Sans CJK KR"]:
-            if name in font_list:
-                return name
+import os  # 운영체제 관련 (환경변수로 계측/관리자 패널 설정을 읽음)
+import sqlite3  # 로컬 시계열 저장소(air_store) 오류 처리용
+
+# ===== 한글 폰트 설정 =====
+# 폰트 탐색은 fonts.py에서 프로세스당 한 번만 수행하고 결과를 파일로 저장해 둠.
+# matplotlib import와 폰트 적용은 실제로 그래프를 그릴 때(분석 결과 표시)까지 미룬다.
+from fonts import FALLBACK_FONT, apply_korean_font
+
+# ===== API 호출 함수 / 측정소 목록 =====
+# fetch_air_data는 공유 캐시와 함께 airkorea.py로, 측정소 맵은 stations.py로 옮김
+# (전국 일괄 조회 등 다른 페이지/스크립트에서도 재사용)
+from airkorea import CircuitOpenError, fetch_air_data, iter_air_pages, last_known_good
+from air_cache import STALE_WARN_AGE, now_kst
+from station_catalog import load_catalog
+from air_parse import POLLUTANTS, concat_frames, hourly_grid, parse_items, parse_stations, select_series
+from air_store import data_term_for, default_store
+
+def pm_grid(frame, key='pm10Value', fill='leave'):
+    # parse_items로 만든 열 단위 데이터(frame)에서 PM 값(pm10Value 또는 pm25Value)을
+    # 1시간 간격 격자에 맞춰 꺼냄 (air_parse.hourly_grid)
+    # - 값이 없는 시간('-', 품질 플래그, 아예 빠진 시간)은 NaN → 그래프/예측이 그대로 건너뜀
+    # - fill: 빈 시간 채우기 ('leave' 그대로, 'interpolate' 선형 보간, 'ffill' 직전 값)
+
+    # API 키(pm10Value) -> 열 이름(pm10)
+    column = key[:-len('Value')] if key.endswith('Value') else key
+    grid = hourly_grid(frame, column, fill=fill)
+    # datetime64 -> datetime (그래프/strftime용)
+    grid['times'] = grid['time'].astype('datetime64[m]').astype(datetime).tolist()
+    return grid
+
+
+def pm_series(frame, key='pm10Value'):
+    # (times 리스트, 값 배열) - 정시 미리 받기(prefetch.py)도 같은 입력으로 예측하도록 넘겨 줌
+    grid = pm_grid(frame, key)
+    return grid['times'], grid['values']
+
+
+def load_fallback(station, num_rows=24):
+    # API 장애 때 보여 줄 마지막 데이터 (열 단위 frame). 없으면 None
+    # 1) 오래됐더라도 공유 캐시에 남은 마지막 응답
+    items, _ = last_known_good(station, num_rows=num_rows)
+    if items:
+        frame = parse_items(items, station)
+        if len(frame['time']):
+            return frame
+    # 2) 로컬 시계열 저장소의 최근 num_rows개
+    try:
+        frame = default_store.load_frame([station])
+    except sqlite3.Error:
         return None
+    if not len(frame['time']):
+        return None
+    return {name: column[-num_rows:] for name, column in frame.items()}
 
-    font_name = find_font_name()
-
-    if font_name:
-        # matplotlib에 폰트 패밀리로 설정 (그래프 텍스트가 한글일 때 깨지지 않음)
-        plt.rcParams['font.family'] = font_name
-        plt.rcParams['axes.unicode_minus'] = False  # 음수 부호 깨짐 방지
-        font_prop = fm.FontProperties(family=font_name)  # legend 등에 사용 가능
-    else:
-        # 발견 실패: 기본 폰트 사용, 유저에게 경고
-        font_name = "DejaVu Sans"
-        st.sidebar.warning(f"적절한 한글 폰트를 찾을 수 없습니다. 기본 폰트({font_name}) 사용.")
-        font_prop = None
-
-    plt.rcParams['axes.unicode_minus'] = False
-    return font_prop
-
-# 한 번만 수행: 폰트 객체를 전역으로 보관
-font_prop = set_korean_font()
-
-# ===== API 키 (공공데이터 포털) =====
-API_KEY = "aea45d5692f9dc0fb20ff49e2cf104f6614d3a17df9e92420974a5defb3cd75e"
-# -> 실제 운영 시에는 하드코딩보다 환경변수나 비밀 관리 사용 권장
-
-# ===== API 호출 함수 =====
-def fetch_air_data(station_name, num_rows=24):
-    """
-    주어진 측정소 이름(station_name)에 대해 실시간 측정값을 요청하여 JSON 아이템 리스트 반환.
-    - num_rows: 요청할 항목 개수 (여기선 24로 고정 사용)
-    - API 엔드포인트: getMsrstnAcctoRltmMesureDnsty
-    - 주의: HTTP 응답 코드가 200이 아니면 requests.raise_for_status()가 예외를 던짐.
-    """
-    URL = "https://apis.data.go.kr/B552584/ArpltnInforInqireSvc/getMsrstnAcctoRltmMesureDnsty"
-    params = {
-        'serviceKey': API_KEY,
-        'returnType': 'json',
-        'numOfRows': num_rows,
-        'stationName': station_name,
-        'dataTerm': 'DAILY',
-        'ver': '1.3'
-    }
-
-    r = requests.get(URL, params=params, timeout=10)  # 타임아웃 10초
-    r.raise_for_status()  # HTTP 에러(4xx/5xx)면 예외 발생
-    data = r.json()  # JSON -> 파이썬 dict
-
-    # 응답 구조: response -> body -> items (list)
-    items = data['response']['body']['items']
-    return items
 
 def parse_pm(items, key='pm10Value'):
-    # API에서 받은 데이터(items)에서
-    # - 측정 시간(dataTime)
-    # - PM 값(pm10Value 또는 pm25Value)
-    # 두 가지를 뽑아 리스트로 만들어 반환
-
-    times = []    # 시간이 저장될 리스트
-    values = []   # 측정값이 저장될 리스트
-    error_injected = False  # 테스트용 오류 한 번만 넣기
-
-    for it in items:
-        t = it.get('dataTime')   # 예: "2025-12-05 20:00"
-        val = it.get(key)        # 예: "35", "-", None 등
-
-        # PM 값을 숫자로 바꾸기
-        try:
-            v = float(val)
-
-            # 테스트용: 첫 번째 정상 데이터에 일부러 문자열 삽입
-            # 실제 서비스에서는 반드시 제거해야 하는 부분
-            if not error_injected:
-                v = "ERROR_VAL"   # 일부러 숫자가 아닌 값을 넣어 오류 유도
-                error_injected = True
-
-        except:
-            # 숫자로 바꿀 수 없는 경우(예: '-', '', None)는 무시하고 넘어가기
-            continue
-
-        # 시간 문자열을 datetime으로 바꾸기 (두 가지 형식을 시도)
-        dt = None
-        for fmt in ("%Y-%m-%d %H:%M", "%Y%m%d%H%M"):
-            try:
-                dt = datetime.strptime(t, fmt)
-                break   # 성공하면 멈춤
-            except:
-                continue  # 실패하면 다음 형식 시도
-
-        # 어떤 형식에도 맞지 않으면 시간 정보가 없으므로 건너뛰기
-        if dt is None:
-            continue
-
-        # 최종적으로 시간과 값 추가
-        times.append(dt)
-        values.append(v)
+    # API에서 받은 데이터(items)를 배열 단위로 한 번에 변환(air_parse.parse_items)한 뒤
+    # 원하는 항목의 (times, values) 리스트를 반환
+    return pm_series(parse_items(items), key=key)
 
-    # 반환 전에 리스트를 오래된 순서 → 최신 순서로 뒤집어 정렬
-    return times[::-1], values[::-1]
 
-
-# ===== 선형 회귀 예측 함수 =====
-def linear_regression_predict(times, values, n_hours=3):
-    
-    # values 중에서 숫자(int, float)만 골라서 새 리스트에 담기
-    # → ERROR_VAL 같은 글자는 제거됨
-    numeric_values = [v for v in values if isinstance(v, (int, float))]
-
-    # 만약 숫자가 너무 적으면(3개 미만) 예측 모델을 만들 수 없음
-    if len(numeric_values) < 3:
-        return None, None, None
-
-    try:
-        # X는 숫자의 개수만큼 0,1,2,... 증가하는 번호
-        # 예: 값이 5개면 X = [[0],[1],[2],[3],[4]]
-        # 선형회귀 모델은 이렇게 '번호'를 기준으로 패턴을 찾는다
-        X = np.arange(len(numeric_values)).reshape(-1,1)
-
-        # y는 실제 숫자 데이터 (미세먼지 값 등)
-        y = np.array(numeric_values)
-
-    except ValueError:
-        # 만약 배열을 만드는 도중 오류가 나면 예측을 할 수 없음
-        st.warning("경고: 예측 데이터 준비 중 오류가 발생했습니다. 예측을 건너뜁니다.")
-        return None, None, None
-
-    # 선형 회귀 모델 학습 (X → y 관계를 공부함)
-    model = LinearRegression().fit(X, y)
-
-    # 앞으로 n_hours 만큼 미래를 예측하기 위해
-    # 예측할 X 번호를 새로 만듦
-    # 예: 기존 데이터가 5개면 예측 X = [5,6,7] (3시간 예측 기준)
-    X_pred = np.arange(len(numeric_values), len(numeric_values) + n_hours).reshape(-1, 1)
-
-    # 위의 번호(X_pred)에 대해 모델이 예측한 값
-    predict_values = model.predict(X_pred)
-
-    # 혹시 예측값이 너무 작게 나와서 음수가 되면 의미가 없으니
-    # 최소값을 1로 맞춰줌
-    predict_values = np.maximum(1.0, predict_values)
-
-    # 예측 시간이 언제인지 계산하기
-    # times 리스트의 마지막 시간을 기준으로
-    # +1시간, +2시간, ... 식으로 예측 시간을 만든다
-    last_time = times[-1]
-    predict_times = [last_time + timedelta(hours=i) for i in range(1, n_hours + 1)]
-
-    # 예측값 / 예측시간 / 학습된 모델을 반환
-    return predict_values, predict_times, model
+from chart import build_chart_spec, render_analysis_png, render_cache_key
 
 
 # ===== 등급 기준 및 유틸 함수들 =====
-PM10_CRITERIA = {
-    '좋음': (0, 30),
-    '보통': (31, 80),
-    '나쁨': (81, 150),
-    '매우 나쁨': (151, float('inf'))
-}
-PM25_CRITERIA = {
-    '좋음': (0, 15),
-    '보통': (16, 35),
-    '나쁨': (36, 75),
-    '매우 나쁨': (76, float('inf'))
-}
-
-def get_grade_criteria(pm_type):
-    """pm_type이 'PM10'이면 PM10 기준, 아니면 PM25 기준을 반환."""
-    return PM10_CRITERIA if pm_type == 'PM10' else PM25_CRITERIA
-
-def recommend_by_value(val, pm_type='PM10'):
-    """
-    주어진 농도 값(val)에 따라 행동 권장 문구 반환.
-    - val이 None이면 예측 불가 메시지 반환.
-    - 등급 경계에 따라 적절한 메시지(좋음/보통/나쁨/매우 나쁨).
-    """
-    if val is None:
-        return "예측값을 계산할 수 없어."
-
-    criteria = get_grade_criteria(pm_type)
-
-    if val >= criteria['매우 나쁨'][0]:
-        return "🔥 매우 나쁨: 외출 자제, 실내 활동 권장"
-    if val >= criteria['나쁨'][0]:
-        return "⚠️ 나쁨: 장시간 외출 피하고 마스크 착용"
-    if val >= criteria['보통'][0]:
-        return "🙂 보통: 민감군은 주의, 가벼운 외출 가능"
-
-    return "🌿 좋음: 외부 활동 안전"
+# 등급 기준표와 판정 함수는 grading.py에 있음 (예측 백테스트 등 다른 모듈과 공유)
+from grading import recommend_by_value
+
+# ===== 계측 (metrics.py) =====
+# AIR_METRICS_PORT가 지정되면 /metrics 엔드포인트를 띄움 (프로세스당 한 번만 실행됨)
+# 기본은 127.0.0.1에서만 받음 (다른 장비의 Prometheus가 읽어야 하면 AIR_METRICS_HOST=0.0.0.0)
+import metrics
+if os.environ.get("AIR_METRICS_PORT"):
+    metrics.start_http_server(int(os.environ["AIR_METRICS_PORT"]),
+                              host=os.environ.get("AIR_METRICS_HOST", "127.0.0.1"))
+
+# ===== 정시 미리 받기 (prefetch.py) =====
+# AIR_PREFETCH=1이면 매시 발행 직후 모든 측정소를 미리 받아 캐시와 예측을 채워 둠
+# -> '분석 시작'은 준비된 캐시/예측만 읽음 (프로세스당 한 번만 시작됨)
+# 여러 레플리카가 모두 켜도 시간대마다 공유 저장소 임대를 잡은 한 프로세스만 실제로 받음
+# AIR_ALERTS_FILE/AIR_ALERTS_WEBHOOK이 있으면 미리 받은 직후 예측 등급 경보도 보냄 (alerts.py)
+from prefetch import precomputed_or_predict, start_background
+if os.environ.get("AIR_PREFETCH") == "1":
+    from alerts import engine_from_env
+    start_background(series_fn=pm_series, alert_engine=engine_from_env())
 
 # ===== Streamlit UI 구성 =====
 st.title("🌫️ 실시간 미세먼지 분석 + 예측 (최근 24시간)")
@@ -219,192 +95,293 @@ st.title("🌫️ 실시간 미세먼지 분석 + 예측 (최근 24시간)")
 st.markdown("정부 공공데이터 포털의 실시간 미세먼지 데이터를 기반으로 합니다다. **예측은 향후 3시간을 기준으로 합니다.**")
 # -> '합니다다' 오타 있음 (표시 목적). UI 문구는 자유롭게 수정 가능
 
-# 측정소 목록(시/도 -> 구/군). UI 편의를 위한 하드코딩된 맵.
-AIR_STATION_MAP = {
-    "서울": ["강남구", "강동구", "강북구", "강서구", "관악구", "광진구", "구로구", "금천구", "노원구", "도봉구", "동대문구", "동작구", "마포구", "서대문구", "서초구", "성동구", "성북구", "송파구", "양천구", "영등포구", "용산구", "은평구", "종로구", "중구", "중랑구"],
-    "부산": ["대연동", "명장동", "학장동", "덕천동", "전포동", "광복동", "용호동", "장림동", "신평동", "해운대", "기장읍", "정관읍"],
-    "대구": ["봉산동", "이현동", "지산동", "성서", "대명동", "복현동", "만촌동", "안심"],
-    "인천": ["주안", "구월동", "송도", "연희동", "운서동", "신흥동", "석남동"],
-    "광주": ["운암동", "광산구", "북구", "동구", "서구"],
-    "대전": ["가양동", "문평동", "노은동", "오룡동", "대흥동"],
-    "울산": ["달동", "삼산동", "명촌동", "농소", "화암동"],
-    "세종": ["신흥동", "보람동"],
-    "경기": ["수원", "성남", "안양", "안산", "용인", "평택", "고양", "남양주", "의정부", "광명", "화성", "파주", "시흥", "김포", "군포", "하남", "오산", "이천", "안성"],
-    "강원": ["춘천", "원주", "강릉", "동해", "속초", "삼척", "철원", "횡성", "홍천"],
-    "충북": ["청주", "충주", "제천", "단양", "옥천", "증평", "진천"],
-    "충남": ["천안", "공주", "보령", "아산", "서산", "논산", "당진", "계룡", "예산"],
-    "전북": ["전주", "군산", "익산", "정읍", "남원", "김제", "완주"],
-    "전남": ["목포", "여수", "순천", "나주", "광양", "무안", "구례", "화순"],
-    "경북": ["포항", "경주", "김천", "안동", "구미", "영주", "영천", "상주"],
-    "경남": ["창원", "진주", "통영", "사천", "김해", "밀양", "거제", "양산"],
-    "제주": ["제주시", "서귀포"]
-}
+# 측정소 목록(시/도 -> 구/군)은 측정소 카탈로그(station_catalog.py)에서 가져옴
+# - 내려받아 둔 측정소 정보가 있으면 실제 측정소 이름/주소/좌표를 사용
+# - 없으면 stations.py의 AIR_STATION_MAP으로 만든 대체본 사용
+catalog = load_catalog()
 
 default_city = "서울"
-# 시/도 선택 드롭다운을 보여줌. 기본 선택은 default_city
-city = st.selectbox("시/도 선택", list(AIR_STATION_MAP.keys()),
-                     index=list(AIR_STATION_MAP.keys()).index(default_city) if default_city in AIR_STATION_MAP else 0)
-
-# 선택된 시의 구/군 목록을 가져옴
-district_options = AIR_STATION_MAP.get(city, [])
+city_options = catalog.cities()
+# 위젯 값은 세션 상태(key)로 관리 → 사이드바 '측정소 찾기'에서 골라 넣을 수 있음
+if st.session_state.get('city') not in city_options:
+    st.session_state['city'] = default_city if default_city in city_options else city_options[0]
+
+
+# === 화면 구성: 부분 재실행(fragment) ===
+# Streamlit은 위젯을 바꿀 때마다 main.py 전체를 다시 실행한다.
+# 아래 패널들은 @st.fragment로 나눠서, 패널 안의 위젯을 바꾸면 그 패널만 다시 실행된다.
+# - 측정소 찾기(사이드바): 검색어 입력은 검색 패널만 다시 그림
+# - 분석 패널: 데이터 불러오기 + PM 항목 선택 + 결과 (드롭다운/사이드바는 다시 실행하지 않음)
+#   - 그래프 패널: 그래프 방식만 바꾸면 그래프만 다시 그림
+# 계산 결과(시계열 추출, 예측)는 세션 상태에 (측정소, 데이터 버전, 항목) 기준으로 보관해
+# 같은 입력이면 다시 계산하지 않는다.
+# 측정소 드롭다운은 그 아래 모든 내용이 측정소에 따라 바뀌므로 전체 재실행을 그대로 둔다.
+
+def choose_station(name):
+    """검색/가까운 측정소 결과를 드롭다운 선택값으로 반영 (버튼 on_click 콜백)."""
+    info = catalog.info(name)
+    if info is not None:
+        st.session_state['city'] = info['city']
+        st.session_state['gu'] = name
+        st.session_state['station_picked'] = True
+
+
+@st.fragment
+def station_finder():
+    # 사이드바: 측정소 찾기 (API 호출 없이 카탈로그 색인만 사용)
+    # 측정소를 고르면 드롭다운까지 바꿔야 하므로 그때만 전체를 다시 실행
+    if st.session_state.pop('station_picked', False):
+        st.rerun()
+    with st.expander("🔎 측정소 찾기"):
+        query = st.text_input("이름 또는 주소 앞부분", key="station_query")
+        matches = catalog.search(query, limit=15)
+        if matches:
+            picked = st.selectbox("검색 결과", matches, key="station_match")
+            st.button("이 측정소 선택", on_click=choose_station, args=(picked,), key="pick_match")
+        elif query:
+            st.caption("일치하는 측정소가 없습니다.")
+
+        if catalog.has_locations:
+            lat = st.number_input("위도", value=37.5665, format="%.4f", key="near_lat")
+            lon = st.number_input("경도", value=126.9780, format="%.4f", key="near_lon")
+            nearest = catalog.nearest(lat, lon, k=1)
+            if nearest:
+                info, dist = nearest[0]
+                st.caption(f"가장 가까운 측정소: **{info['name']}** ({dist:.1f} km, {info['addr']})")
+                st.button("가까운 측정소 선택", on_click=choose_station, args=(info['name'],), key="pick_nearest")
+        else:
+            st.caption("측정소 위치 정보가 없습니다. `python station_catalog.py`로 내려받으면 가까운 측정소 찾기를 쓸 수 있습니다.")
+
+
+with st.sidebar:
+    station_finder()
+
+# 시/도 선택 드롭다운 (기본 선택은 default_city)
+city = st.selectbox("시/도 선택", city_options, key="city")
+
+# 선택된 시의 구/군(측정소) 목록을 가져옴
+district_options = catalog.stations_in(city)
 
 # 구/군이 있으면 selectbox, 없으면 텍스트 입력창 제공
 if district_options:
-    gu = st.selectbox("구/군 (측정소) 선택", district_options, index=0)
+    if st.session_state.get('gu') not in district_options:
+        st.session_state['gu'] = district_options[0]
+    gu = st.selectbox("구/군 (측정소) 선택", district_options, key="gu")
 else:
     gu = st.text_input("구/군 (측정소) 입력 (목록 없음)", "")
     st.warning("선택된 시/도에 대한 측정소 목록이 없습니다.")
 
-# PM 항목 선택 라디오 (PM10 또는 PM2.5)
-pm_type = st.radio("측정 항목 선택", ('PM10', 'PM2.5'), index=0)
-
-# 고정 파라미터: 조회 개수(24시간) 및 예측 시간(3시간)
+# 고정 파라미터: 기본 조회 개수(24시간) 및 예측 시간(3시간)
 num_rows_to_fetch = 24
 n_forecast_hours = 3
 
+# 조회 기간 (이름 -> 시간 수). 24시간보다 길면 MONTH/3MONTH를 페이지 단위로 받아 옴
+# 빈 시간 처리 라디오 이름 -> air_parse.hourly_grid의 fill
+GAP_FILL_MODES = {'그대로': 'leave', '선형 보간': 'interpolate', '직전 값': 'ffill'}
+HISTORY_RANGES = {'24시간': 24, '7일': 24 * 7, '30일': 24 * 30, '90일': 24 * 90}
+
 # 측정소 이름(여기서는 gu 변수 사용)
 station = gu
 
-# '분석 시작' 버튼이 눌리면 아래 블록 실행
-if st.button("분석 시작", key="analyze_button"):
-    st.subheader(f"📊 {city} {gu} ({pm_type}) 분석 결과 (최근 {num_rows_to_fetch}시간)")
-
-    # API에서 어떤 key를 읽을지 설정 (pm10Value 또는 pm25Value)
-    data_key = 'pm10Value' if pm_type == 'PM10' else 'pm25Value'
 
+def stream_history(station, hours, pm_type):
+    # 긴 기간: 페이지가 도착하는 대로 파싱해 합치고, 진행률과 미리보기 그래프를 바로 갱신
+    progress = st.progress(0.0, text=f"데이터 ({hours}개) 불러오는 중...")
+    preview = st.empty()
+    column = 'pm10' if pm_type == 'PM10' else 'pm25'
+    frames = []
+    frame = concat_frames(frames)
+    for page in iter_air_pages(station, data_term=data_term_for(hours), max_rows=hours):
+        frames.append(parse_items(page, station))
+        frame = concat_frames(frames)
+        progress.progress(min(1.0, len(frame['time']) / hours),
+                          text=f"데이터 {len(frame['time'])}/{hours}개 받는 중...")
+        times, values = select_series(frame, column)
+        preview.vega_lite_chart(
+            build_chart_spec(times.tolist(), values.tolist(), None, [], pm_type, f"{station} 불러오는 중"),
+            use_container_width=True,
+        )
+    progress.empty()
+    preview.empty()
+    return frame
+
+
+def load_air_data(city, station, hours, pm_type):
+    # 측정소 데이터를 불러와 세션에 보관 ('분석 시작' 버튼)
+    # -> 이후 PM10/PM2.5 라디오를 바꿔도 저장된 데이터에서 항목만 다시 골라 그림 (네트워크 없음)
+
+    # 측정소 정보로 확인된 카탈로그에 없는 이름은 빈 응답만 오므로 API를 부르지 않음
+    if catalog.verified and station not in catalog:
+        st.error(f"'{station}'은(는) 에어코리아 측정소 목록에 없는 이름입니다. 사이드바의 '측정소 찾기'로 측정소를 골라 주세요.")
+        st.stop()
+    stale = None
+    parse_report = {}
     try:
         # Streamlit 스피너(로딩 표시) 안에서 데이터 호출
-        with st.spinner(f'데이터 ({num_rows_to_fetch}개) 불러오는 중...'):
-            items = fetch_air_data(station, num_rows=num_rows_to_fetch)
-    except requests.HTTPError:
-        # HTTP 에러일 때 사용자에게 오류 메시지 표시 후 중단
-        st.error("데이터 요청 중 HTTP 오류가 발생했습니다. API 서버 상태를 확인하세요.")
-        st.stop()
+        # (airkorea가 시간 예산 안에서 재시도하고, 장애가 이어지면 서킷 브레이커로 바로 실패함)
+        if hours <= num_rows_to_fetch:
+            fetch_status = {}
+            with st.spinner(f'데이터 ({hours}개) 불러오는 중...'), metrics.timed('fetch'):
+                items = fetch_air_data(station, num_rows=hours, status=fetch_status)
+            with metrics.timed('parse'):
+                # 모든 항목(pm10/pm25/o3/...)을 한 번에 파싱해서 측정소 정보와 함께 저장
+                # (시간을 읽지 못해 뺀 행 수는 parse_report에 남겨 품질 표시에 씀)
+                frame = parse_stations({station: items}, report=parse_report)
+            num_items = len(items)
+            # 만료된 캐시를 받았을 때는 평소의 백그라운드 갱신(정시마다 한 번)이면 경고하지 않고,
+            # 갱신이 실패했거나 서킷이 열려 있거나 데이터가 STALE_WARN_AGE보다 오래됐을 때만 장애 때와 같은 경고를 띄움
+            if fetch_status.get('stale') and len(frame['time']):
+                newest = frame['time'].max().astype(datetime)
+                if fetch_status.get('circuit_open'):
+                    reason = "에어코리아 API가 연속으로 실패해 잠시 호출을 멈춘 상태입니다"
+                elif fetch_status.get('refresh_failed'):
+                    reason = "에어코리아에서 최신 데이터를 받아 오지 못했습니다 (다시 시도 중)"
+                elif now_kst() - newest > STALE_WARN_AGE:
+                    reason = "에어코리아에서 최신 데이터를 아직 받아 오지 못했습니다 (백그라운드에서 다시 받는 중)"
+                else:
+                    reason = None
+                if reason is not None:
+                    stale = {'reason': reason, 'newest': newest}
+        else:
+            with metrics.timed('fetch_history'):
+                frame = stream_history(station, hours, pm_type)
+            num_items = len(frame['time'])
     except Exception as e:
-        # 다른 예외일 때 메시지와 함께 중단
-        st.error(f"데이터 요청 중 예상치 못한 오류 발생: {e}")
-        st.stop()
+        # API 장애: 마지막으로 받아 둔 데이터(캐시 → 로컬 저장소 순)로 대신 보여줌
+        if isinstance(e, CircuitOpenError):
+            reason = "에어코리아 API가 연속으로 실패해 잠시 호출을 멈춘 상태입니다"
+        elif isinstance(e, requests.HTTPError):
+            reason = "데이터 요청 중 HTTP 오류가 발생했습니다"
+        elif isinstance(e, (requests.Timeout, requests.ConnectionError, TimeoutError)):
+            reason = "에어코리아 API에 연결할 수 없거나 응답이 너무 늦습니다"
+        else:
+            reason = f"데이터 요청 중 예상치 못한 오류 발생: {e}"
+        num_items = 0
+        frame = load_fallback(station, hours)
+        if frame is None:
+            st.error(f"{reason}. 저장된 데이터도 없어 표시할 수 없습니다. 잠시 후 다시 시도하세요.")
+            st.stop()
+        stale = {'reason': reason, 'newest': frame['time'][-1].astype(datetime)}
+
+    # version: 불러올 때마다 바뀌는 번호 → 예전 데이터로 계산한 결과를 다시 쓰지 않도록 memo key에 포함
+    version = st.session_state.get('air_data_version', 0) + 1
+    st.session_state['air_data_version'] = version
+    st.session_state['analysis_memo'] = {}
+    st.session_state['air_data'] = {
+        'city': city,
+        'station': station,
+        'num_items': num_items,
+        'hours': hours,
+        'frame': frame,
+        'stale': stale,
+        'version': version,
+        'bad_time': parse_report.get(station, {}).get('bad_time', 0),
+    }
 
-    # 받은 items를 parse_pm으로 정제: (times, values) 반환
-    times, values = parse_pm(items, key=data_key)
+    # 받은 응답은 로컬 시계열 저장소에도 쌓아 둠 (장기 분석/예측용)
+    # 저장에 실패해도 화면 표시에는 영향이 없으므로 무시
+    if stale is None:
+        try:
+            with metrics.timed('store'):
+                default_store.append_frame(frame)
+        except sqlite3.Error:
+            pass
 
-    # 호출한 개수와 실제 처리된 유효 포인트 수를 사용자에게 알림
-    if items:
-        st.info(f"요청한 데이터는 {num_rows_to_fetch}개, 실제 처리된 유효 데이터 포인트는 **{len(values)}**개입니다. (참고: 데이터에 **의도된 오류값(ERROR_VAL) 1개**가 포함되어 있습니다.)")
 
-    # 선형 회귀로 예측 수행
-    predict_values, predict_times, model = linear_regression_predict(times, values, n_hours=n_forecast_hours)
+def analysis_for(air_data, pm_type, fill='leave'):
+    # (측정소, 데이터 버전, 항목, 빈 시간 채우기)별 시계열/예측 결과 (세션에 보관해 같은 입력이면 재사용)
+    memo = st.session_state.setdefault('analysis_memo', {})
+    key = (air_data['station'], air_data['version'], pm_type, fill)
+    if key in memo:
+        return memo[key]
 
-    # 예측 불가 조건 처리
-    if predict_values is None or not values:
-        predict = None
-        st.warning(f"측정소 '{station}'에 대한 유효한 {pm_type} 데이터가 너무 적습니다. 예측은 불가능합니다.")
-    else:
-        # T+3 (마지막 예측값) 을 추천 기준으로 삼음
-        predict = predict_values[-1]
-
-    # === 그래프 그리기 세팅 ===
-    fig, ax = plt.subplots(figsize=(12,7))
-    criteria = get_grade_criteria(pm_type)
-
-    # 등급별 배경색 표시: '좋음', '보통', '나쁨' 영역을 axhspan으로 표시
-    ax.axhspan(criteria['좋음'][0], criteria['좋음'][1], facecolor='green', alpha=0.1, label='좋음')
-    ax.axhspan(criteria['보통'][0], criteria['보통'][1], facecolor='yellow', alpha=0.1, label='보통')
-    ax.axhspan(criteria['나쁨'][0], criteria['나쁨'][1], facecolor='orange', alpha=0.1, label='나쁨')
-
-    # values에 문자열("ERROR_VAL")이 포함되어 있으면 max()에서 TypeError가 발생하므로 숫자만 필터
-    numeric_values = [v for v in values if isinstance(v, (int, float))]
-    max_val = max(numeric_values) if numeric_values else 0
-
-    # 예측값도 Y축 범위를 계산할 때 고려
-    if predict_values is not None and len(predict_values) > 0:
-        max_pred_val = max(predict_values)
-        max_val = max(max_val, max_pred_val)
-
-    # Y축 상한: 최대값의 1.2배 또는 '매우 나쁨' 기준의 1.2배 중 큰 쪽
-    y_max_limit = max(max_val * 1.2, criteria['매우 나쁨'][0] * 1.2)
-
-    # '매우 나쁨' 영역은 y_max_limit까지 빨간색으로 표시
-    ax.axhspan(criteria['매우 나쁨'][0], y_max_limit, facecolor='red', alpha=0.1, label='매우 나쁨')
-
-    # 그래프 배경/그리드 설정
-    ax.set_facecolor('#f9f9f9')
-    ax.grid(True, color='#e1e1e1', linestyle='-', linewidth=1)
-
-    # 실제 그릴 데이터: 시간들 중 값이 숫자인 것만 사용
-    plot_times = [t for t, v in zip(times, values) if isinstance(v, (int, float))]
-    plot_values = numeric_values
-
-    # 실측 데이터 선 그래프 (파란색 계열)
-    ax.plot(plot_times, plot_values, color='#2a4d8f', marker='o', linewidth=2, label=f'실측 {pm_type}')
-
-    # 각 실측 포인트 위에 값 텍스트 표시 (정수로 표시)
-    for x, y in zip(plot_times, plot_values):
-        ax.text(x, y + 1.5, f"{y:.0f}", color='#2a4d8f', fontsize=8, ha='center')
-
-    # 예측값이 있으면 실측 마지막 점과 예측점들을 이어서 점선으로 표시
-    if predict_values is not None and plot_times:
-        plot_times_with_pred = [plot_times[-1]] + predict_times
-        plot_values_with_pred = [plot_values[-1]] + list(predict_values)
-
-        ax.plot(plot_times_with_pred, plot_values_with_pred,
-                color='#f28500', marker='o', linestyle='--', linewidth=2,
-                label=f'향후 {n_forecast_hours}시간 예측')
-
-        # 마지막 예측값 텍스트 표시
-        final_time = predict_times[-1]
-        final_value = predict_values[-1]
-        ax.text(final_time, final_value + 1.5, f"{final_value:.0f}", color='#f28500', fontsize=8, ha='center')
-
-    # X축 눈금 설정(2시간 간격)
-    xtick_interval = 2
-    tick_indices = np.arange(0, len(times), xtick_interval)
-    tick_times = [times[i] for i in tick_indices if i < len(times)]
-    tick_labels = [t.strftime("%m-%d %H:%M") for t in tick_times]
-
-    ax.set_xticks(tick_times)
-    ax.set_xticklabels(tick_labels, rotation=45)
-
-    # X축 범위를 실측 시작시간 ~ 마지막 예측시간으로 설정 (있을 때)
-    if times and predict_times:
-        start_time = times[0]
-        end_time = predict_times[-1]
-        ax.set_xlim(start_time, end_time)
-    elif times:
-        start_time = times[0]
-        end_time = times[-1]
-        ax.set_xlim(start_time, end_time)
-
-    ax.set_title(f'{city} {gu} ({pm_type}) 시간대별 농도 변화 추이 (24시간 실측 + 3시간 예측)', fontsize=16, pad=20)
-    ax.set_ylabel(f"{pm_type} 농도 (㎍/m³)")
-    ax.set_xlabel("측정 시간")
-
-    # 범례 표시: 한글 폰트가 있으면 prop에 넣어서 깨지지 않게 함
-    if font_prop:
-        ax.legend(loc='upper left', frameon=True, prop=font_prop, bbox_to_anchor=(1.01, 1), borderaxespad=0.)
-    else:
-        ax.legend(loc='upper left', frameon=True, bbox_to_anchor=(1.01, 1), borderaxespad=0.)
+    # 어떤 항목을 읽을지 설정 (pm10Value 또는 pm25Value)
+    data_key = 'pm10Value' if pm_type == 'PM10' else 'pm25Value'
 
-    plt.subplots_adjust(right=0.8)  # 그림 오른쪽 여백 확보 (범례 위해)
-    st.pyplot(fig)  # Streamlit에 matplotlib 그림 출력
+    # 저장된 열 단위 데이터에서 선택한 항목을 정시 격자로 꺼냄 (값 없는 시간은 NaN)
+    grid = pm_grid(air_data['frame'], key=data_key, fill=fill)
+    times, values = grid['times'], grid['values']
+    quality = dict(grid['quality'], bad_time=air_data.get('bad_time', 0))
+    for kind in ('missing', 'flagged', 'gaps', 'filled'):
+        metrics.inc('air_data_quality_total', quality[kind], kind=kind)
+
+    # 선형 회귀로 예측 수행 (긴 기간을 조회해도 예측은 최근 24시간 추세로 계산)
+    with metrics.timed('forecast'):
+        # 정시 미리 받기(prefetch.py)가 같은 입력으로 계산해 둔 예측이 있으면 그대로 사용
+        predict_values, predict_times, model = precomputed_or_predict(
+            air_data['station'], pm_type, times[-num_rows_to_fetch:], values[-num_rows_to_fetch:],
+            n_hours=n_forecast_hours)
+
+    memo[key] = {
+        'times': times,
+        'values': values,
+        'filled': grid['filled'],
+        'quality': quality,
+        'predict_values': predict_values,
+        'predict_times': predict_times,
+    }
+    return memo[key]
+
+
+@st.fragment
+def chart_panel(station, pm_type, title, result):
+    # 그래프 방식: 이미지(matplotlib, 캐시된 PNG) 또는 가벼운 인터랙티브 차트(브라우저에서 그림)
+    # 이 라디오를 바꾸면 그래프 패널만 다시 실행됨
+    chart_mode = st.radio("그래프 방식", ('이미지', '인터랙티브'), index=0, horizontal=True, key="chart_mode")
+    times, values = result['times'], result['values']
+    predict_values, predict_times = result['predict_values'], result['predict_times']
+
+    with metrics.timed('render'):
+        if chart_mode == '인터랙티브':
+            # PNG 대신 작은 Vega-Lite 사양만 보내고 브라우저가 그림 (matplotlib 불필요)
+            st.vega_lite_chart(
+                build_chart_spec(times, values, predict_values, predict_times, pm_type, title,
+                                 n_forecast_hours=n_forecast_hours),
+                use_container_width=True,
+            )
+        else:
+            # 한글 폰트 적용 (처음 한 번만 matplotlib을 불러오고 폰트를 찾음)
+            font_prop = apply_korean_font()
+            if font_prop is None:
+                # fragment 안에서는 사이드바에 쓸 수 없으므로 그래프 위에 표시
+                st.caption(f"적절한 한글 폰트를 찾을 수 없습니다. 기본 폰트({FALLBACK_FONT}) 사용.")
+            # 같은 측정소/항목/마지막 측정 시각/예측값/그린 값(빈 시간 채우기 포함)이면 이전에 그린 PNG를 그대로 사용
+            cache_key = render_cache_key(station, pm_type, times[-1] if times else None, predict_values, title,
+                                         values=values, filled=result['filled'])
+            png = render_analysis_png(
+                cache_key, times, values, predict_values, predict_times, pm_type, title,
+                n_forecast_hours=n_forecast_hours, font_prop=font_prop,
+            )
+            st.image(png, use_container_width=True)
 
+
+def table_panel(pm_type, result):
     # === 데이터 테이블 출력 ===
-    if times and values:
+    times, values = result['times'], result['values']
+    if len(times):
         st.subheader("📋 실측 데이터 테이블")
         data_to_display = {
             "측정 시간": [t.strftime("%Y-%m-%d %H:%M") for t in times],
-            # 값이 숫자일 때만 포맷 적용, 아니면 문자열 그대로
-            f"{pm_type} 농도 (㎍/m³)": [f"{v:.1f}" if isinstance(v, (int, float)) else str(v) for v in values]
+            # 빈 시간은 '-'로, 채운 값은 '(채움)'을 붙여 실측과 구분
+            f"{pm_type} 농도 (㎍/m³)": np.where(
+                np.isnan(values), "-",
+                np.char.add(np.char.mod("%.1f", np.nan_to_num(values)),
+                            np.where(result['filled'], " (채움)", ""))).tolist(),
         }
         st.dataframe(data_to_display, use_container_width=True)
 
+
+def forecast_panel(pm_type, result):
     # === 예측 결과 출력 ===
+    times, values = result['times'], result['values']
+    predict_values, predict_times = result['predict_values'], result['predict_times']
     st.subheader("📌 예측 결과 (향후 3시간)")
 
-    if predict_values is not None and values:
-        # 안전하게 숫자 값만 골라 마지막 숫자값을 사용
-        last_numeric_value = [v for v in values if isinstance(v, (int, float))][-1]
-        last_time = times[-1]
+    if predict_values is not None and len(values):
+        # 값이 있는 마지막 시간 (격자 끝은 항상 측정값이 있는 시간)
+        last = int(np.flatnonzero(~np.isnan(values))[-1])
+        last_numeric_value = float(values[last])
+        last_time = times[last]
 
         st.markdown(f"**직전 측정값 ({last_time.strftime('%H:%M')})**: **{last_numeric_value:.1f} ㎍/m³**")
         st.markdown("---")
@@ -434,6 +411,172 @@ if st.button("분석 시작", key="analyze_button"):
 
         st.markdown("---")
         st.markdown(f"**최종 예측 ({predict_times[-1].strftime('%H:%M')}) 기준**")
-        st.info(recommend_by_value(predict_values[-1], pm_type=pm_type))
+        with metrics.timed('grade'):
+            recommendation = recommend_by_value(predict_values[-1], pm_type=pm_type)
+        st.info(recommendation)
     else:
         st.warning("데이터 부족으로 인해 예측값을 계산할 수 없습니다.")
+
+
+@st.fragment
+def analysis_panel(city, gu, station):
+    # PM 항목 선택 라디오 (PM10 또는 PM2.5) - 바꾸면 이 패널만 다시 실행됨
+    pm_type = st.radio("측정 항목 선택", ('PM10', 'PM2.5'), index=0, key="pm_type")
+    # 조회 기간 (24시간보다 길면 추세 분석용으로 여러 페이지를 이어 받음)
+    range_name = st.radio("조회 기간", list(HISTORY_RANGES), index=0, horizontal=True, key="history_range")
+    hours = HISTORY_RANGES[range_name]
+    # 빈 시간('-', 품질 플래그, 빠진 시간) 처리 방식 - 최대 air_parse.MAX_FILL_GAP시간까지만 채움
+    fill = GAP_FILL_MODES[st.radio("빈 시간 처리", list(GAP_FILL_MODES), index=0, horizontal=True,
+                                   key="gap_fill")]
+
+    if st.button("분석 시작", key="analyze_button"):
+        load_air_data(city, station, hours, pm_type)
+
+    # 현재 선택된 측정소/기간의 데이터가 세션에 있으면 결과를 보여줌
+    air_data = st.session_state.get('air_data')
+    if (air_data is None or air_data['city'] != city or air_data['station'] != station
+            or air_data['hours'] != hours):
+        return
+
+    st.subheader(f"📊 {city} {gu} ({pm_type}) 분석 결과 (최근 {range_name})")
+
+    # API 장애로 예전 데이터를 보여 주는 중이면 얼마나 오래된 데이터인지 표시
+    if air_data.get('stale'):
+        newest = air_data['stale']['newest']
+        age_hours = max(0, int((now_kst() - newest).total_seconds() // 3600))
+        st.warning(f"⚠️ {air_data['stale']['reason']}. 마지막으로 저장된 데이터를 표시합니다 "
+                   f"(최신 측정 {newest.strftime('%Y-%m-%d %H:%M')}, 약 {age_hours}시간 전).")
+
+    result = analysis_for(air_data, pm_type, fill)
+
+    # 호출한 개수와 실제 처리된 유효 포인트 수, 데이터 품질을 사용자에게 알림
+    quality = result['quality']
+    if air_data['num_items']:
+        st.info(f"요청한 데이터는 {hours}개, 실제 처리된 유효 데이터 포인트는 **{quality['observed']}**개입니다.")
+    st.caption(
+        f"데이터 품질: 결측('-') {quality['missing']}개 · 품질 플래그(점검/장애) {quality['flagged']}개 · "
+        f"빠진 시간 {quality['gaps']}개 · 중복 {quality['duplicates']}개 · 시간 오류 {quality['bad_time']}개"
+        + (f" · 채운 시간 {quality['filled']}개" if quality['filled'] else "")
+    )
+
+    # 예측 불가 조건 처리
+    if result['predict_values'] is None or not quality['observed']:
+        st.warning(f"측정소 '{station}'에 대한 유효한 {pm_type} 데이터가 너무 적습니다. 예측은 불가능합니다.")
+
+    # === 그래프 그리기 (chart.py) ===
+    title = f'{city} {gu} ({pm_type}) 시간대별 농도 변화 추이 ({range_name} 실측 + 3시간 예측)'
+    chart_panel(station, pm_type, title, result)
+    table_panel(pm_type, result)
+    forecast_panel(pm_type, result)
+
+    # 이번 실행의 단계별 처리 시간을 Prometheus 텍스트 파일로 내보냄 (실패해도 화면과 무관)
+    try:
+        metrics.write_prometheus()
+    except OSError:
+        pass
+
+
+analysis_panel(city, gu, station)
+
+# ===== 측정 이력 내보내기 (export.py) =====
+# 로컬 저장소의 여러 측정소 × 여러 항목 이력을 CSV/Excel 파일로 받음.
+# 앱 안에서 받는 파일은 st.download_button이 통째로 메모리에 올려 보내므로 export.IN_APP_MAX_ROWS행까지만 만듦.
+# 그보다 큰 내보내기(수백 측정소 × 몇 달)는 AIR_EXPORT_PORT로 띄운 스트리밍 엔드포인트 링크로 받음
+# (AIR_EXPORT_URL: 브라우저에서 엔드포인트에 접속하는 주소, 기본 http://localhost:<포트>)
+# 엔드포인트는 인증이 없으므로 기본은 127.0.0.1에서만 받음 (외부에 열려면 AIR_EXPORT_HOST=0.0.0.0)
+import export
+
+if os.environ.get("AIR_EXPORT_PORT"):
+    export.start_http_server(int(os.environ["AIR_EXPORT_PORT"]),
+                             host=os.environ.get("AIR_EXPORT_HOST", "127.0.0.1"))
+
+EXPORT_DAYS = {'7일': 7, '30일': 30, '90일': 90, '전체': None}
+
+
+@st.fragment
+def export_panel(station):
+    with st.expander("💾 측정 이력 내보내기 (CSV / Excel)"):
+        try:
+            stored = default_store.stations()
+        except sqlite3.Error:
+            stored = []
+        if not stored:
+            st.caption("로컬 저장소에 저장된 측정 이력이 없습니다.")
+            return
+
+        stations = st.multiselect("측정소 (비워 두면 전체)", stored,
+                                  default=[station] if station in stored else [], key="export_stations")
+        pollutants = st.multiselect("항목", list(POLLUTANTS), default=['pm10', 'pm25'],
+                                    format_func=export.COLUMN_TITLES.get, key="export_pollutants")
+        days = EXPORT_DAYS[st.radio("기간", list(EXPORT_DAYS), index=1, horizontal=True, key="export_days")]
+        fmt = st.radio("형식", ("csv", "xlsx"), horizontal=True, key="export_format")
+        start = None if days is None else now_kst() - timedelta(days=days)
+        st.caption(f"앱에서 바로 받는 파일은 최대 {export.IN_APP_MAX_ROWS:,}행까지 만들 수 있습니다. "
+                   "더 큰 내보내기는 스트리밍 주소나 `python export.py`를 사용하세요.")
+
+        if st.button("파일 만들기", key="export_button", disabled=not pollutants):
+            path = None
+            try:
+                rows = default_store.count_rows(stations or None, start)
+                if rows > export.IN_APP_MAX_ROWS:
+                    st.warning(f"선택한 이력이 {rows:,}행으로 앱에서 받을 수 있는 {export.IN_APP_MAX_ROWS:,}행을 "
+                               "넘습니다. 측정소나 기간을 줄이거나 스트리밍 주소로 받으세요.")
+                else:
+                    with metrics.timed('export'):
+                        path, _ = export.export_to_tempfile(
+                            fmt, stations=stations or None, start=start, pollutants=pollutants)
+            except (sqlite3.Error, OSError) as e:
+                st.error(f"내보내기 중 오류가 발생했습니다: {e}")
+            if path is not None:
+                with open(path, "rb") as f:
+                    data = f.read()
+                os.remove(path)
+                st.download_button(
+                    f"⬇️ air_history.{fmt} 받기 ({len(data) / 1024:.0f} KB)", data,
+                    file_name=f"air_history.{fmt}", on_click="ignore", key="export_download",
+                    mime="text/csv" if fmt == "csv" else
+                    "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                )
+
+        if os.environ.get("AIR_EXPORT_PORT") and pollutants:
+            # 스트리밍 엔드포인트는 행을 읽는 대로 보내므로 크기 제한이 없고 앱 메모리를 쓰지 않음
+            base_url = os.environ.get("AIR_EXPORT_URL", f"http://localhost:{os.environ['AIR_EXPORT_PORT']}")
+            st.link_button(f"⬇️ 스트리밍으로 받기 (.{fmt}, 크기 제한 없음)",
+                           export.stream_url(base_url, fmt, stations, start, pollutants=pollutants))
+
+
+export_panel(station)
+
+# ===== 관리자용 계측 패널 (AIR_ADMIN_PANEL=1 일 때만 표시) =====
+if os.environ.get("AIR_ADMIN_PANEL") == "1":
+    with st.sidebar.expander("🛠️ 최근 처리 시간 (ms)"):
+        recent = metrics.recent_latencies()
+        if recent:
+            st.dataframe({
+                "단계": list(recent),
+                "횟수": [len(v) for v in recent.values()],
+                "p50": [round(float(np.percentile(v, 50)), 1) for v in recent.values()],
+                "p95": [round(float(np.percentile(v, 95)), 1) for v in recent.values()],
+                "최근": [round(v[-1], 1) for v in recent.values()],
+            })
+        else:
+            st.caption("아직 기록이 없습니다.")
+        for (name, labels), value in sorted(metrics.counters().items()):
+            label_text = ", ".join(f"{k}={v}" for k, v in labels)
+            st.caption(f"{name}{{{label_text}}} = {value}")
+    with st.sidebar.expander("🗄️ 공유 저장소"):
+        from shared_store import default_store as shared_store
+
+        try:
+            shared_stats = shared_store.stats()
+        except sqlite3.Error as e:
+            shared_stats = None
+            st.caption(f"공유 저장소를 읽지 못했습니다: {e}")
+        if shared_stats:
+            st.dataframe({
+                "이름공간": list(shared_stats),
+                "항목 수": [count for count, _ in shared_stats.values()],
+                "KiB": [round(size / 1024, 1) for _, size in shared_stats.values()],
+            })
+        elif shared_stats is not None:
+            st.caption("저장된 항목이 없습니다.")
@@ -0,0 +1,182 @@
+# ===== 처리 단계별 계측 =====
+# 느린 화면이 API 때문인지, 파싱/예측/그래프 때문인지 운영 중에 구분할 수 있도록
+# 단계별 처리 시간과 캐시 적중/실패, API 오류 횟수를 모아 Prometheus 텍스트 형식으로 내보낸다.
+# - timed("fetch") 블록으로 시간 측정, inc("...")로 횟수 증가
+# - write_prometheus(): 파일로 저장 (node_exporter textfile collector 등에서 수집)
+# - start_http_server(port): /metrics 엔드포인트 제공 (선택, 기본은 127.0.0.1에서만 받음)
+# - recent_latencies(): 관리자 사이드바에 보여줄 최근 처리 시간
+import os
+import tempfile
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+METRICS_PATH = os.environ.get(
+    "AIR_METRICS_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "metrics.prom"),
+)
+
+# 처리 시간 히스토그램 구간(초)
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# 단계별로 보관할 최근 처리 시간 개수
+RECENT_SIZE = 100
+
+# 메트릭 설명 (Prometheus HELP 줄)
+HELP = {
+    'air_stage_duration_seconds': '분석 단계별 처리 시간',
+    'air_api_request_duration_seconds': '에어코리아 API 호출 시간',
+    'air_api_requests_total': '에어코리아 API 호출 횟수',
+    'air_api_errors_total': '에어코리아 API 오류 횟수 (종류별)',
+    'air_api_retries_total': '에어코리아 API 재시도 횟수',
+    'air_cache_requests_total': '응답 캐시 조회 결과 (fresh/stale/miss, refresh_error: 백그라운드 갱신 실패)',
+    'air_render_cache_total': '그래프 PNG 캐시 조회 결과 (hit/miss)',
+    'air_prefetch_runs_total': '정시 미리 받기 실행 횟수 (ok/partial)',
+    'air_prefetch_stations_total': '정시 미리 받기 측정소 수 (ok/error)',
+    'air_prefetch_errors_total': '정시 미리 받기 단계별 실패 수 (store/forecast/nationwide/alerts/run)',
+    'air_singleflight_total': '동시 요청 합치기 (leader: 실제 호출, shared: 결과 공유)',
+    'air_forecast_precomputed_total': '미리 계산한 예측 조회 결과 (hit/miss)',
+    'air_forecast_state_total': '미리 받기 예측 상태 갱신 (append: 새 시간만 더함, same, rebuild: 다시 쌓음)',
+    'air_data_quality_total': '분석한 시계열의 품질 집계 (missing/flagged/gaps/filled)',
+    'air_alerts_total': '예측 등급 경보 발송 수 (rise/clear, 항목별)',
+    'air_shared_store_total': '프로세스 간 계산 합치기 (hit/waited: 다른 프로세스 결과 사용, miss: 직접 계산)',
+    'air_shared_store_evictions_total': '공유 저장소 크기 제한으로 지운 항목 수',
+}
+
+_lock = threading.Lock()
+_counters = {}    # (이름, 라벨 튜플) -> 값
+_histograms = {}  # (이름, 라벨 튜플) -> [구간별 개수..., 합계, 개수]
+_recent = {}      # 단계 이름 -> deque[(시각, ms)]
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def inc(name, amount=1, **labels):
+    """카운터 증가 (예: inc('air_cache_requests_total', result='miss'))."""
+    key = (name, _label_key(labels))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+
+def observe(name, seconds, **labels):
+    """히스토그램에 처리 시간(초) 기록."""
+    key = (name, _label_key(labels))
+    with _lock:
+        hist = _histograms.get(key)
+        if hist is None:
+            hist = _histograms[key] = [0] * len(BUCKETS) + [0.0, 0]
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                hist[i] += 1
+        hist[-2] += seconds
+        hist[-1] += 1
+
+
+@contextmanager
+def timed(stage):
+    """with timed('parse'): ... 블록 처리 시간을 air_stage_duration_seconds에 기록."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        observe('air_stage_duration_seconds', elapsed, stage=stage)
+        with _lock:
+            _recent.setdefault(stage, deque(maxlen=RECENT_SIZE)).append((time.time(), elapsed * 1000))
+
+
+def recent_latencies():
+    """{단계: [최근 처리 시간(ms), ...]} (오래된 순서)."""
+    with _lock:
+        return {stage: [ms for _, ms in values] for stage, values in _recent.items()}
+
+
+def counters():
+    """{(이름, 라벨 튜플): 값} 복사본 (관리자 화면 표시용)."""
+    with _lock:
+        return dict(_counters)
+
+
+def _format_labels(labels, extra=()):
+    items = list(labels) + list(extra)
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{str(v)}"' for k, v in items) + "}"
+
+
+def render_prometheus():
+    """현재 값을 Prometheus 텍스트 노출 형식 문자열로 변환."""
+    with _lock:
+        counters_copy = dict(_counters)
+        hists_copy = {k: list(v) for k, v in _histograms.items()}
+
+    lines = []
+    seen = set()
+
+    def header(name, kind):
+        if name not in seen:
+            seen.add(name)
+            lines.append(f"# HELP {name} {HELP.get(name, name)}")
+            lines.append(f"# TYPE {name} {kind}")
+
+    for (name, labels), value in sorted(counters_copy.items()):
+        header(name, "counter")
+        lines.append(f"{name}{_format_labels(labels)} {value}")
+
+    for (name, labels), hist in sorted(hists_copy.items()):
+        header(name, "histogram")
+        for bound, count in zip(BUCKETS, hist):
+            lines.append(f"{name}_bucket{_format_labels(labels, [('le', bound)])} {count}")
+        lines.append(f"{name}_bucket{_format_labels(labels, [('le', '+Inf')])} {hist[-1]}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {hist[-2]:.6f}")
+        lines.append(f"{name}_count{_format_labels(labels)} {hist[-1]}")
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(path=METRICS_PATH):
+    """Prometheus 텍스트 파일로 원자적으로 저장 (수집기가 반쯤 쓴 파일을 읽지 않도록)."""
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(render_prometheus())
+    os.replace(tmp_path, path)
+    return path
+
+
+_server = None
+
+
+def start_http_server(port, host="127.0.0.1"):
+    """
+    /metrics 엔드포인트를 백그라운드 스레드로 실행 (이미 실행 중이면 그대로 반환).
+    - host: 기본은 이 장비에서만 접속 가능. 다른 장비의 수집기가 읽어야 하면 직접 지정 (예: '0.0.0.0')
+    """
+    global _server
+    with _lock:
+        if _server is not None:
+            return _server
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                body = render_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        _server = ThreadingHTTPServer((host, port), Handler)
+        _server.daemon_threads = True
+        threading.Thread(target=_server.serve_forever, name="air-metrics", daemon=True).start()
+        return _server
@@ -0,0 +1,268 @@
+# ===== 에어코리아 API 로컬 대역(mock) 서버 =====
+# 실제 API 할당량/네트워크 없이 부하·지연 테스트를 할 수 있도록
+# getMsrstnAcctoRltmMesureDnsty를 흉내 내는 HTTP 서버.
+# - replay: fixtures 디렉터리에 녹화해 둔 응답을 그대로 돌려줌
+# - synthetic: 녹화본이 없는 측정소는 일주기 패턴을 가진 가짜 값을 만들어 줌
+# - 지연(latency/jitter), 오류율(error_rate), pageNo/numOfRows 페이지 처리 지원
+# - record: 실제 API 응답을 fixtures로 저장
+#
+# 사용 예:
+#   python mock_airkorea.py serve --port 8765 --latency-ms 200 --error-rate 0.05
+#   AIRKOREA_BASE_URL=http://127.0.0.1:8765 streamlit run main.py
+#   python mock_airkorea.py record 강남구 송파구
+import argparse
+import json
+import math
+import os
+import random
+import threading
+import time
+import zlib
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from air_cache import now_kst, parse_data_time
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "airkorea")
+SERVICE_PATH = "/B552584/ArpltnInforInqireSvc/getMsrstnAcctoRltmMesureDnsty"
+
+# dataTerm별로 돌려주는 최대 시간 수 (실제 API와 같은 범위)
+TERM_HOURS = {'DAILY': 24, 'MONTH': 24 * 31, '3MONTH': 24 * 92}
+
+
+def format_data_time(dt):
+    """datetime → 에어코리아 dataTime 문자열 (자정은 전날 '24:00')."""
+    if dt.hour == 0:
+        return (dt - timedelta(days=1)).strftime("%Y-%m-%d") + " 24:00"
+    return dt.strftime("%Y-%m-%d %H:%M")
+
+
+def synthetic_items(station, hours=24, end=None):
+    """
+    측정소 이름으로 시드를 정한 재현 가능한 가짜 items (최신순).
+    - end: 가장 최신 시각 (None이면 현재 한국 시간의 정시)
+    - 일주기(24시간) 사인파 + 잡음, 가끔 결측('-')을 섞음
+    """
+    end = end or now_kst().replace(minute=0, second=0, microsecond=0)
+    seed = zlib.crc32(station.encode("utf-8"))
+    base = 20 + seed % 60
+    items = []
+    for i in range(hours):
+        t = end - timedelta(hours=i)
+        hour_index = int(t.timestamp() // 3600)
+        rnd = random.Random(seed * 1000003 + hour_index)  # 시각마다 항상 같은 값
+        cycle = math.sin(2 * math.pi * (t.hour - 8) / 24)
+        pm10 = max(1, round(base + 25 * cycle + rnd.gauss(0, 8)))
+        pm25 = max(1, round(pm10 * 0.45 + rnd.gauss(0, 3)))
+        missing = rnd.random() < 0.02
+        items.append({
+            'dataTime': format_data_time(t),
+            'stationName': station,
+            'pm10Value': '-' if missing else str(pm10),
+            'pm25Value': '-' if missing else str(pm25),
+            'o3Value': f"{max(0.001, 0.03 + 0.02 * cycle + rnd.gauss(0, 0.005)):.3f}",
+            'no2Value': f"{max(0.001, 0.02 - 0.01 * cycle + rnd.gauss(0, 0.003)):.3f}",
+            'coValue': f"{max(0.1, 0.4 + rnd.gauss(0, 0.05)):.1f}",
+            'so2Value': f"{max(0.001, 0.003 + rnd.gauss(0, 0.0005)):.3f}",
+            'pm10Flag': '통신장애' if missing else None,
+            'pm25Flag': '통신장애' if missing else None,
+        })
+    return items
+
+
+# ===== 녹화본(fixtures) =====
+def fixture_path(station, fixture_dir=FIXTURE_DIR):
+    return os.path.join(fixture_dir, f"{station}.json")
+
+
+def load_fixture(station, fixture_dir=FIXTURE_DIR):
+    """녹화해 둔 items (최신순). 없으면 None."""
+    try:
+        with open(fixture_path(station, fixture_dir), encoding="utf-8") as f:
+            return json.load(f)["items"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def record(stations, data_term='3MONTH', fixture_dir=FIXTURE_DIR, page_size=100):
+    """실제 API에서 측정소별 전체 이력을 페이지 단위로 받아 fixtures로 저장."""
+    from airkorea import request_air_data
+
+    os.makedirs(fixture_dir, exist_ok=True)
+    saved = {}
+    for station in stations:
+        items = []
+        page_no = 1
+        while True:
+            page = request_air_data(station, num_rows=page_size, data_term=data_term, page_no=page_no) or []
+            items.extend(page)
+            if len(page) < page_size:
+                break
+            page_no += 1
+        with open(fixture_path(station, fixture_dir), "w", encoding="utf-8") as f:
+            json.dump({
+                'station': station,
+                'dataTerm': data_term,
+                'recorded_at': now_kst().strftime("%Y-%m-%d %H:%M:%S"),
+                'items': items,
+            }, f, ensure_ascii=False)
+        saved[station] = len(items)
+    return saved
+
+
+# ===== HTTP 서버 =====
+class MockConfig:
+    """서버 동작 설정 (실행 중에도 값을 바꿀 수 있음)."""
+
+    def __init__(self, latency_ms=0.0, jitter_ms=0.0, error_rate=0.0,
+                 fixture_dir=FIXTURE_DIR, synthetic=True, seed=None, synthetic_end=None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.fixture_dir = fixture_dir
+        self.synthetic = synthetic
+        self.synthetic_end = synthetic_end  # 가짜 데이터의 최신 시각 고정 (None이면 현재 시각)
+        self.random = random.Random(seed)
+        self.request_count = 0
+        self.lock = threading.Lock()
+
+
+def _make_handler(config):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass  # 부하 테스트 중 콘솔 출력 방지
+
+        def _send_json(self, status, payload):
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json;charset=UTF-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path != SERVICE_PATH:
+                self._send_json(404, {'error': 'not found'})
+                return
+            params = {k: v[0] for k, v in parse_qs(url.query).items()}
+
+            with config.lock:
+                config.request_count += 1
+                delay = config.latency_ms + config.random.uniform(-1, 1) * config.jitter_ms
+                fail = config.random.random() < config.error_rate
+            if delay > 0:
+                time.sleep(delay / 1000.0)
+            if fail:
+                self._send_json(500, {'error': 'mock injected failure'})
+                return
+
+            station = params.get('stationName', '')
+            num_rows = max(1, int(params.get('numOfRows', 10)))
+            page_no = max(1, int(params.get('pageNo', 1)))
+            term_hours = TERM_HOURS.get(params.get('dataTerm', 'DAILY'), 24)
+
+            items = load_fixture(station, config.fixture_dir)
+            if items is None:
+                items = synthetic_items(station, term_hours, config.synthetic_end) if config.synthetic else []
+            else:
+                # 녹화본도 dataTerm 범위만큼만 잘라서 돌려줌
+                times = [parse_data_time(it.get('dataTime')) for it in items]
+                known = [t for t in times if t is not None]
+                if known:
+                    cutoff = max(known) - timedelta(hours=term_hours)
+                    items = [it for it, t in zip(items, times) if t is None or t > cutoff]
+
+            start = (page_no - 1) * num_rows
+            self._send_json(200, {
+                'response': {
+                    'header': {'resultCode': '00', 'resultMsg': 'NORMAL_CODE'},
+                    'body': {
+                        'totalCount': len(items),
+                        'items': items[start:start + num_rows],
+                        'pageNo': page_no,
+                        'numOfRows': num_rows,
+                    },
+                }
+            })
+
+    return Handler
+
+
+class MockAirKoreaServer:
+    """
+    백그라운드 스레드에서 도는 mock 서버. with 문으로 쓰면 자동 종료.
+    - base_url: airkorea.set_base_url()이나 AIRKOREA_BASE_URL에 넣을 주소
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, config=None):
+        self.config = config or MockConfig()
+        self.httpd = ThreadingHTTPServer((host, port), _make_handler(self.config))
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name="mock-airkorea", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="에어코리아 실시간 측정 API mock 서버")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    serve = sub.add_parser("serve", help="mock 서버 실행")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8765)
+    serve.add_argument("--latency-ms", type=float, default=0.0, help="응답마다 추가할 지연(ms)")
+    serve.add_argument("--jitter-ms", type=float, default=0.0, help="지연의 ± 흔들림(ms)")
+    serve.add_argument("--error-rate", type=float, default=0.0, help="HTTP 500을 돌려줄 확률 (0~1)")
+    serve.add_argument("--fixture-dir", default=FIXTURE_DIR)
+    serve.add_argument("--no-synthetic", action="store_true", help="녹화본이 없는 측정소는 빈 items 반환")
+    serve.add_argument("--seed", type=int, default=None, help="지연/오류 난수 시드 (재현용)")
+
+    rec = sub.add_parser("record", help="실제 API 응답을 fixtures로 저장")
+    rec.add_argument("stations", nargs="*", help="측정소 이름 (생략 시 AIR_STATION_MAP 전체)")
+    rec.add_argument("--data-term", default="3MONTH", choices=list(TERM_HOURS))
+    rec.add_argument("--fixture-dir", default=FIXTURE_DIR)
+
+    args = parser.parse_args(argv)
+    if args.command == "record":
+        from stations import all_station_names
+
+        saved = record(args.stations or all_station_names(), args.data_term, args.fixture_dir)
+        for station, count in saved.items():
+            print(f"{station}: {count}개 저장")
+        return
+
+    config = MockConfig(args.latency_ms, args.jitter_ms, args.error_rate,
+                        args.fixture_dir, not args.no_synthetic, args.seed)
+    server = MockAirKoreaServer(args.host, args.port, config)
+    print(f"mock 서버 실행 중: {server.base_url}{SERVICE_PATH}")
+    print(f"앱 연결: AIRKOREA_BASE_URL={server.base_url} streamlit run main.py")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+# ===== 전국 실시간 지도 스냅숏 =====
+# 전국 측정소의 현재 등급과 3시간 뒤(T+3) 예측 등급을 지도(pages/project_3.py)에 보여 주기 위한 모듈.
+# - 모든 측정소 응답을 (측정소 × 시간) 행렬로 펼쳐 최신값/예측/등급을 배열 연산 한 번에 계산
+#   (등급 경계는 grading.py의 PM10_CRITERIA/PM25_CRITERIA)
+# - folium 마커 레이어는 발행 시각(정시 + PUBLISH_DELAY)마다 한 번만 HTML로 만들어 파일로 저장하고,
+#   같은 시간대의 모든 조회는 그 파일을 그대로 돌려줌 (prefetch.py가 미리 받을 때 함께 만듦)
+import html
+import json
+import os
+import tempfile
+
+import numpy as np
+
+from air_cache import CACHE_DIR, PUBLISH_DELAY, now_kst
+from air_parse import last_valid, parse_stations, to_hourly_matrix
+from forecast import fit_predict_batch
+from grading import GRADE_COLORS, grade_codes, grade_names
+from shared_store import MISSING
+from shared_store import default_store as shared_store
+
+MAP_DIR = os.path.join(CACHE_DIR, "maps")
+# 지도에 쓰는 항목 (화면 이름 → frame 열 이름)
+PM_COLUMNS = {'PM10': 'pm10', 'PM2.5': 'pm25'}
+N_FORECAST_HOURS = 3
+# 예측에 쓰는 최근 시간 수 (main.py와 같은 24시간)
+WINDOW_HOURS = 24
+# 지도 처음 위치 (남한 중앙)
+MAP_CENTER = (36.3, 127.8)
+# 지난 시간대 파일은 이 개수만 남기고 지움
+KEEP_HOURS = 2
+# 전국 측정소를 받아 스냅숏을 만드는 데 걸릴 수 있는 최대 시간(초): 이 동안 다른 프로세스는 기다림
+BUILD_LEASE_TTL = 300
+
+
+def snapshot_hour(now=None):
+    """지금 보여 줄 스냅숏의 기준 시각: 가장 최근에 발행된 정시 데이터 (KST, 분 이하 0)."""
+    now = now or now_kst()
+    return (now - PUBLISH_DELAY).replace(minute=0, second=0, microsecond=0)
+
+
+def build_snapshot(results, catalog=None, n_hours=N_FORECAST_HOURS, window=WINDOW_HOURS):
+    """
+    {측정소: items}(fetch_all_stations 결과) → 측정소별 열 단위 스냅숏.
+    - station/city/lat/lon, 항목마다 현재값(pm10), T+n 예측(pm10_forecast),
+      등급 코드(pm10_grade, pm10_forecast_grade: 0=좋음 … 3=매우 나쁨, 값 없음 -1)
+    - data_time: 스냅숏에 들어간 가장 최근 측정 시각 (문자열, 데이터가 없으면 None)
+    """
+    if catalog is None:
+        from station_catalog import load_catalog
+
+        catalog = load_catalog()
+    frame = parse_stations(results)
+    stations = np.array(sorted(results), dtype=str)
+    snapshot = {'station': stations, 'data_time': None}
+
+    infos = [catalog.info(name) or {} for name in stations]
+    snapshot['city'] = np.array([info.get('city') or "" for info in infos], dtype=str)
+    snapshot['lat'] = np.array([info.get('lat') for info in infos], dtype=np.float64)
+    snapshot['lon'] = np.array([info.get('lon') for info in infos], dtype=np.float64)
+
+    if len(frame['time']):
+        end = frame['time'].max().astype('datetime64[h]')
+        start = end - np.timedelta64(window - 1, 'h')
+        snapshot['data_time'] = str(end.astype('datetime64[m]')).replace("T", " ")
+    for pm_type, column in PM_COLUMNS.items():
+        if snapshot['data_time'] is None:
+            Y = np.full((len(stations), 0), np.nan)
+        else:
+            _, _, Y = to_hourly_matrix(frame, column, stations, start, end)
+        latest = last_valid(Y)
+        forecast = fit_predict_batch(Y, n_hours=n_hours)[0][:, -1] if Y.shape[1] else np.full(len(stations), np.nan)
+        snapshot[column] = latest
+        snapshot[column + '_forecast'] = forecast
+        snapshot[column + '_grade'] = grade_codes(latest, pm_type)
+        snapshot[column + '_forecast_grade'] = grade_codes(forecast, pm_type)
+    return snapshot
+
+
+def render_map(snapshot, pm_type='PM10'):
+    """
+    스냅숏 → folium 지도 HTML 문자열.
+    - 원 색은 현재 등급, 테두리 색은 T+3 예측 등급 (좌표가 없는 측정소는 표시하지 않음)
+    """
+    import folium
+
+    column = PM_COLUMNS[pm_type]
+    fmap = folium.Map(location=MAP_CENTER, zoom_start=7, prefer_canvas=True)
+    layer = folium.FeatureGroup(name=f"{pm_type} 측정소")
+    names = grade_names(snapshot[column + '_grade'])
+    forecast_names = grade_names(snapshot[column + '_forecast_grade'])
+    located = np.flatnonzero(~np.isnan(snapshot['lat']) & ~np.isnan(snapshot['lon']))
+    for i in located:
+        grade = names[i]
+        forecast_grade = forecast_names[i]
+        value = snapshot[column][i]
+        forecast = snapshot[column + '_forecast'][i]
+        tooltip = (
+            f"<b>{html.escape(snapshot['station'][i])}</b> ({html.escape(snapshot['city'][i])})<br>"
+            f"현재 {'-' if np.isnan(value) else f'{value:.0f}'} ㎍/m³ · {grade}<br>"
+            f"{N_FORECAST_HOURS}시간 뒤 {'-' if np.isnan(forecast) else f'{forecast:.0f}'} ㎍/m³ · "
+            f"{forecast_grade}"
+        )
+        folium.CircleMarker(
+            location=(float(snapshot['lat'][i]), float(snapshot['lon'][i])),
+            radius=7,
+            color=GRADE_COLORS.get(forecast_grade, "gray"),
+            weight=3,
+            fill=True,
+            fill_color=GRADE_COLORS.get(grade, "gray"),
+            fill_opacity=0.8,
+            tooltip=tooltip,
+        ).add_to(layer)
+    layer.add_to(fmap)
+    return fmap.get_root().render()
+
+
+# ===== 시간대별 파일 캐시 =====
+def _hour_tag(hour):
+    return hour.strftime("%Y%m%d%H")
+
+
+def _map_path(hour, pm_type):
+    return os.path.join(MAP_DIR, f"map_{PM_COLUMNS[pm_type]}_{_hour_tag(hour)}.html")
+
+
+def _summary_path(hour):
+    return os.path.join(MAP_DIR, f"snapshot_{_hour_tag(hour)}.json")
+
+
+def _write_atomic(path, text):
+    fd, tmp_path = tempfile.mkstemp(dir=MAP_DIR, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def summarize(snapshot):
+    """화면 표(측정소별 현재값/예측/등급)에 쓰는 JSON 직렬화 가능한 dict."""
+    def values(name):
+        return [None if np.isnan(v) else round(float(v), 1) for v in snapshot[name]]
+
+    summary = {
+        'data_time': snapshot['data_time'],
+        'station': snapshot['station'].tolist(),
+        'city': snapshot['city'].tolist(),
+        'located': int((~np.isnan(snapshot['lat'])).sum()),
+    }
+    for column in PM_COLUMNS.values():
+        summary[column] = values(column)
+        summary[column + '_forecast'] = values(column + '_forecast')
+        summary[column + '_grade'] = grade_names(snapshot[column + '_grade']).tolist()
+        summary[column + '_forecast_grade'] = grade_names(snapshot[column + '_forecast_grade']).tolist()
+    return summary
+
+
+def publish(results, hour=None, catalog=None):
+    """
+    스냅숏을 만들어 hour 시간대의 지도 HTML(항목별)과 요약 JSON을 원자적으로 저장.
+    - 지도 파일을 먼저 쓰고 요약 JSON을 마지막에 씀 → 요약이 있으면 지도도 모두 있음
+    - 오래된 시간대 파일은 KEEP_HOURS개만 남기고 지움
+    """
+    hour = hour or snapshot_hour()
+    snapshot = build_snapshot(results, catalog=catalog)
+    os.makedirs(MAP_DIR, exist_ok=True)
+    for pm_type in PM_COLUMNS:
+        _write_atomic(_map_path(hour, pm_type), render_map(snapshot, pm_type))
+    summary = summarize(snapshot)
+    _write_atomic(_summary_path(hour), json.dumps(summary, ensure_ascii=False))
+    _prune(keep=KEEP_HOURS)
+    return summary
+
+
+def _prune(keep=KEEP_HOURS):
+    tags = sorted({name.rsplit("_", 1)[-1].split(".")[0] for name in os.listdir(MAP_DIR)
+                   if name.endswith((".html", ".json"))}, reverse=True)
+    stale = set(tags[keep:])
+    for name in os.listdir(MAP_DIR):
+        if name.endswith((".html", ".json")) and name.rsplit("_", 1)[-1].split(".")[0] in stale:
+            try:
+                os.remove(os.path.join(MAP_DIR, name))
+            except OSError:
+                pass
+
+
+def load_summary(hour=None):
+    """hour 시간대의 요약 JSON (없으면 None)."""
+    try:
+        with open(_summary_path(hour or snapshot_hour()), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def load_map(hour, pm_type):
+    with open(_map_path(hour, pm_type), encoding="utf-8") as f:
+        return f.read()
+
+
+def ensure_published(hour=None, stations=None):
+    """
+    hour 시간대 스냅숏이 없으면 전국 측정소를 받아 만들고 요약을 반환.
+    - 응답은 공유 캐시를 거치므로 prefetch가 돌고 있으면 API를 다시 부르지 않음
+    - 여러 프로세스(레플리카)가 동시에 열어도 공유 저장소 임대로 한 곳에서만 만들고,
+      나머지는 요약 JSON이 생길 때까지 기다렸다가 읽음
+    """
+    hour = hour or snapshot_hour()
+    summary = load_summary(hour)
+    if summary is not None:
+        return summary
+
+    def build():
+        import airkorea
+        from station_catalog import load_catalog
+
+        names = stations or [rec['name'] for rec in load_catalog().records]
+        results, errors = airkorea.fetch_all_stations(names, use_cache=True)
+        if not results and errors:
+            # 빈 스냅숏을 한 시간 동안 보여 주지 않도록 저장하지 않고 알림 (다음 조회 때 다시 시도)
+            raise next(iter(errors.values()))
+        return publish(results, hour=hour)
+
+    def recheck():
+        cached = load_summary(hour)
+        return MISSING if cached is None else cached
+
+    return shared_store.coalesce("nationwide:" + _hour_tag(hour), build, recheck,
+                                ttl=BUILD_LEASE_TTL)
+
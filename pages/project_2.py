@@ -1,5 +1,7 @@
 import streamlit as st
 
+from grading import GRADE_ICONS, GRADE_TABLE, format_range
+
 # 페이지 설정
 st.set_page_config(
     page_title="미세먼지 부가 정보",
@@ -54,126 +56,38 @@ st.info("💡 **핵심:** PM2.5가 더 작고 위험합니다! 폐 속 깊이 
 st.divider()
 
 # --- 선택된 미세먼지 정보 표시 ---
+# 등급 경계와 행동 수칙은 grading.GRADE_TABLE 한 곳에서 읽음 (분석 화면/지도와 같은 기준)
 if "PM10" in dust_type:
-    st.header("🌫️ PM10 (미세먼지) 등급 기준 및 행동 수칙")
-    
-    # PM10 등급 기준
-    st.subheader("📏 PM10 농도별 등급")
-    
-    col1, col2, col3, col4 = st.columns(4)
-    
-    with col1:
-        st.success("**✅ 좋음**")
-        st.markdown("**0 ~ 30 ㎍/m³**")
-    
-    with col2:
-        st.warning("**🟡 보통**")
-        st.markdown("**31 ~ 80 ㎍/m³**")
-    
-    with col3:
-        st.error("**🟠 나쁨**")
-        st.markdown("**81 ~ 150 ㎍/m³**")
-    
-    with col4:
-        st.error("**🔴 매우 나쁨**")
-        st.markdown("**151 ㎍/m³ 이상**")
-    
-    st.divider()
-    
-    # PM10 위험도 및 행동 수칙
-    st.subheader("⚠️ PM10 농도별 위험도와 행동 수칙")
-    
-    with st.expander("✅ 좋음 (0~30) - 안전", expanded=True):
-        st.markdown("""
-        **위험도:** 🟢 매우 낮음  
-        **야외 활동:** 자유롭게 가능  
-        **환기:** 자주 환기하세요  
-        **마스크:** 필요 없음
-        """)
-    
-    with st.expander("🟡 보통 (31~80) - 주의"):
-        st.markdown("""
-        **위험도:** 🟡 낮음  
-        **야외 활동:** 일반인은 정상 활동, 민감군은 장시간 활동 자제  
-        **환기:** 오전 10시~오후 4시 권장  
-        **마스크:** 민감군은 착용 권장
-        """)
-    
-    with st.expander("🟠 나쁨 (81~150) - 위험"):
-        st.markdown("""
-        **위험도:** 🟠 보통  
-        **야외 활동:** 장시간 또는 격렬한 활동 제한  
-        **환기:** 최소화  
-        **마스크:** KF80 이상 필수 착용
-        """)
-    
-    with st.expander("🔴 매우 나쁨 (151 이상) - 심각"):
-        st.markdown("""
-        **위험도:** 🔴 높음  
-        **야외 활동:** 전면 금지  
-        **환기:** 창문 닫고 공기청정기 사용  
-        **마스크:** 외출 시 KF94 이상 필수, 실외 활동 자제
-        """)
-
+    pm_type, title = "PM10", "🌫️ PM10 (미세먼지)"
 else:  # PM2.5 선택
-    st.header("💨 PM2.5 (초미세먼지) 등급 기준 및 행동 수칙")
-    
-    # PM2.5 등급 기준
-    st.subheader("📏 PM2.5 농도별 등급")
-    
-    col1, col2, col3, col4 = st.columns(4)
-    
-    with col1:
-        st.success("**✅ 좋음**")
-        st.markdown("**0 ~ 15 ㎍/m³**")
-    
-    with col2:
-        st.warning("**🟡 보통**")
-        st.markdown("**16 ~ 35 ㎍/m³**")
-    
-    with col3:
-        st.error("**🟠 나쁨**")
-        st.markdown("**36 ~ 75 ㎍/m³**")
-    
-    with col4:
-        st.error("**🔴 매우 나쁘**")
-        st.markdown("**76 ㎍/m³ 이상**")
-    
-    st.divider()
-    
-    # PM2.5 위험도 및 행동 수칙
-    st.subheader("⚠️ PM2.5 농도별 위험도와 행동 수칙")
-    
-    with st.expander("✅ 좋음 (0~15) - 안전", expanded=True):
-        st.markdown("""
-        **위험도:** 🟢 매우 낮음  
-        **야외 활동:** 자유롭게 가능  
-        **환기:** 자주 환기하세요  
-        **마스크:** 필요 없음
-        """)
-    
-    with st.expander("🟡 보통 (16~35) - 주의"):
-        st.markdown("""
-        **위험도:** 🟡 낮음  
-        **야외 활동:** 일반인은 정상 활동, 민감군은 장시간 활동 자제  
-        **환기:** 적절한 시간에 환기  
-        **마스크:** 민감군(노약자, 어린이, 호흡기 질환자)은 착용 권장
-        """)
-    
-    with st.expander("🟠 나쁨 (36~75) - 위험"):
-        st.markdown("""
-        **위험도:** 🟠 보통~높음  
-        **야외 활동:** 장시간 또는 격렬한 활동 제한  
-        **환기:** 최소화하고 공기청정기 사용  
-        **마스크:** KF80 이상 필수 착용 (특히 어린이, 노약자)
-        """)
-    
-    with st.expander("🔴 매우 나쁨 (76 이상) - 심각"):
-        st.markdown("""
-        **위험도:** 🔴 매우 높음 (심혈관 위험)  
-        **야외 활동:** 전면 금지  
-        **환기:** 절대 금지, 공기청정기 필수  
-        **마스크:** 외출 시 KF94 이상 필수, 가급적 외출 자제
+    pm_type, title = "PM2.5", "💨 PM2.5 (초미세먼지)"
+rows = GRADE_TABLE[pm_type]
+
+st.header(f"{title} 등급 기준 및 행동 수칙")
+
+# 등급 기준
+st.subheader(f"📏 {pm_type} 농도별 등급")
+
+# 좋음은 초록, 보통은 노랑, 나쁨 이상은 빨강 상자
+boxes = (st.success, st.warning, st.error, st.error)
+for col, box, icon, row in zip(st.columns(len(rows)), boxes, GRADE_ICONS, rows):
+    with col:
+        box(f"**{icon} {row['grade']}**")
+        st.markdown(f"**{format_range(*row['range'], unit='㎍/m³')}**")
+
+st.divider()
+
+# 위험도 및 행동 수칙
+st.subheader(f"⚠️ {pm_type} 농도별 위험도와 행동 수칙")
+
+for i, (icon, row) in enumerate(zip(GRADE_ICONS, rows)):
+    with st.expander(f"{icon} {row['grade']} ({format_range(*row['range'], sep='~')}) - {row['level']}",
+                     expanded=(i == 0)):
+        st.markdown(f"""
+        **위험도:** {row['risk']}  
+        **야외 활동:** {row['outdoor']}  
+        **환기:** {row['ventilation']}  
+        **마스크:** {row['mask']}
         """)
 
 st.divider()
@@ -0,0 +1,73 @@
+import streamlit as st
+
+import nationwide
+from grading import GRADE_ICONS, GRADE_NAMES
+
+# 페이지 설정
+st.set_page_config(
+    page_title="전국 미세먼지 지도",
+    layout="wide",
+    initial_sidebar_state="collapsed"
+)
+
+# --- 메인 헤더 ---
+st.title("🗺️ 전국 실시간 미세먼지 지도")
+st.markdown("""
+전국 측정소의 **현재 등급**과 **3시간 뒤 예측 등급**을 한 번에 확인하세요.
+원 안의 색은 현재 등급, 테두리 색은 3시간 뒤 예측 등급입니다.
+""")
+
+
+# 지도와 요약은 시간대(hour)마다 한 번만 만들어 파일로 저장되고(nationwide.py),
+# 이 프로세스에서는 같은 시간대 동안 메모리에 올려 두고 바로 돌려줌
+@st.cache_data(ttl=3600, show_spinner=False)
+def cached_summary(hour):
+    return nationwide.ensure_published(hour)
+
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def cached_map(hour, pm_type):
+    return nationwide.load_map(hour, pm_type)
+
+
+hour = nationwide.snapshot_hour()
+try:
+    with st.spinner("전국 측정소 데이터를 불러오는 중입니다..."):
+        summary = cached_summary(hour)
+except Exception as e:
+    st.error(f"전국 측정소 데이터를 불러오지 못했습니다: {e}")
+    st.stop()
+
+pm_type = st.radio("측정 항목", list(nationwide.PM_COLUMNS), horizontal=True, key="map_pm_type")
+column = nationwide.PM_COLUMNS[pm_type]
+
+st.caption(f"기준 측정 시각: {summary['data_time'] or '-'} · 측정소 {len(summary['station'])}곳")
+
+# --- 등급별 측정소 수 ---
+for col, name, icon in zip(st.columns(len(GRADE_NAMES)), GRADE_NAMES, GRADE_ICONS):
+    now_count = summary[column + '_grade'].count(name)
+    later_count = summary[column + '_forecast_grade'].count(name)
+    col.metric(f"{icon} {name}", f"{now_count}곳", f"3시간 뒤 {later_count}곳",
+               delta_color="off")
+
+st.divider()
+
+# --- 지도 ---
+if summary['located']:
+    st.iframe(cached_map(hour, pm_type), height=650)
+else:
+    st.warning("측정소 좌표 정보가 없어 지도를 그릴 수 없습니다. "
+               "`python station_catalog.py`로 측정소 정보를 내려받은 뒤 다시 열어 주세요.")
+
+# --- 측정소별 표 ---
+with st.expander("📋 측정소별 현재값과 예측"):
+    st.dataframe({
+        "시/도": summary['city'],
+        "측정소": summary['station'],
+        f"현재 {pm_type} (㎍/m³)": summary[column],
+        "현재 등급": summary[column + '_grade'],
+        f"3시간 뒤 {pm_type} (㎍/m³)": summary[column + '_forecast'],
+        "3시간 뒤 등급": summary[column + '_forecast_grade'],
+    }, use_container_width=True, hide_index=True)
+
+st.caption("🚨 예측은 최근 24시간 추세를 직선으로 연장한 참고값입니다.")
@@ -0,0 +1,314 @@
+# ===== 정시 미리 받기(prefetch) 스케줄러 =====
+# 사용자의 '분석 시작' 클릭이 에어코리아 호출을 일으키지 않도록,
+# 매시 정각 데이터가 발행된 직후(PUBLISH_DELAY + 무작위 지연) 모든 측정소를 미리 받아
+# - fetch_air_data가 읽는 공유 캐시(air_cache)와 시계열 저장소(air_store)에 쓰고
+# - PM10/PM2.5 예측도 그 자리에서 계산해 공유 저장소(shared_store)에 시간대 단위로 한 번에 발행한다.
+# - 전국 지도(nationwide.py) 스냅숏과 마커 레이어도 이번 시간대 것으로 만들어 둔다.
+# - alert_engine이 있으면 받은 결과로 예측 등급 경보(alerts.py)를 평가해 보낸다.
+# 실패한 측정소는 같은 주기 안에서 간격을 늘려 가며 다시 시도한다.
+#
+# 실행 방법:
+#   AIR_PREFETCH=1 streamlit run main.py   # 앱 프로세스 안에서 백그라운드 스레드로 실행
+#   python prefetch.py                     # 별도 워커 프로세스로 실행 (--once: 한 번만)
+import argparse
+import hashlib
+import json
+import logging
+import os
+import random
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+
+import numpy as np
+
+import metrics
+import nationwide
+from air_cache import PUBLISH_DELAY, default_cache, now_kst
+from air_parse import hourly_grid, parse_items, parse_stations
+from air_store import default_store
+from forecast import WINDOW_HOURS, IncrementalForecaster, linear_regression_predict
+from shared_store import MISSING, hour_tag
+from shared_store import default_store as default_shared_store
+
+logger = logging.getLogger(__name__)
+
+# 정시 발행 후 추가로 기다리는 무작위 시간의 최대값 (여러 프로세스가 동시에 몰리지 않도록)
+JITTER = timedelta(minutes=5)
+# 실패한 측정소 재시도 간격(초). 각 간격에 ±20% 무작위 흔들림을 줌
+RETRY_DELAYS = (30, 60, 120)
+# 미리 계산할 항목 (main.py 라디오와 같은 이름 → API 키)
+PM_KEYS = {'PM10': 'pm10Value', 'PM2.5': 'pm25Value'}
+N_FORECAST_HOURS = 3
+
+# 공유 저장소(shared_store)에서 미리 계산한 예측을 담는 이름공간
+FORECAST_NAMESPACE = "forecast"
+# 시간대별 실행 임대의 유효 시간(초): 한 시간대 동안은 임대를 잡은 프로세스 하나만 미리 받기를 실행
+PREFETCH_LEASE_TTL = 3600
+
+
+def next_run_time(now=None, jitter=JITTER, rng=random):
+    """다음 실행 시각: 다음 정시 + PUBLISH_DELAY + [0, jitter) 무작위 지연 (KST)."""
+    now = now or now_kst()
+    run = now.replace(minute=0, second=0, microsecond=0) + PUBLISH_DELAY
+    if run <= now:
+        run += timedelta(hours=1)
+    return run + timedelta(seconds=rng.uniform(0, jitter.total_seconds()))
+
+
+def default_stations():
+    """측정소 카탈로그의 모든 측정소 (AIR_PREFETCH_STATIONS='강남구,송파구'로 제한 가능)."""
+    configured = os.environ.get("AIR_PREFETCH_STATIONS")
+    if configured:
+        return [name.strip() for name in configured.split(",") if name.strip()]
+    from station_catalog import load_catalog
+
+    return [rec['name'] for rec in load_catalog().records]
+
+
+def default_series(frame, key):
+    """한 측정소 frame의 정시 격자 (times 리스트, NaN 값 배열) (main.py pm_series와 같은 모양)."""
+    grid = hourly_grid(frame, key[:-len('Value')])
+    return grid['time'].astype('datetime64[m]').astype(datetime).tolist(), grid['values']
+
+
+# ===== 미리 계산한 예측 결과 =====
+# key는 예측에 들어간 (시각, 값) 자체의 해시 → 입력이 조금이라도 다르면 다시 계산하므로 항상 같은 결과
+def forecast_key(station, pm_type, times, values, n_hours=N_FORECAST_HOURS):
+    values = np.asarray(values, dtype=np.float64)
+    points = [(times[i].strftime("%Y-%m-%d %H:%M"), round(float(values[i]), 3))
+              for i in np.flatnonzero(~np.isnan(values))]
+    raw = json.dumps([station, pm_type, n_hours, points], ensure_ascii=False)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def _forecast_entry(times, values, n_hours=N_FORECAST_HOURS):
+    """linear_regression_predict 결과 → 저장용 dict (예측 불가면 None)."""
+    predict_values, predict_times, _ = linear_regression_predict(times, values, n_hours=n_hours)
+    return _entry(predict_values, predict_times)
+
+
+def _entry(predict_values, predict_times):
+    """(예측값, 예측 시간) → 저장용 dict (예측 불가면 None)."""
+    if predict_values is None:
+        return None
+    return {
+        'predict_values': [float(v) for v in predict_values],
+        'predict_times': [t.strftime("%Y-%m-%d %H:%M") for t in predict_times],
+    }
+
+
+def precomputed_or_predict(station, pm_type, times, values, n_hours=N_FORECAST_HOURS, store=None):
+    """
+    미리 계산해 둔 예측이 있으면 읽고, 없으면 계산해 공유 저장소에 넣음.
+    - 여러 프로세스(레플리카)가 같은 입력을 동시에 요청해도 계산은 한 곳에서만 함
+    - 반환 형식은 linear_regression_predict와 같음 (모델은 항상 None)
+    """
+    store = store or default_shared_store
+    key = forecast_key(station, pm_type, times, values, n_hours)
+    try:
+        entry = store.get(FORECAST_NAMESPACE, key, default=MISSING)
+        if entry is MISSING:
+            metrics.inc('air_forecast_precomputed_total', result='miss')
+            entry = store.get_or_compute(FORECAST_NAMESPACE, key,
+                                         lambda: _forecast_entry(times, values, n_hours))
+        else:
+            metrics.inc('air_forecast_precomputed_total', result='hit')
+    except sqlite3.Error:
+        # 공유 저장소를 쓸 수 없으면 이 프로세스에서 바로 계산
+        entry = _forecast_entry(times, values, n_hours)
+    if entry is None:
+        return None, None, None
+    predict_times = [datetime.strptime(t, "%Y-%m-%d %H:%M") for t in entry['predict_times']]
+    return np.asarray(entry['predict_values']), predict_times, None
+
+
+class PrefetchScheduler:
+    """
+    정시마다 모든 측정소를 미리 받아 캐시/저장소/예측 결과를 채우는 스케줄러.
+    - run_once(): 한 주기 실행 → (성공 측정소 수, {측정소: 예외})
+    - start()/stop(): 데몬 스레드로 반복 실행 (시작하자마자 한 번 실행해 캐시를 데움)
+    - series_fn(frame, key): 예측에 넣을 (times, values)를 만드는 함수 (앱과 같은 입력을 쓰도록 주입)
+    - alert_engine: alerts.AlertEngine (None이면 경보 평가 안 함)
+    - shared: 예측을 발행할 공유 저장소 (shared_store.SharedStore)
+    - forecaster: 측정소별 예측 상태 (forecast.IncrementalForecaster). 주기마다 새 시간 값만 더해 O(1)로 갱신
+    """
+
+    def __init__(self, stations=None, num_rows=24, retry_delays=RETRY_DELAYS, jitter=JITTER,
+                 series_fn=default_series, cache=default_cache, store=default_store, max_workers=8,
+                 alert_engine=None, shared=default_shared_store):
+        self.stations = stations
+        self.num_rows = num_rows
+        self.retry_delays = retry_delays
+        self.jitter = jitter
+        self.series_fn = series_fn
+        self.cache = cache
+        self.store = store
+        self.max_workers = max_workers
+        self.alert_engine = alert_engine
+        self.shared = shared
+        self.forecaster = IncrementalForecaster(WINDOW_HOURS)
+        self.last_run = None   # (KST 시각, 성공 수, 실패 수)
+        self.skipped = False   # 마지막 run_once를 다른 프로세스가 이미 실행해 건너뛰었으면 True
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _fetch(self, stations):
+        import airkorea
+
+        results, errors = airkorea.fetch_all_stations(
+            stations, num_rows=self.num_rows, max_workers=self.max_workers, use_cache=False,
+        )
+        for name, items in results.items():
+            self.cache.write(airkorea.cache_key(name, self.num_rows), items)
+        return results, errors
+
+    @staticmethod
+    def _guarded(stage, fn):
+        """fn()을 실행하고, 실패하면 단계 이름과 함께 메트릭/로그만 남기고 넘어감."""
+        try:
+            fn()
+        except Exception:
+            metrics.inc('air_prefetch_errors_total', stage=stage)
+            logger.exception("정시 미리 받기 %s 단계 실패", stage)
+
+    def _precompute(self, results, hour):
+        # 이번 시간대 예측을 모두 계산한 뒤 한 번에 발행 (다른 프로세스는 절반만 바뀐 상태를 보지 않음)
+        # 앱과 같은 창(격자의 마지막 WINDOW_HOURS칸)을 키로 쓰고, 예측은 측정소별 상태에 새 시간만 더해 구함
+        entries = {}
+        for name, items in results.items():
+            frame = parse_items(items, name)
+            for pm_type, key in PM_KEYS.items():
+                times, values = self.series_fn(frame, key)
+                times, values = times[-WINDOW_HOURS:], values[-WINDOW_HOURS:]
+                result = self.forecaster.sync((name, pm_type), times, values)
+                metrics.inc('air_forecast_state_total', result=result)
+                entry = _entry(*self.forecaster.predict((name, pm_type), N_FORECAST_HOURS)[:2])
+                if entry is not None:
+                    entries[forecast_key(name, pm_type, times, values)] = entry
+        self.shared.publish(FORECAST_NAMESPACE, hour, entries)
+
+    def run_once(self):
+        """
+        한 주기 실행 → (성공 측정소 수, {측정소: 예외}).
+        - 여러 프로세스(레플리카)가 모두 미리 받기를 켜 두어도 시간대마다 임대를 잡은 한 곳만 받고/예측하고/
+          발행하고/경보를 보냄. 나머지는 그 시간대를 건너뛰고(self.skipped, 반환 (0, {}))
+          공유 캐시와 저장소에 올라온 결과를 읽음
+        - 실행 중 예외가 나면 임대를 풀어 다른 프로세스가 같은 시간대를 다시 시도할 수 있게 함
+        """
+        hour = hour_tag()
+        lease = "prefetch:" + hour
+        try:
+            leased = self.shared.try_lease(lease, ttl=PREFETCH_LEASE_TTL)
+        except sqlite3.Error:
+            leased = True  # 공유 저장소를 쓸 수 없으면 이 프로세스에서라도 실행
+        self.skipped = not leased
+        if not leased:
+            metrics.inc('air_prefetch_runs_total', result='skipped')
+            return 0, {}
+        try:
+            return self._run(hour)
+        except BaseException:
+            try:
+                self.shared.release_lease(lease)
+            except sqlite3.Error:
+                pass  # 풀지 못한 임대는 PREFETCH_LEASE_TTL이 지나면 무시됨
+            raise
+
+    def _run(self, hour):
+        stations = list(dict.fromkeys(self.stations or default_stations()))
+        with metrics.timed('prefetch'):
+            results, errors = self._fetch(stations)
+            # 실패한 측정소만 간격을 늘려 가며 재시도 (stop()이 불리면 바로 중단)
+            for delay in self.retry_delays:
+                if not errors or self._stop.wait(delay * random.uniform(0.8, 1.2)):
+                    break
+                retried, errors = self._fetch(list(errors))
+                results.update(retried)
+
+            if results:
+                # 한 단계가 실패해도 다음 단계는 계속함 (실패는 air_prefetch_errors_total과 로그로 남김)
+                # - store: 저장소 오류가 캐시/예측 갱신을 막지 않도록
+                # - forecast: 공유 저장소 오류 시 예측은 조회할 때 계산함
+                # - nationwide: 지도는 다음 주기 또는 첫 조회 때 다시 만듦
+                # - alerts: 보내지 못한 경보는 상태가 저장되지 않으므로 다음 주기에 다시 보냄
+                self._guarded('store', lambda: self.store.append_frame(parse_stations(results)))
+                self._guarded('forecast', lambda: self._precompute(results, hour))
+                self._guarded('nationwide', lambda: nationwide.publish(results))
+                if self.alert_engine is not None:
+                    self._guarded('alerts', lambda: self.alert_engine.run(results))
+
+        metrics.inc('air_prefetch_runs_total', result='ok' if not errors else 'partial')
+        metrics.inc('air_prefetch_stations_total', len(results), result='ok')
+        metrics.inc('air_prefetch_stations_total', len(errors), result='error')
+        self.last_run = (now_kst(), len(results), len(errors))
+        return len(results), errors
+
+    def _loop(self):
+        while not self._stop.is_set():
+            # 한 주기 실패로 스레드가 죽지 않도록 함 (다음 정시에 다시 시도)
+            self._guarded('run', self.run_once)
+            wait = (next_run_time(jitter=self.jitter) - now_kst()).total_seconds()
+            if self._stop.wait(max(wait, 0)):
+                break
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name="air-prefetch", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def start_background(**kwargs):
+    """프로세스당 하나의 스케줄러를 시작해 반환 (Streamlit 재실행마다 호출해도 한 번만 시작)."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = PrefetchScheduler(**kwargs).start()
+        return _scheduler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="에어코리아 정시 미리 받기 워커")
+    parser.add_argument("--once", action="store_true", help="한 번만 실행하고 종료")
+    parser.add_argument("--stations", help="쉼표로 구분한 측정소 (기본: 측정소 카탈로그 전체)")
+    parser.add_argument("--alerts-file", help="예측 등급 경보를 덧붙일 JSON Lines 파일")
+    parser.add_argument("--alerts-webhook", help="예측 등급 경보를 POST할 주소")
+    args = parser.parse_args(argv)
+
+    import alerts
+
+    engine = (alerts.AlertEngine(alerts.make_sink(args.alerts_file, args.alerts_webhook))
+              if args.alerts_file or args.alerts_webhook else alerts.engine_from_env())
+    stations = [s.strip() for s in args.stations.split(",")] if args.stations else None
+    scheduler = PrefetchScheduler(stations=stations, alert_engine=engine)
+    if args.once:
+        ok, errors = scheduler.run_once()
+        if scheduler.skipped:
+            print("이번 시간대는 다른 프로세스가 이미 미리 받았습니다.")
+            return
+        print(f"성공 {ok}곳, 실패 {len(errors)}곳")
+        return
+    scheduler.start()
+    reported = None
+    try:
+        while scheduler._thread.is_alive():
+            scheduler._thread.join(timeout=10)
+            if scheduler.last_run and scheduler.last_run != reported:
+                reported = scheduler.last_run
+                at, ok, failed = reported
+                print(f"{at:%Y-%m-%d %H:%M:%S} 성공 {ok}곳, 실패 {failed}곳")
+    except KeyboardInterrupt:
+        scheduler.stop()
+
+
+if __name__ == "__main__":
+    main()
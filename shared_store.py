@@ -0,0 +1,338 @@
+# ===== 여러 프로세스가 함께 쓰는 결과 저장소 (SQLite WAL) =====
+# Streamlit을 여러 개(레플리카) 띄우면 프로세스 안의 memo/SingleFlight는 서로 보이지 않아
+# 같은 측정소를 레플리카마다 따로 받고 따로 예측한다. 이 모듈은 같은 디스크를 보는 모든 프로세스가
+# SQLite 파일 하나(WAL 모드: 쓰는 중에도 읽기는 막히지 않음)로 결과와 '계산 중' 표시를 나눠 쓰게 한다.
+# - 이름공간(namespace)별 key → JSON 값. 값마다 시간대 세대(hour, 'YYYYMMDDHH')와 만료 시각이 있음
+# - publish(): 한 시간대 결과 전체를 트랜잭션 하나로 넣고 지난 세대를 KEEP_GENERATIONS개만 남김
+#   → 다른 프로세스는 이전 세대 전체 또는 새 세대 전체만 봄 (시간대 원자적 교체)
+# - 전체 크기가 MAX_BYTES를 넘으면 가장 오래 읽히지 않은 항목부터 LOW_WATER 비율까지 지움
+# - coalesce()/get_or_compute(): 없는 값은 임대(lease)를 잡은 프로세스 하나만 계산하고,
+#   나머지는 결과가 생길 때까지 기다렸다가 읽음 → 레플리카를 늘려도 API 호출/예측 계산은 늘지 않음
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+import metrics
+from air_cache import CACHE_DIR, PUBLISH_DELAY, SingleFlight, now_kst
+
+SHARED_STORE_PATH = os.environ.get("AIR_SHARED_STORE_PATH", os.path.join(CACHE_DIR, "shared.sqlite3"))
+# 저장소 전체 크기 상한(바이트)과 넘었을 때 줄일 목표 비율
+MAX_BYTES = int(os.environ.get("AIR_SHARED_STORE_MAX_BYTES", 64 * 1024 * 1024))
+LOW_WATER = 0.8
+# 이름공간마다 남겨 둘 시간대 세대 수 (현재 + 직전)
+KEEP_GENERATIONS = 2
+# 계산 임대의 유효 시간(초): 계산하던 프로세스가 죽어도 이 시간이 지나면 다른 프로세스가 이어받음
+LEASE_TTL = 60
+# 다른 프로세스의 계산 결과를 기다릴 때 확인 간격(초)
+POLL_INTERVAL = 0.05
+# 읽은 시각(accessed_at)은 이 간격(초)보다 오래됐을 때만 갱신 (읽을 때마다 쓰지 않도록)
+TOUCH_INTERVAL = 60
+# 다른 프로세스가 쓰기 잠금을 잡고 있을 때 기다리는 시간(초)
+# - 미리 받기/발행 같은 백그라운드 쓰기는 BUSY_TIMEOUT까지 기다림
+# - 클릭 경로(get의 읽은 시각 갱신, coalesce의 임대)는 기다리지 않거나 남은 대기 시간까지만 기다림
+BUSY_TIMEOUT = 30
+RELEASE_BUSY_TIMEOUT = 1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    hour TEXT NOT NULL,
+    value TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    expires_at REAL,
+    accessed_at REAL NOT NULL,
+    PRIMARY KEY (namespace, key, hour)
+);
+CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed_at);
+CREATE TABLE IF NOT EXISTS leases (
+    name TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+"""
+
+# 최근에 읽은 항목부터 크기를 누적해 target을 넘는 항목(오래 읽히지 않은 쪽)을 지움
+_EVICT = """
+DELETE FROM entries WHERE rowid IN (
+    SELECT rowid FROM (
+        SELECT rowid, SUM(size) OVER (ORDER BY accessed_at DESC, rowid DESC) AS kept FROM entries
+    ) WHERE kept > ?
+)
+"""
+
+# get()/coalesce()에서 '값 없음'을 나타냄 (None이나 빈 리스트도 정상 값으로 저장할 수 있도록)
+MISSING = object()
+
+
+def hour_tag(now=None):
+    """now가 속한 발행 시간대 ('YYYYMMDDHH', 정시 + PUBLISH_DELAY부터 다음 발행 전까지)."""
+    return ((now or now_kst()) - PUBLISH_DELAY).strftime("%Y%m%d%H")
+
+
+class SharedStore:
+    """
+    여러 프로세스가 함께 쓰는 SQLite 결과 저장소.
+    - get/put/publish: 이름공간별 key → JSON 값 (시간대 세대, 만료 시각)
+    - coalesce/get_or_compute: 프로세스 간 임대로 같은 계산을 한 곳에서만 실행
+    - evict: 크기 상한을 넘으면 오래 읽히지 않은 항목부터 지움
+    """
+
+    def __init__(self, path=SHARED_STORE_PATH, max_bytes=MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._local = threading.local()  # sqlite 연결은 스레드마다 따로 사용
+        self._flight = SingleFlight("shared_store")
+        self._written = 0  # 마지막 크기 확인 뒤 이 프로세스가 쓴 바이트 수
+
+    @property
+    def owner(self):
+        # fork 뒤에도 프로세스마다 달라야 하므로 매번 만듦
+        return f"{socket.gethostname()}:{os.getpid()}"
+
+    def connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            # 트랜잭션은 _write()에서 직접 시작 (BEGIN IMMEDIATE로 쓰기 잠금을 먼저 잡음)
+            conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _write(self):
+        conn = self.connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    @contextmanager
+    def _busy_timeout(self, seconds):
+        """이 스레드 연결의 잠금 대기 시간을 잠시 바꿈 (다른 프로세스의 긴 쓰기를 클릭 경로에서 기다리지 않도록)."""
+        conn = self.connect()
+        conn.execute(f"PRAGMA busy_timeout = {int(seconds * 1000)}")
+        try:
+            yield
+        finally:
+            conn.execute(f"PRAGMA busy_timeout = {int(BUSY_TIMEOUT * 1000)}")
+
+    @staticmethod
+    def _is_busy(error):
+        """다른 프로세스가 쓰기 잠금을 잡고 있어서 난 오류인지."""
+        return isinstance(error, sqlite3.OperationalError) and ("locked" in str(error) or "busy" in str(error))
+
+    # --- 읽기 ---
+    def get(self, namespace, key, hour=None, default=None):
+        """
+        저장된 값을 반환 (없거나 만료됐으면 default).
+        - hour: 시간대 세대 ('YYYYMMDDHH'). None이면 남아 있는 가장 최근 세대의 값
+        """
+        sql = "SELECT rowid, value, accessed_at FROM entries WHERE namespace = ? AND key = ?"
+        params = [namespace, key]
+        if hour is not None:
+            sql += " AND hour = ?"
+            params.append(hour)
+        now = time.time()
+        row = self.connect().execute(
+            sql + " AND (expires_at IS NULL OR expires_at > ?) ORDER BY hour DESC LIMIT 1",
+            params + [now],
+        ).fetchone()
+        if row is None:
+            return default
+        if now - row[2] > TOUCH_INTERVAL:
+            # 다른 프로세스가 쓰는 중(발행/퇴출)이면 기다리지 않고 이번 갱신은 건너뜀 (퇴출 순서에만 쓰임)
+            try:
+                with self._busy_timeout(0), self._write() as conn:
+                    conn.execute("UPDATE entries SET accessed_at = ? WHERE rowid = ?", (now, row[0]))
+            except sqlite3.OperationalError:
+                pass
+        return json.loads(row[1])
+
+    def current_hour(self, namespace):
+        """이름공간에서 가장 최근 세대 ('YYYYMMDDHH', 없으면 None)."""
+        row = self.connect().execute(
+            "SELECT MAX(hour) FROM entries WHERE namespace = ?", (namespace,)
+        ).fetchone()
+        return row[0]
+
+    def stats(self):
+        """{이름공간: (항목 수, 바이트)} (관리자 패널 표시용)."""
+        rows = self.connect().execute(
+            "SELECT namespace, COUNT(*), SUM(size) FROM entries GROUP BY namespace ORDER BY namespace"
+        )
+        return {namespace: (count, size) for namespace, count, size in rows}
+
+    # --- 쓰기 ---
+    @staticmethod
+    def _rows(namespace, hour, entries, ttl, now):
+        expires_at = now + ttl if ttl is not None else None
+        for key, value in entries:
+            text = json.dumps(value, ensure_ascii=False)
+            yield namespace, key, hour, text, len(text.encode("utf-8")), expires_at, now
+
+    def _insert(self, conn, rows):
+        rows = list(rows)
+        conn.executemany(
+            "INSERT OR REPLACE INTO entries (namespace, key, hour, value, size, expires_at, accessed_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            rows,
+        )
+        self._written += sum(row[4] for row in rows)
+
+    def put(self, namespace, key, value, hour=None, ttl=None):
+        """값 하나를 hour 세대(기본: 지금 시간대)에 저장. ttl(초)을 주면 그 뒤로는 읽히지 않음."""
+        hour = hour or hour_tag()
+        with self._write() as conn:
+            self._insert(conn, self._rows(namespace, hour, [(key, value)], ttl, time.time()))
+            self._maybe_evict(conn)
+
+    def publish(self, namespace, hour, entries, ttl=None, keep=KEEP_GENERATIONS):
+        """
+        한 시간대의 {key: 값} 전체를 트랜잭션 하나로 저장하고, 지난 세대는 keep개만 남김.
+        - 커밋 전에는 다른 프로세스에 새 세대가 전혀 보이지 않고, 커밋 뒤에는 전부 보임
+        - 반환: 저장한 항목 수
+        """
+        items = list(entries.items())
+        with self._write() as conn:
+            self._insert(conn, self._rows(namespace, hour, items, ttl, time.time()))
+            cutoff = conn.execute(
+                "SELECT DISTINCT hour FROM entries WHERE namespace = ? ORDER BY hour DESC LIMIT 1 OFFSET ?",
+                (namespace, keep - 1),
+            ).fetchone()
+            if cutoff is not None:
+                conn.execute("DELETE FROM entries WHERE namespace = ? AND hour < ?", (namespace, cutoff[0]))
+            self._maybe_evict(conn, force=True)
+        return len(items)
+
+    # --- 크기 제한 ---
+    def _maybe_evict(self, conn, force=False):
+        # 크기 합계는 쓴 양이 상한의 1/16을 넘을 때마다만 확인 (작은 put마다 전체를 훑지 않도록)
+        if not force and self._written < self.max_bytes / 16:
+            return
+        self._written = 0
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        conn.execute("DELETE FROM entries WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),))
+        evicted = conn.execute(_EVICT, (int(self.max_bytes * LOW_WATER),)).rowcount
+        metrics.inc('air_shared_store_evictions_total', evicted)
+
+    def evict(self):
+        """크기 상한을 넘었으면 지금 바로 줄임."""
+        with self._write() as conn:
+            self._maybe_evict(conn, force=True)
+
+    # --- 프로세스 간 계산 합치기 ---
+    def try_lease(self, name, ttl=LEASE_TTL):
+        """name 계산 권한을 얻으면 True (다른 프로세스가 유효한 임대를 갖고 있으면 False)."""
+        now = time.time()
+        with self._write() as conn:
+            conn.execute("DELETE FROM leases WHERE expires_at <= ?", (now,))
+            row = conn.execute("SELECT owner, expires_at FROM leases WHERE name = ?", (name,)).fetchone()
+            if row is not None and row[1] > now and row[0] != self.owner:
+                return False
+            conn.execute("INSERT OR REPLACE INTO leases (name, owner, expires_at) VALUES (?, ?, ?)",
+                         (name, self.owner, now + ttl))
+        return True
+
+    def release_lease(self, name):
+        with self._write() as conn:
+            conn.execute("DELETE FROM leases WHERE name = ? AND owner = ?", (name, self.owner))
+
+    def coalesce(self, name, compute, recheck, ttl=LEASE_TTL, wait=None, on_timeout=None):
+        """
+        여러 프로세스에서 같은 name의 계산을 한 번으로 합침.
+        - recheck(): 이미 있는 결과를 반환하거나 없으면 MISSING (결과가 저장되는 곳을 읽음)
+        - 결과가 없으면 임대(유효 ttl초)를 잡은 프로세스만 compute()를 실행 (compute가 결과를 저장해야 함)
+        - 임대를 못 잡으면 결과가 생기거나 임대가 풀릴 때까지 최대 wait초(기본 ttl) 기다림.
+          넘으면 on_timeout()의 결과를 반환 (없으면 직접 계산)
+        - 같은 프로세스 안의 동시 호출은 SingleFlight로 먼저 합침
+        """
+        wait = ttl if wait is None else wait
+        return self._flight.do(name, lambda: self._coalesce(name, compute, recheck, ttl, wait, on_timeout))
+
+    def _coalesce(self, name, compute, recheck, ttl, wait, on_timeout):
+        namespace = name.split(":", 1)[0]
+        deadline = time.monotonic() + wait
+        waited = False
+        while True:
+            found = recheck()
+            if found is not MISSING:
+                metrics.inc('air_shared_store_total', namespace=namespace, result='waited' if waited else 'hit')
+                return found
+            try:
+                # 다른 프로세스가 쓰는 중이면 남은 대기 시간까지만 잠금을 기다림
+                with self._busy_timeout(min(BUSY_TIMEOUT, max(0.0, deadline - time.monotonic()))):
+                    leased = self.try_lease(name, ttl)
+            except sqlite3.Error as e:
+                if not self._is_busy(e):
+                    # 저장소를 쓸 수 없어도 계산은 되도록 (합치기만 포기)
+                    metrics.inc('air_shared_store_total', namespace=namespace, result='error')
+                    return compute()
+                leased = False  # 잠금을 못 잡은 것은 임대를 못 잡은 것과 같게 처리 (대기 시간 안에서 다시 시도)
+            if leased:
+                # 확인과 임대 사이에 다른 프로세스가 계산을 끝내고 임대를 풀었을 수 있음
+                found = recheck()
+                if found is not MISSING:
+                    self._release_quietly(name)
+                    metrics.inc('air_shared_store_total', namespace=namespace, result='waited')
+                    return found
+                break
+            if time.monotonic() > deadline:
+                if on_timeout is not None:
+                    metrics.inc('air_shared_store_total', namespace=namespace, result='timeout')
+                    return on_timeout()
+                break
+            waited = True
+            time.sleep(POLL_INTERVAL)
+
+        metrics.inc('air_shared_store_total', namespace=namespace, result='miss')
+        try:
+            return compute()
+        finally:
+            if leased:
+                self._release_quietly(name)
+
+    def _release_quietly(self, name):
+        # 결과는 이미 저장됐으므로 오래 기다리지 않음 (풀지 못한 임대는 ttl이 지나면 무시되고,
+        # 기다리던 프로세스는 그 전에 저장된 결과를 읽음)
+        try:
+            with self._busy_timeout(RELEASE_BUSY_TIMEOUT):
+                self.release_lease(name)
+        except sqlite3.Error:
+            pass
+
+    def get_or_compute(self, namespace, key, compute, hour=None, ttl=None, lease_ttl=LEASE_TTL):
+        """
+        저장된 값이 있으면 반환하고, 없으면 한 프로세스만 compute()로 계산해 저장한 뒤 모두에게 돌려줌.
+        - hour/ttl은 put()과 같음 (hour가 None이면 찾을 때는 가장 최근 세대, 저장할 때는 지금 시간대)
+        """
+        def compute_and_put():
+            value = compute()
+            self.put(namespace, key, value, hour=hour, ttl=ttl)
+            return value
+
+        return self.coalesce(f"{namespace}:{hour or ''}:{key}", compute_and_put,
+                             lambda: self.get(namespace, key, hour=hour, default=MISSING),
+                             ttl=lease_ttl)
+
+
+# 프로세스 전체에서 함께 쓰는 기본 저장소
+default_store = SharedStore()
+
+
+if __name__ == "__main__":
+    # 예: python shared_store.py  → 이름공간별 항목 수와 크기
+    for namespace, (count, size) in default_store.stats().items():
+        print(f"{namespace}: {count}개, {size / 1024:.1f} KiB")
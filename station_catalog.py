@@ -0,0 +1,314 @@
+# ===== 측정소 카탈로그 =====
+# 하드코딩된 AIR_STATION_MAP에는 실제 에어코리아 측정소 이름이 아닌 항목도 있어
+# 조회하면 빈 items가 돌아온다. 측정소 정보 목록(getMsrstnList)을 한 번 내려받아
+# 로컬 파일로 두고, 프로세스당 한 번만 읽어 메모리 색인을 만든다.
+# - 트라이(StationTrie): 이름/주소 앞부분으로 자동완성
+# - KD-트리(KDTree): 위도/경도에서 가장 가까운 측정소 찾기
+# - 드롭다운용 시/도 → 측정소 목록
+# 측정소를 고르거나 확인할 때 API를 호출하지 않는다.
+#
+# 사용 예:
+#   python station_catalog.py            # 측정소 정보 내려받아 저장
+#   python station_catalog.py --show 강남  # 저장된 카탈로그에서 검색
+import argparse
+import functools
+import heapq
+import json
+import math
+import os
+import tempfile
+
+import numpy as np
+
+from stations import AIR_STATION_MAP
+
+STATION_INFO_PATH = os.environ.get(
+    "AIR_STATION_INFO",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "station_info.json"),
+)
+
+# 주소의 첫 단어(시/도 정식 명칭) → 드롭다운에 쓰는 짧은 이름
+SIDO_ALIASES = {
+    "서울특별시": "서울", "부산광역시": "부산", "대구광역시": "대구", "인천광역시": "인천",
+    "광주광역시": "광주", "대전광역시": "대전", "울산광역시": "울산", "세종특별자치시": "세종",
+    "경기도": "경기", "강원도": "강원", "강원특별자치도": "강원",
+    "충청북도": "충북", "충청남도": "충남",
+    "전라북도": "전북", "전북특별자치도": "전북", "전라남도": "전남",
+    "경상북도": "경북", "경상남도": "경남", "제주특별자치도": "제주",
+}
+
+# 위도/경도를 km 평면으로 바꿀 때 쓰는 값 (한반도 중앙 위도 기준 등장방형 근사)
+KM_PER_DEG_LAT = 110.57
+KM_PER_DEG_LON = 111.32 * math.cos(math.radians(36.0))
+
+
+def normalize_sido(addr):
+    """주소 문자열에서 시/도 짧은 이름을 뽑음 (예: '서울특별시 강남구 ...' → '서울'). 모르면 ''."""
+    first = (addr or "").split(" ", 1)[0]
+    return SIDO_ALIASES.get(first, first[:2])
+
+
+def _to_km(lat, lon):
+    return np.column_stack([np.asarray(lon, dtype=np.float64) * KM_PER_DEG_LON,
+                            np.asarray(lat, dtype=np.float64) * KM_PER_DEG_LAT])
+
+
+class StationTrie:
+    """
+    문자열 앞부분(prefix) 검색용 트라이.
+    - insert(key, value): key의 모든 글자 경로 끝에 value를 달아 둠
+    - search(prefix, limit): prefix로 시작하는 key들의 value를 삽입 순서대로 반환 (중복 제거)
+    """
+
+    def __init__(self):
+        self._root = {}
+
+    def insert(self, key, value):
+        node = self._root
+        for ch in key:
+            node = node.setdefault(ch, {})
+        node.setdefault(None, []).append(value)  # None 키: 이 노드에서 끝나는 값 목록
+
+    def search(self, prefix, limit=20):
+        node = self._root
+        for ch in prefix:
+            node = node.get(ch)
+            if node is None:
+                return []
+        found = []
+        seen = set()
+        stack = [node]
+        while stack and len(found) < limit:
+            node = stack.pop()
+            for value in node.get(None, ()):
+                if value not in seen:
+                    seen.add(value)
+                    found.append(value)
+            # 글자 순서대로 방문하도록 역순으로 쌓음
+            stack.extend(node[ch] for ch in sorted((k for k in node if k is not None), reverse=True))
+        return found[:limit]
+
+
+class KDTree:
+    """
+    2차원 점(km 평면)의 최근접 이웃 검색용 KD-트리.
+    - points: (N, 2) 배열
+    - nearest(point, k): 가까운 순서로 [(인덱스, 거리), ...]
+    """
+
+    def __init__(self, points):
+        self.points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        # 노드: [점 인덱스, 분할 축, 왼쪽 노드, 오른쪽 노드] (없으면 -1)
+        self._nodes = []
+        self._root = self._build(np.arange(len(self.points)), depth=0)
+
+    def _build(self, indices, depth):
+        if len(indices) == 0:
+            return -1
+        axis = depth % 2
+        order = indices[np.argsort(self.points[indices, axis], kind="stable")]
+        mid = len(order) // 2
+        node_id = len(self._nodes)
+        self._nodes.append([int(order[mid]), axis, -1, -1])
+        self._nodes[node_id][2] = self._build(order[:mid], depth + 1)
+        self._nodes[node_id][3] = self._build(order[mid + 1:], depth + 1)
+        return node_id
+
+    def nearest(self, point, k=1):
+        if self._root < 0:
+            return []
+        px, py = float(point[0]), float(point[1])
+        best = []  # 최대 힙: (-거리², 인덱스)
+        stack = [self._root]
+        while stack:
+            node_id = stack.pop()
+            if node_id < 0:
+                continue
+            idx, axis, left, right = self._nodes[node_id]
+            x, y = self.points[idx]
+            d2 = (x - px) ** 2 + (y - py) ** 2
+            if len(best) < k:
+                heapq.heappush(best, (-d2, idx))
+            elif d2 < -best[0][0]:
+                heapq.heapreplace(best, (-d2, idx))
+            diff = (px, py)[axis] - (x, y)[axis]
+            near, far = (left, right) if diff < 0 else (right, left)
+            # 분할면까지의 거리가 현재 k번째 거리보다 가까울 때만 반대편을 살펴봄
+            if len(best) < k or diff * diff < -best[0][0]:
+                stack.append(far)
+            stack.append(near)  # 가까운 쪽을 먼저 꺼내도록 나중에 쌓음
+        return [(idx, math.sqrt(-neg)) for neg, idx in sorted(best, reverse=True)]
+
+
+class StationCatalog:
+    """
+    측정소 목록 + 검색 색인.
+    - records: [{'name', 'addr', 'city', 'lat', 'lon'}, ...] (좌표가 없으면 None)
+    - verified: 에어코리아 측정소 정보에서 만든 목록이면 True (AIR_STATION_MAP 대체본이면 False)
+    """
+
+    def __init__(self, records, verified=True):
+        self.verified = verified
+        self.records = []
+        self._by_name = {}
+        self._by_city = {}
+        for rec in records:
+            if not rec['name']:
+                continue
+            # 같은 이름이 여러 시/도에 있으면(대체본의 '신흥동' 등) 드롭다운에는 모두 보여 줌
+            city_names = self._by_city.setdefault(rec['city'], [])
+            if rec['name'] not in city_names:
+                city_names.append(rec['name'])
+            if rec['name'] not in self._by_name:
+                self._by_name[rec['name']] = rec
+                self.records.append(rec)
+
+        self._trie = StationTrie()
+        for rec in self.records:
+            self._trie.insert(rec['name'], rec['name'])
+            # 주소의 각 단어(예: '강남구', '학동로')로도 찾을 수 있게 함
+            for word in (rec.get('addr') or "").split():
+                self._trie.insert(word, rec['name'])
+
+        located = [rec for rec in self.records if rec.get('lat') is not None and rec.get('lon') is not None]
+        self._located_names = [rec['name'] for rec in located]
+        self._tree = KDTree(_to_km([r['lat'] for r in located], [r['lon'] for r in located]))
+
+    @classmethod
+    def from_station_map(cls, station_map=AIR_STATION_MAP):
+        """측정소 정보 파일이 없을 때 쓰는 대체본 (좌표 없음, 이름 검증 안 됨)."""
+        records = [
+            {'name': name, 'addr': city, 'city': city, 'lat': None, 'lon': None}
+            for city, names in station_map.items() for name in names
+        ]
+        return cls(records, verified=False)
+
+    def __contains__(self, name):
+        return name in self._by_name
+
+    def __len__(self):
+        return len(self.records)
+
+    def info(self, name):
+        """측정소 정보 dict (없으면 None)."""
+        return self._by_name.get(name)
+
+    def cities(self):
+        """드롭다운용 시/도 목록 (AIR_STATION_MAP 순서를 먼저 따르고, 나머지는 가나다순)."""
+        known = [c for c in AIR_STATION_MAP if c in self._by_city]
+        return known + sorted(c for c in self._by_city if c not in AIR_STATION_MAP)
+
+    def stations_in(self, city):
+        return list(self._by_city.get(city, []))
+
+    def search(self, prefix, limit=20):
+        """이름 또는 주소 단어가 prefix로 시작하는 측정소 이름 목록."""
+        prefix = (prefix or "").strip()
+        return self._trie.search(prefix, limit) if prefix else []
+
+    @property
+    def has_locations(self):
+        return bool(self._located_names)
+
+    def nearest(self, lat, lon, k=1):
+        """(lat, lon)에서 가까운 측정소 [(측정소 정보, 거리 km), ...]. 좌표 정보가 없으면 []."""
+        point = _to_km([lat], [lon])[0]
+        return [(self._by_name[self._located_names[i]], dist) for i, dist in self._tree.nearest(point, k)]
+
+
+def _float_or_none(text):
+    try:
+        value = float(text)
+    except (TypeError, ValueError):
+        return None
+    return value if math.isfinite(value) else None
+
+
+def parse_station_info(items):
+    """
+    getMsrstnList items → 카탈로그 records.
+    - dmX/dmY 중 위도 범위(33~39)에 드는 값을 위도로 사용 (API 문서와 실제 값의 이름이 헷갈리는 경우 대비)
+    """
+    records = []
+    for it in items or []:
+        x, y = _float_or_none(it.get('dmX')), _float_or_none(it.get('dmY'))
+        lat, lon = (x, y) if x is not None and 30 <= x <= 40 else (y, x)
+        if lat is None or lon is None:
+            lat = lon = None
+        addr = (it.get('addr') or "").strip()
+        records.append({
+            'name': (it.get('stationName') or "").strip(),
+            'addr': addr,
+            'city': normalize_sido(addr),
+            'lat': lat,
+            'lon': lon,
+        })
+    return records
+
+
+def download_station_info(path=STATION_INFO_PATH, page_size=1000):
+    """
+    측정소 정보 전체를 내려받아 path에 원자적으로 저장하고 측정소 수를 반환.
+    - 한 번 받아 두면 되는 정보이므로 앱 실행 중에는 호출하지 않는다.
+    """
+    from airkorea import request_station_info
+
+    items = []
+    page = 1
+    while True:
+        page_items, total = request_station_info(page_no=page, num_rows=page_size)
+        items.extend(page_items)
+        if not page_items or len(items) >= total:
+            break
+        page += 1
+
+    records = parse_station_info(items)
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(records, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+    load_catalog.cache_clear()
+    return len(records)
+
+
+@functools.lru_cache(maxsize=None)
+def load_catalog(path=STATION_INFO_PATH):
+    """
+    저장된 측정소 정보로 카탈로그를 만듦 (프로세스당 한 번).
+    - 파일이 없거나 깨졌으면 AIR_STATION_MAP으로 만든 대체본(verified=False)
+    """
+    try:
+        with open(path, encoding="utf-8") as f:
+            records = json.load(f)
+    except (OSError, ValueError):
+        return StationCatalog.from_station_map()
+    return StationCatalog(records, verified=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="에어코리아 측정소 정보 내려받기/검색")
+    parser.add_argument("--path", default=STATION_INFO_PATH)
+    parser.add_argument("--show", metavar="PREFIX", help="내려받지 않고 저장된 카탈로그에서 검색")
+    parser.add_argument("--near", nargs=2, type=float, metavar=("LAT", "LON"),
+                        help="내려받지 않고 가까운 측정소 5곳 출력")
+    args = parser.parse_args(argv)
+
+    if args.show is None and args.near is None:
+        count = download_station_info(args.path)
+        print(f"측정소 {count}곳 저장: {args.path}")
+        return
+
+    catalog = load_catalog(args.path)
+    if args.show is not None:
+        for name in catalog.search(args.show):
+            rec = catalog.info(name)
+            print(f"{name}\t{rec['city']}\t{rec['addr']}")
+    if args.near is not None:
+        for rec, dist in catalog.nearest(*args.near, k=5):
+            print(f"{rec['name']}\t{dist:6.1f} km\t{rec['addr']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+# ===== 측정소 목록 =====
+# main.py의 드롭다운과 전국 일괄 조회(airkorea.fetch_all_stations)가 함께 쓰는 측정소 맵.
+
+# 측정소 목록(시/도 -> 구/군). UI 편의를 위한 하드코딩된 맵.
+AIR_STATION_MAP = {
+    "서울": ["강남구", "강동구", "강북구", "강서구", "관악구", "광진구", "구로구", "금천구", "노원구", "도봉구", "동대문구", "동작구", "마포구", "서대문구", "서초구", "성동구", "성북구", "송파구", "양천구", "영등포구", "용산구", "은평구", "종로구", "중구", "중랑구"],
+    "부산": ["대연동", "명장동", "학장동", "덕천동", "전포동", "광복동", "용호동", "장림동", "신평동", "해운대", "기장읍", "정관읍"],
+    "대구": ["봉산동", "이현동", "지산동", "성서", "대명동", "복현동", "만촌동", "안심"],
+    "인천": ["주안", "구월동", "송도", "연희동", "운서동", "신흥동", "석남동"],
+    "광주": ["운암동", "광산구", "북구", "동구", "서구"],
+    "대전": ["가양동", "문평동", "노은동", "오룡동", "대흥동"],
+    "울산": ["달동", "삼산동", "명촌동", "농소", "화암동"],
+    "세종": ["신흥동", "보람동"],
+    "경기": ["수원", "성남", "안양", "안산", "용인", "평택", "고양", "남양주", "의정부", "광명", "화성", "파주", "시흥", "김포", "군포", "하남", "오산", "이천", "안성"],
+    "강원": ["춘천", "원주", "강릉", "동해", "속초", "삼척", "철원", "횡성", "홍천"],
+    "충북": ["청주", "충주", "제천", "단양", "옥천", "증평", "진천"],
+    "충남": ["천안", "공주", "보령", "아산", "서산", "논산", "당진", "계룡", "예산"],
+    "전북": ["전주", "군산", "익산", "정읍", "남원", "김제", "완주"],
+    "전남": ["목포", "여수", "순천", "나주", "광양", "무안", "구례", "화순"],
+    "경북": ["포항", "경주", "김천", "안동", "구미", "영주", "영천", "상주"],
+    "경남": ["창원", "진주", "통영", "사천", "김해", "밀양", "거제", "양산"],
+    "제주": ["제주시", "서귀포"]
+}
+
+
+def all_station_names():
+    """AIR_STATION_MAP의 모든 측정소 이름을 순서를 유지한 채 중복 없이 반환."""
+    names = []
+    seen = set()
+    for districts in AIR_STATION_MAP.values():
+        for name in districts:
+            if name not in seen:
+                seen.add(name)
+                names.append(name)
+    return names
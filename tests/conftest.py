@@ -0,0 +1,14 @@
+# 테스트 공통 설정
+# - 저장소 루트의 모듈(air_parse, forecast, ...)을 바로 import 할 수 있게 경로 추가
+# - 캐시/저장소 경로는 모듈을 import 할 때 정해지므로, 실제 .cache를 건드리지 않도록 먼저 임시 디렉터리로 바꿈
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+_TMP = tempfile.mkdtemp(prefix="air-tests-")
+os.environ["AIR_CACHE_DIR"] = os.path.join(_TMP, "air")
+os.environ["AIR_STORE_PATH"] = os.path.join(_TMP, "air_store.sqlite3")
+os.environ["AIR_METRICS_PATH"] = os.path.join(_TMP, "metrics.prom")
@@ -0,0 +1,69 @@
+import json
+import threading
+from datetime import timedelta
+
+import pytest
+
+from air_cache import AirCache, now_kst
+
+KEY = ("종로구", 24, "DAILY", "1.0")
+ITEMS = [{'dataTime': '2026-10-17 09:00', 'pm10Value': '30'}]
+
+
+def expire(cache, key):
+    entry = cache.read(key)
+    entry['expires_at'] = (now_kst() - timedelta(minutes=1)).strftime("%Y-%m-%d %H:%M:%S")
+    with open(cache._path(key), "w", encoding="utf-8") as f:
+        json.dump(entry, f)
+
+
+def join_refresh():
+    for thread in threading.enumerate():
+        if thread.name == "air-cache-refresh":
+            thread.join()
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = AirCache(str(tmp_path))
+    cache.write(KEY, ITEMS)
+    expire(cache, KEY)
+    return cache
+
+
+def test_routine_stale_serve_is_not_a_failure(cache):
+    status = {}
+    cache.get_or_fetch(KEY, lambda: ITEMS, status=status)
+    assert status['stale'] and not status['refresh_failed']
+
+
+def test_failed_refresh_is_recorded_until_next_success(cache):
+    def fail():
+        raise OSError("api down")
+
+    cache.get_or_fetch(KEY, fail)
+    join_refresh()
+    status = {}
+    assert cache.get_or_fetch(KEY, lambda: ITEMS, status=status) == ITEMS
+    assert status['stale'] and status['refresh_failed']
+    assert cache.read(KEY)['refresh_error'] == "OSError: api down"
+
+    join_refresh()  # 이번 갱신은 성공 → 기록이 지워짐
+    assert 'refresh_failed_at' not in cache.read(KEY)
+    status = {}
+    cache.get_or_fetch(KEY, lambda: ITEMS, status=status)
+    assert not status['refresh_failed']
+
+
+def test_fetch_air_data_reports_open_circuit(monkeypatch, tmp_path):
+    import airkorea
+
+    monkeypatch.setattr(airkorea, "default_cache", AirCache(str(tmp_path)))
+    monkeypatch.setattr(airkorea, "breaker", airkorea.CircuitBreaker(threshold=1))
+    monkeypatch.setattr(airkorea, "request_air_data", lambda *a, **k: ITEMS)
+    status = {}
+    airkorea.fetch_air_data("종로구", status=status)
+    assert status['circuit_open'] is False
+    airkorea.breaker.record_failure()
+    airkorea.fetch_air_data("종로구", status=status)
+    assert status['circuit_open'] is True
@@ -0,0 +1,84 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from air_parse import MAX_FILL_GAP, hourly_grid, parse_items, parse_stations
+
+START = datetime(2026, 10, 17, 0)
+
+
+def item(hour, pm10, flag=None):
+    it = {'dataTime': (START + timedelta(hours=hour)).strftime('%Y-%m-%d %H:%M'), 'pm10Value': pm10}
+    if flag is not None:
+        it['pm10Flag'] = flag
+    return it
+
+
+def frame_with_gaps():
+    # 2시: 한 시간 빈 구간, 5~(5+MAX_FILL_GAP): MAX_FILL_GAP보다 긴 빈 구간
+    long_gap = range(5, 5 + MAX_FILL_GAP + 1)
+    hours = [h for h in range(5 + MAX_FILL_GAP + 3) if h != 2 and h not in long_gap]
+    return parse_items([item(h, str(10 * (h + 1))) for h in hours]), long_gap
+
+
+def test_leave_keeps_gaps():
+    frame, long_gap = frame_with_gaps()
+    grid = hourly_grid(frame)
+    assert len(grid['time']) == 5 + MAX_FILL_GAP + 3
+    assert np.isnan(grid['values'][2])
+    assert np.isnan(grid['values'][list(long_gap)]).all()
+    assert not grid['filled'].any()
+    assert grid['quality']['gaps'] == 1 + len(long_gap)
+    assert grid['quality']['filled'] == 0
+
+
+def test_interpolate_fills_short_gaps_only():
+    frame, long_gap = frame_with_gaps()
+    grid = hourly_grid(frame, fill='interpolate')
+    assert grid['values'][2] == pytest.approx(30.0)  # 20과 40 사이
+    assert np.isnan(grid['values'][list(long_gap)]).all()
+    assert grid['filled'].tolist().count(True) == 1
+    assert not grid['observed'][2]
+
+
+def test_ffill_uses_previous_value():
+    frame, long_gap = frame_with_gaps()
+    grid = hourly_grid(frame, fill='ffill')
+    assert grid['values'][2] == 20.0
+    assert np.isnan(grid['values'][list(long_gap)]).all()
+
+
+def test_gap_of_max_length_is_filled():
+    hours = [0] + list(range(MAX_FILL_GAP + 1, MAX_FILL_GAP + 3))
+    frame = parse_items([item(h, '10') for h in hours])
+    grid = hourly_grid(frame, fill='interpolate')
+    assert grid['filled'][1:MAX_FILL_GAP + 1].all()
+    assert not np.isnan(grid['values']).any()
+    assert hourly_grid(frame, fill='interpolate', max_gap=MAX_FILL_GAP - 1)['quality']['filled'] == 0
+
+
+def test_edges_are_not_filled():
+    frame = parse_items([item(1, '10'), item(2, '20')])
+    grid = hourly_grid(frame, fill='ffill', start=START, end=START + timedelta(hours=4))
+    assert np.isnan(grid['values'][[0, 3, 4]]).all()
+    assert grid['quality']['filled'] == 0
+
+
+def test_quality_counts():
+    items = [item(0, '10'), item(1, '-'), item(2, '999', flag='점검'), item(3, '40'), item(3, '41'), item(5, '50')]
+    grid = hourly_grid(parse_items(items))
+    assert grid['quality'] == {
+        'rows': 6, 'observed': 3, 'missing': 1, 'flagged': 1, 'duplicates': 1, 'gaps': 1, 'filled': 0,
+    }
+
+
+def test_flagged_values_are_nan():
+    frame = parse_stations({'A': [item(0, '999', flag='점검'), item(1, '20')]})
+    assert np.isnan(frame['pm10'][0]) and frame['pm10_flag'].tolist() == [True, False]
+
+
+def test_unknown_fill():
+    frame, _ = frame_with_gaps()
+    with pytest.raises(ValueError):
+        hourly_grid(frame, fill='spline')
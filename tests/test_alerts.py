@@ -0,0 +1,104 @@
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+import alerts
+
+END = datetime(2026, 10, 17, 9)
+RISE = [40 + 1.7 * i for i in range(24)]  # PM10 79 → 3시간 뒤 예측이 '나쁨'
+
+
+class ListSink:
+    def __init__(self, fail=False):
+        self.sent = []
+        self.fail = fail
+
+    def send(self, events):
+        if self.fail:
+            raise OSError("webhook down")
+        self.sent.extend(events)
+
+
+def items(values, end):
+    return [
+        {'dataTime': (end - timedelta(hours=i)).strftime('%Y-%m-%d %H:%M'),
+         'pm10Value': str(round(v)), 'pm25Value': '10'}
+        for i, v in enumerate(reversed(values))
+    ]
+
+
+def results(values, hours_later=0):
+    end = END + timedelta(hours=hours_later)
+    return {'A': items(values, end), 'B': items([20] * 24, end)}
+
+
+@pytest.fixture
+def engine(tmp_path):
+    return alerts.AlertEngine(ListSink(), state_path=str(tmp_path / "state.json"))
+
+
+def test_rise_then_dedup(engine):
+    events = engine.run(results(RISE))
+    assert [(e['station'], e['pm_type'], e['kind'], e['grade']) for e in events] == [('A', 'PM10', 'rise', '나쁨')]
+    # 같은 시간대를 다시 평가해도 다시 보내지 않음
+    assert engine.run(results(RISE)) == []
+    assert len(engine.sink.sent) == 1
+
+
+def test_no_flapping_around_boundary(engine):
+    engine.run(results(RISE))
+    # 경계(81) 바로 아래·위를 오가도 히스테리시스 안이면 해제/재경보 없음
+    assert engine.run(results([78] * 24, hours_later=1)) == []
+    assert engine.run(results([82] * 24, hours_later=2)) == []
+    assert engine.run(results([77] * 24, hours_later=3)) == []
+    # 경계 + HYSTERESIS 아래로 충분히 내려가면 해제
+    events = engine.run(results([60] * 24, hours_later=4))
+    assert [(e['kind'], e['grade'], e['previous_grade']) for e in events] == [('clear', '보통', '나쁨')]
+    assert [e['kind'] for e in engine.sink.sent] == ['rise', 'clear']
+
+
+def test_event_ids_are_stable(tmp_path):
+    first = alerts.AlertEngine(ListSink(), state_path=str(tmp_path / "a.json")).run(results(RISE))
+    second = alerts.AlertEngine(ListSink(), state_path=str(tmp_path / "b.json")).run(results(RISE))
+    assert [e['id'] for e in first] == [e['id'] for e in second]
+
+
+def test_failed_send_is_retried(engine):
+    engine.sink.fail = True
+    with pytest.raises(OSError):
+        engine.run(results(RISE))
+    engine.sink.fail = False
+    assert [e['kind'] for e in engine.run(results(RISE))] == ['rise']
+
+
+def test_state_lease_held_elsewhere(engine, monkeypatch):
+    monkeypatch.setattr(alerts, "STATE_LEASE_WAIT", 0.2)
+    store = alerts.shared_store
+    name = "alerts:" + alerts.os.path.abspath(engine.state_path)
+    with store._write() as conn:
+        conn.execute("INSERT OR REPLACE INTO leases (name, owner, expires_at) VALUES (?, ?, ?)",
+                     (name, "other-host:1", time.time() + 60))
+    try:
+        with pytest.raises(TimeoutError):
+            engine.run(results(RISE))
+        assert engine.sink.sent == []
+    finally:
+        with store._write() as conn:
+            conn.execute("DELETE FROM leases WHERE name = ?", (name,))
+    assert len(engine.run(results(RISE))) == 1
+
+
+def test_failed_state_save_leaves_no_temp_file(tmp_path, monkeypatch):
+    path = tmp_path / "state.json"
+    alerts.save_state({'A|PM10': {'level': 2, 'data_time': '2026-10-17 09:00'}}, str(path))
+
+    def broken_dump(*args, **kwargs):
+        raise OSError("No space left on device")
+
+    monkeypatch.setattr(alerts.json, "dump", broken_dump)
+    with pytest.raises(OSError):
+        alerts.save_state({}, str(path))
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["state.json"]
+    monkeypatch.undo()
+    assert alerts.load_state(str(path))['A|PM10']['level'] == 2
@@ -0,0 +1,30 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from air_parse import parse_items
+from batch import analyze_frame
+from forecast import linear_regression_predict
+from prefetch import default_series
+
+END = datetime(2026, 10, 17, 9)
+
+
+@pytest.mark.parametrize("rows", [24, 48, 24 * 7])
+def test_batch_forecast_matches_app(rows):
+    rng = np.random.default_rng(rows)
+    # 앞쪽은 내려가다 최근 24시간은 올라가는 추세 → 전체로 맞추면 예측이 달라짐
+    values = np.concatenate([np.linspace(120, 20, rows - 24), np.linspace(20, 90, 24)]) + rng.normal(0, 3, rows)
+    items = [{'dataTime': (END - timedelta(hours=i)).strftime('%Y-%m-%d %H:%M'),
+              'pm10Value': '-' if i % 11 == 5 else str(int(v)), 'pm25Value': str(int(v / 2))}
+             for i, v in enumerate(values[::-1])]
+    frame = parse_items(items, 'A')
+    record = analyze_frame(frame, 'A')
+
+    # 앱: 정시 격자의 마지막 24칸으로 예측 (main.py analysis_for)
+    times, grid_values = default_series(frame, 'pm10Value')
+    expected, expected_times, _ = linear_regression_predict(times[-24:], grid_values[-24:])
+    assert [f['value'] for f in record['pm10']['forecast']] == pytest.approx(expected.tolist(), abs=1e-3)
+    assert [f['time'] for f in record['pm10']['forecast']] == [t.strftime("%Y-%m-%d %H:%M") for t in expected_times]
+    assert len(record['readings']) == rows
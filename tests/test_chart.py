@@ -0,0 +1,31 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from air_parse import hourly_grid, parse_items
+from chart import render_cache_key
+from forecast import linear_regression_predict
+
+START = datetime(2026, 10, 10)
+
+
+def test_render_key_changes_with_gap_fill():
+    # 예측 창(최근 24시간) 밖에 빈 시간이 있으면 채우기 방식을 바꿔도 예측은 같음 → 그린 값으로 구분해야 함
+    hours = [h for h in range(72) if h not in (10, 11)]
+    frame = parse_items([{'dataTime': (START + timedelta(hours=h)).strftime('%Y-%m-%d %H:%M'),
+                          'pm10Value': str(20 + h % 9)} for h in hours])
+    keys = set()
+    for fill in ('leave', 'interpolate', 'ffill'):
+        grid = hourly_grid(frame, fill=fill)
+        times = grid['time'].astype('datetime64[m]').astype(datetime).tolist()
+        predict_values = linear_regression_predict(times[-24:], grid['values'][-24:])[0]
+        keys.add(render_cache_key('A', 'PM10', times[-1], predict_values, 'title',
+                                  values=grid['values'], filled=grid['filled']))
+    assert len(keys) == 3
+
+
+def test_render_key_is_stable():
+    values = np.array([10.0, np.nan, 12.0])
+    key = render_cache_key('A', 'PM10', START, [1.0, 2.0], 't', values=values, filled=[False, False, False])
+    assert key == render_cache_key('A', 'PM10', START, [1.0, 2.0], 't', values=values.copy(),
+                                   filled=np.zeros(3, dtype=bool))
@@ -0,0 +1,48 @@
+import export
+
+
+def test_http_server_is_local_by_default():
+    server = export.start_http_server(0)
+    try:
+        assert server.server_address[0] == "127.0.0.1"
+    finally:
+        server.shutdown()
+        server.server_close()
+        export._server = None
+
+
+def test_stream_url_round_trips_through_query_parser():
+    from datetime import datetime
+    from urllib.parse import parse_qs, urlparse
+
+    url = export.stream_url("http://localhost:8502/", "xlsx", ["강남구", "송파구"], datetime(2025, 9, 1, 6),
+                            pollutants=["pm10", "pm25"])
+    parsed = urlparse(url)
+    assert parsed.path == "/export.xlsx"
+    query = export.query_from_params(parse_qs(parsed.query))
+    assert query['stations'] == ["강남구", "송파구"]
+    assert query['pollutants'] == ["pm10", "pm25"]
+    assert query['start'] == "2025-09-01T06:00"
+    assert export.stream_url("http://h:1", "csv") == "http://h:1/export.csv"
+
+
+def test_date_only_end_includes_the_whole_day():
+    def end(value):
+        return export.query_from_params({'end': [value]})['end']
+
+    assert end("2025-09-30") == "2025-09-30T23:59"
+    assert end("2025-09") == "2025-09-30T23:59"
+    assert end("2025-09-30T06:00") == "2025-09-30T06:00"
+    assert end("2025-09-30 06:00") == "2025-09-30 06:00"
+
+
+def test_export_end_date_keeps_rows_after_midnight(tmp_path):
+    from air_store import AirStore
+
+    store = AirStore(str(tmp_path / "store.sqlite3"))
+    store.append_items('A', [{'dataTime': f'2025-09-{day} {hour:02d}:00', 'pm10Value': '10'}
+                             for day in (29, 30) for hour in (0, 12, 23)] + [
+                            {'dataTime': '2025-10-01 00:00', 'pm10Value': '10'}])
+    query = export.query_from_params({'end': ["2025-09-30"], 'pollutants': ["pm10"]})
+    rows = [row for chunk in export.iter_records(store, **query) for row in chunk]
+    assert [row[1] for row in rows][-3:] == ["2025-09-30 00:00", "2025-09-30 12:00", "2025-09-30 23:00"]
@@ -0,0 +1,137 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from forecast import (
+    MIN_PREDICTION, MODELS, WINDOW_HOURS, IncrementalForecaster, fit_predict_batch, linear_regression_predict,
+    predict,
+)
+
+LinearRegression = pytest.importorskip("sklearn.linear_model").LinearRegression
+
+
+def _series(seed, n=24, missing=0.15):
+    rng = np.random.default_rng(seed)
+    values = rng.uniform(5, 150, n)
+    values[rng.random(n) < missing] = np.nan
+    times = [datetime(2026, 10, 17) + timedelta(hours=i) for i in range(n)]
+    return times, values
+
+
+def _sklearn_predict(values, n_hours=3):
+    """예전 main.py 방식: 유효 값에 0, 1, 2, ... 순번을 매겨 LinearRegression으로 맞춤."""
+    y = values[~np.isnan(values)]
+    X = np.arange(len(y)).reshape(-1, 1)
+    model = LinearRegression().fit(X, y)
+    future = np.arange(len(y), len(y) + n_hours).reshape(-1, 1)
+    return np.maximum(MIN_PREDICTION, model.predict(future)), model
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_matches_sklearn(seed):
+    times, values = _series(seed)
+    predict_values, predict_times, model = linear_regression_predict(times, values, n_hours=3)
+    expected, reference = _sklearn_predict(values)
+
+    np.testing.assert_allclose(predict_values, expected, rtol=1e-9, atol=1e-9)
+    np.testing.assert_allclose(model.coef_, reference.coef_, rtol=1e-9, atol=1e-12)
+    assert model.intercept_ == pytest.approx(reference.intercept_, rel=1e-9, abs=1e-9)
+    last = max(t for t, v in zip(times, values) if not np.isnan(v))
+    assert predict_times == [last + timedelta(hours=i) for i in (1, 2, 3)]
+
+
+def test_clips_at_min_prediction():
+    times = [datetime(2026, 10, 17, h) for h in range(5)]
+    predict_values, _, _ = linear_regression_predict(times, [40, 30, 20, 10, 2], n_hours=3)
+    assert (predict_values == MIN_PREDICTION).all()
+
+
+def test_too_few_points():
+    times = [datetime(2026, 10, 17, h) for h in range(4)]
+    assert linear_regression_predict(times, [10, np.nan, np.nan, 12]) == (None, None, None)
+
+
+def test_batch_matches_single_series():
+    rows = [_series(seed)[1] for seed in range(10)]
+    rows.append(np.array([np.nan] * 22 + [10.0, 11.0]))  # 유효 값 2개 → NaN
+    preds, _, _ = fit_predict_batch(np.vstack(rows), n_hours=3)
+    times = _series(0)[0]
+    for row, pred in zip(rows, preds):
+        single = linear_regression_predict(times, row, n_hours=3)[0]
+        if single is None:
+            assert np.isnan(pred).all()
+        else:
+            np.testing.assert_allclose(pred, single, rtol=1e-9)
+
+
+def _grid(seed, n=40):
+    times, values = _series(seed, n=n, missing=0.2)
+    values[10:14] = np.nan  # 창 경계를 넘는 긴 빈 구간
+    return times, values
+
+
+def _fresh(times, values, end):
+    """앱처럼 end시각까지의 격자에서 마지막 WINDOW_HOURS칸으로 예측."""
+    last = max(i for i in range(end + 1) if not np.isnan(values[i]))
+    lo = max(0, last + 1 - WINDOW_HOURS)
+    return linear_regression_predict(times[lo:last + 1], values[lo:last + 1], n_hours=3)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_incremental_matches_fresh_fit(seed):
+    times, values = _grid(seed)
+    forecaster = IncrementalForecaster()
+    forecaster.sync('A', times[:WINDOW_HOURS], values[:WINDOW_HOURS])
+    for i in range(WINDOW_HOURS, len(times)):
+        # 한 시간 추가 → 창에서 가장 오래된 시간이 빠짐
+        forecaster.update('A', times[i], values[i])
+        got, got_times, model = forecaster.predict('A')
+        expected, expected_times, reference = _fresh(times, values, i)
+        np.testing.assert_allclose(got, expected, rtol=1e-9)
+        assert got_times == expected_times
+        assert model.coef_[0] == pytest.approx(reference.coef_[0], rel=1e-9, abs=1e-12)
+
+
+def test_sync_appends_new_hours_and_rebuilds_on_revision():
+    times, values = _grid(0)
+    forecaster = IncrementalForecaster()
+    assert forecaster.sync('A', times[:24], values[:24]) == 'append'
+    assert forecaster.sync('A', times[:24], values[:24]) == 'same'
+    assert forecaster.sync('A', times[1:25], values[1:25]) == 'append'
+    revised = values[2:26].copy()
+    revised[np.flatnonzero(~np.isnan(revised))[0]] += 5.0  # 지난 시간 값 정정
+    assert forecaster.sync('A', times[2:26], revised) == 'rebuild'
+    np.testing.assert_allclose(forecaster.predict('A')[0],
+                               linear_regression_predict(times[2:26], revised)[0], rtol=1e-9)
+
+
+def test_incremental_needs_three_points():
+    forecaster = IncrementalForecaster()
+    forecaster.update('A', datetime(2026, 10, 17, 0), 10.0)
+    forecaster.update('A', datetime(2026, 10, 17, 1), np.nan)
+    forecaster.update('A', datetime(2026, 10, 17, 2), 12.0)
+    assert forecaster.predict('A') == (None, None, None)
+    assert forecaster.predict('B') == (None, None, None)
+    with pytest.raises(ValueError):
+        forecaster.update('A', datetime(2026, 10, 17, 2), 13.0)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_predict_linear_matches_linear_regression_predict(seed):
+    times, values = _series(seed)
+    got = predict(times, values, n_hours=3, model='linear')
+    expected = linear_regression_predict(times, values, n_hours=3)
+    np.testing.assert_allclose(got[0], expected[0])
+    assert got[1] == expected[1]
+    assert got[2].coef_ == pytest.approx(expected[2].coef_)
+
+
+@pytest.mark.parametrize("model", sorted(MODELS))
+def test_predict_registry_models(model):
+    times, values = _series(0, n=72)
+    values[-3], values[-2:] = 50.0, np.nan
+    predict_values, predict_times, entry = predict(times, values, n_hours=3, model=model)
+    assert predict_values.shape == (3,) and (predict_values >= MIN_PREDICTION).all()
+    assert predict_times[0] == times[-3] + timedelta(hours=1)
+    assert predict(times[:2], values[:2], model=model) == (None, None, None)
@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+from grading import (
+    GRADE_MESSAGES, GRADE_NAMES, NO_VALUE_MESSAGE, UNKNOWN_GRADE, grade_batch, grade_codes,
+    grade_durations, grade_names, grade_timeline, recommend_by_value,
+)
+
+# 각 등급의 하한 이상이면 그 등급 (경계값과 경계 사이 소수 포함)
+BOUNDARIES = {
+    'PM10': [(0, 0), (30, 0), (30.5, 0), (31, 1), (80, 1), (80.9, 1), (81, 2), (150, 2), (151, 3), (999, 3)],
+    'PM2.5': [(0, 0), (15, 0), (15.5, 0), (16, 1), (35, 1), (36, 2), (75, 2), (75.5, 2), (76, 3)],
+}
+
+
+@pytest.mark.parametrize("pm_type,value,code", [
+    (pm_type, value, code) for pm_type, cases in BOUNDARIES.items() for value, code in cases
+])
+def test_boundaries(pm_type, value, code):
+    assert int(grade_codes(value, pm_type)) == code
+    assert recommend_by_value(value, pm_type) == GRADE_MESSAGES[code]
+    assert str(grade_names(grade_codes(value, pm_type))) == GRADE_NAMES[code]
+
+
+def test_pm25_is_default_for_other_names():
+    assert int(grade_codes(20, 'pm25')) == int(grade_codes(20, 'PM2.5')) == 1
+
+
+def test_missing_values():
+    assert int(grade_codes(np.nan)) == -1
+    assert str(grade_names(-1)) == UNKNOWN_GRADE
+    assert recommend_by_value(None) == NO_VALUE_MESSAGE
+    assert recommend_by_value(np.nan) == NO_VALUE_MESSAGE
+
+
+def test_batch_shape_and_durations():
+    values = np.array([[10, 40, 90, np.nan], [200, 200, 10, 10]], dtype=float)
+    result = grade_batch(values, 'PM10', step_hours=2)
+    np.testing.assert_array_equal(result['codes'], [[0, 1, 2, -1], [3, 3, 0, 0]])
+    np.testing.assert_array_equal(result['durations'], [[2, 2, 2, 0], [4, 0, 0, 4]])
+    np.testing.assert_array_equal(grade_durations([0, 0, 3]), [2, 0, 0, 1])
+
+
+def test_timeline_runs():
+    times = list(range(5))
+    assert grade_timeline([0, 0, 2, 2, 0], times) == [('좋음', 0, 1), ('나쁨', 2, 3), ('좋음', 4, 4)]
+    assert grade_timeline([], []) == []
@@ -0,0 +1,44 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+import metrics
+from air_parse import parse_items
+from forecast import linear_regression_predict
+from prefetch import PrefetchScheduler, default_series, precomputed_or_predict
+from shared_store import SharedStore
+
+END = datetime(2026, 10, 17, 9)
+
+
+def items(end, n=24):
+    rng = np.random.default_rng(int(end.timestamp()) % 1000)
+    out = []
+    for i in range(n):
+        value = '-' if i % 7 == 3 else str(int(rng.uniform(10, 120)))
+        out.append({'dataTime': (end - timedelta(hours=i)).strftime('%Y-%m-%d %H:%M'),
+                    'pm10Value': value, 'pm25Value': str(int(rng.uniform(5, 60)))})
+    return out
+
+
+@pytest.fixture
+def scheduler(tmp_path):
+    return PrefetchScheduler(stations=['A'], shared=SharedStore(str(tmp_path / "shared.sqlite3")))
+
+
+def test_precompute_matches_app_forecast(scheduler):
+    # 정시마다 한 시간씩 밀린 응답 → 상태에는 새 시간만 더해지고, 결과는 앱의 새 계산과 같아야 함
+    for hour in range(3):
+        end = END + timedelta(hours=hour)
+        results = {'A': items(end)}
+        scheduler._precompute(results, end.strftime("%Y%m%d%H"))
+        hits = metrics.counters().get(('air_forecast_precomputed_total', (('result', 'hit'),)), 0)
+        times, values = default_series(parse_items(results['A'], 'A'), 'pm10Value')
+        got, got_times, _ = precomputed_or_predict('A', 'PM10', times[-24:], values[-24:],
+                                                   store=scheduler.shared)
+        assert metrics.counters()[('air_forecast_precomputed_total', (('result', 'hit'),))] == hits + 1
+        expected, expected_times, _ = linear_regression_predict(times[-24:], values[-24:])
+        np.testing.assert_allclose(got, expected, rtol=1e-9)
+        assert got_times == expected_times
+    assert len(scheduler.forecaster.trends) == 2  # (측정소, 항목)별 상태
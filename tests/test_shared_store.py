@@ -0,0 +1,166 @@
+import multiprocessing
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from shared_store import MISSING, SharedStore
+
+
+def _concurrent(n, fn):
+    barrier = threading.Barrier(n)
+    out = [None] * n
+
+    def worker(i):
+        barrier.wait()
+        out[i] = fn()
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return out
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SharedStore(str(tmp_path / "shared.sqlite3"))
+
+
+def test_get_or_compute_threads(store):
+    calls = []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.2)
+        return {"pm10": [1, 2, 3]}
+
+    results = _concurrent(6, lambda: store.get_or_compute("forecast", "A", compute, hour="2026101709"))
+    assert results == [{"pm10": [1, 2, 3]}] * 6
+    assert len(calls) == 1
+    assert store.get("forecast", "A") == {"pm10": [1, 2, 3]}
+
+
+def _compute_in_process(path, out):
+    store = SharedStore(path)
+    calls = []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.3)
+        return 42
+
+    value = store.get_or_compute("forecast", "A", compute, hour="2026101709")
+    out.put((value, len(calls)))
+
+
+def test_get_or_compute_processes(tmp_path):
+    if "fork" not in multiprocessing.get_all_start_methods():
+        pytest.skip("fork를 쓸 수 없는 플랫폼")
+    ctx = multiprocessing.get_context("fork")
+    path = str(tmp_path / "shared.sqlite3")
+    SharedStore(path).connect()  # 스키마를 미리 만들어 둠
+    out = ctx.Queue()
+    procs = [ctx.Process(target=_compute_in_process, args=(path, out)) for _ in range(4)]
+    for p in procs:
+        p.start()
+    got = [out.get(timeout=30) for _ in procs]
+    for p in procs:
+        p.join()
+    assert [value for value, _ in got] == [42] * 4
+    assert sum(calls for _, calls in got) == 1
+
+
+def _hold_lease(store, name):
+    with store._write() as conn:
+        conn.execute("INSERT OR REPLACE INTO leases (name, owner, expires_at) VALUES (?, ?, ?)",
+                     (name, "other-host:1", time.time() + 60))
+
+
+def test_coalesce_timeout_falls_back(store):
+    _hold_lease(store, "api:x")
+    calls = []
+    started = time.monotonic()
+    result = store.coalesce("api:x", lambda: calls.append(1), lambda: MISSING,
+                            wait=0.2, on_timeout=lambda: "stale")
+    assert result == "stale"
+    assert calls == []
+    assert time.monotonic() - started < 2
+
+
+def test_coalesce_waits_for_other_owner(store):
+    _hold_lease(store, "forecast::A")
+    calls = []
+
+    def finish_elsewhere():
+        time.sleep(0.2)
+        store.put("forecast", "A", "from-other")
+        store.release_lease("forecast::A")  # 소유자가 달라 지워지지 않음 → 결과가 생겨서 끝나야 함
+
+    threading.Thread(target=finish_elsewhere).start()
+    assert store.get_or_compute("forecast", "A", lambda: calls.append(1)) == "from-other"
+    assert calls == []
+
+
+def test_lease_is_exclusive(store):
+    _hold_lease(store, "prefetch:2026101709")
+    assert not store.try_lease("prefetch:2026101709")
+    assert store.try_lease("prefetch:2026101710")
+    assert store.try_lease("prefetch:2026101710")  # 같은 소유자는 다시 잡을 수 있음
+
+
+def test_publish_keeps_generations(store):
+    for hour in ("2026101707", "2026101708", "2026101709"):
+        store.publish("forecast", hour, {"A": hour, "B": hour})
+    assert store.current_hour("forecast") == "2026101709"
+    assert store.get("forecast", "A") == "2026101709"
+    assert store.get("forecast", "A", hour="2026101708") == "2026101708"
+    assert store.get("forecast", "A", hour="2026101707") is None
+
+
+def test_eviction_stays_under_limit(tmp_path):
+    store = SharedStore(str(tmp_path / "small.sqlite3"), max_bytes=20_000)
+    for i in range(100):
+        store.put("api", f"k{i}", "x" * 1000)
+    store.evict()
+    total = sum(size for _, size in store.stats().values())
+    assert total <= 20_000
+    assert store.get("api", "k99") is not None  # 가장 최근 항목은 남음
+
+
+@pytest.fixture
+def write_locked(store):
+    """다른 프로세스가 긴 쓰기(발행/퇴출) 중인 상태: 별도 연결로 쓰기 잠금을 잡아 둠."""
+    store.connect()
+    other = sqlite3.connect(store.path, isolation_level=None)
+    other.execute("BEGIN IMMEDIATE")
+    yield other
+    other.execute("ROLLBACK")
+    other.close()
+
+
+def test_get_does_not_wait_for_writers(store):
+    store.put("api", "k", [1, 2])
+    with store._write() as conn:
+        conn.execute("UPDATE entries SET accessed_at = 0")  # 읽은 시각 갱신이 필요한 상태
+    locker = sqlite3.connect(store.path, isolation_level=None)
+    locker.execute("BEGIN IMMEDIATE")
+    try:
+        started = time.monotonic()
+        assert store.get("api", "k") == [1, 2]
+        assert time.monotonic() - started < 1
+    finally:
+        locker.execute("ROLLBACK")
+        locker.close()
+
+
+def test_coalesce_wait_is_bounded_while_store_is_locked(store, write_locked):
+    calls = []
+    started = time.monotonic()
+    result = store.coalesce("api:y", lambda: calls.append(1), lambda: MISSING,
+                            wait=0.3, on_timeout=lambda: "stale")
+    assert result == "stale"
+    assert calls == []
+    assert time.monotonic() - started < 2
@@ -0,0 +1,102 @@
+import json
+import threading
+import time
+from datetime import timedelta
+
+from air_cache import AirCache, SingleFlight, now_kst
+
+
+def _concurrent(n, fn):
+    barrier = threading.Barrier(n)
+    out = [None] * n
+
+    def worker(i):
+        barrier.wait()
+        out[i] = fn()
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return out
+
+
+def test_singleflight_runs_once():
+    flight = SingleFlight("test")
+    calls = []
+
+    def slow():
+        calls.append(1)
+        time.sleep(0.2)
+        return "value"
+
+    assert _concurrent(8, lambda: flight.do("k", slow)) == ["value"] * 8
+    assert len(calls) == 1
+    assert flight.stats() == {'leader': 1, 'shared': 7}
+    # 끝난 key는 보관하지 않으므로 다음 호출은 다시 실행
+    flight.do("k", slow)
+    assert len(calls) == 2
+
+
+def test_singleflight_shares_errors():
+    flight = SingleFlight("test")
+
+    def boom():
+        time.sleep(0.1)
+        raise OSError("down")
+
+    def call():
+        try:
+            flight.do("k", boom)
+        except OSError as e:
+            return str(e)
+
+    assert _concurrent(4, call) == ["down"] * 4
+    assert flight.stats()['leader'] == 1
+
+
+def test_air_cache_fetches_once(tmp_path):
+    cache = AirCache(str(tmp_path))
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        time.sleep(0.2)
+        return [{'dataTime': '2026-10-17 09:00', 'pm10Value': '30'}]
+
+    key = ("종로구", 24, "DAILY", "1.0")
+    results = _concurrent(6, lambda: cache.get_or_fetch(key, fetch))
+    assert len(calls) == 1
+    assert all(r == results[0] for r in results)
+    cache.get_or_fetch(key, fetch)
+    assert len(calls) == 1
+
+
+def expire(cache, key, items):
+    """만료됐지만 stale로 보여 줄 수 있는 캐시 항목을 만듦."""
+    entry = cache.write(key, items)
+    entry['expires_at'] = (now_kst() - timedelta(minutes=1)).strftime("%Y-%m-%d %H:%M:%S")
+    with open(cache._path(key), "w", encoding="utf-8") as f:
+        json.dump(entry, f)
+
+
+def test_background_refresh_failure_is_reported(tmp_path, caplog):
+    import metrics
+
+    cache = AirCache(str(tmp_path))
+    key = ("종로구", 24, "DAILY", "1.0")
+    expire(cache, key, [{'dataTime': '2026-10-17 09:00', 'pm10Value': '30'}])
+
+    def fail():
+        raise OSError("api down")
+
+    errors = ('air_cache_requests_total', (('result', 'refresh_error'),))
+    before = metrics.counters().get(errors, 0)
+    with caplog.at_level("ERROR", logger="air_cache"):
+        assert cache.get_or_fetch(key, fail)[0]['pm10Value'] == '30'
+        for thread in threading.enumerate():
+            if thread.name == "air-cache-refresh":
+                thread.join()
+    assert metrics.counters()[errors] == before + 1
+    assert "api down" in caplog.text